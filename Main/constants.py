@@ -107,6 +107,10 @@ RMS_SERVER_KEY = _ENV["RMS_SERVER_KEY"]
 ACCESS_POINT_HOST = "108.156.60.1"  # wsj.com
 ACCESS_POINT_SSID = "OradioAP"
 
+##### HOOK EVENTS #########################################
+# Datagram socket shell hooks send events to, see hook_events.py
+HOOK_EVENT_SOCKET = _ENV["HOOK_EVENT_SOCKET"]
+
 ##### WEB SERVICE #########################################
 # Web server address
 WEB_SERVER_HOST = "0.0.0.0"
@@ -35,6 +35,7 @@ from collections.abc import Callable
 ##### Oradio modules ######################################
 from log_service import oradio_log
 from singleton import singleton
+from latency_trace import new_trace
 from messaging import (
     Incidents,
     IncidentMessage,
@@ -310,7 +311,8 @@ class GPIOService:
         Called by the RPi.GPIO event detection system when any button pin
         changes state. Looks up the button name from the channel number,
         reads the current pin level to determine press or release, and
-        forwards the event to the registered callback.
+        forwards the event to the registered callback. A press starts a
+        latency trace, attached under "data".
 
         Args:
             channel (int): BCM pin number on which the edge was detected.
@@ -331,10 +333,13 @@ class GPIOService:
         pressed = self.get_button_state(button_name)
         state = BUTTON_PRESSED if pressed else BUTTON_RELEASED
 
-        button_data = {
+        button_data: dict[str, Any] = {
             "state": state,
             "name": button_name,
         }
+        # Time the press from here to the audio, see latency_trace
+        if pressed:
+            button_data["data"] = new_trace(button_name)
 
         self.edge_event_callback(button_data)
 
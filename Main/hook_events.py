@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary: Shell hook event server
+    Receives one-line events from shell hooks (librespot --onevent,
+    usb-drive.sh) on a datagram Unix socket and publishes them on the
+    Commands bus, without a filesystem round-trip in between.
+    - Hooks send with `logger --socket <path> -d -- "<event>"`; the
+      syslog header logger adds is stripped, plain datagrams also work
+    - Only events listed in HOOK_EVENTS are published, anything else is
+      logged and dropped
+    - The flag and marker files the hooks also write remain the fallback
+      when this server is not running
+"""
+import os
+import socket
+
+##### Oradio modules ######################################
+from singleton import singleton
+from log_service import oradio_log
+from utilities import ThreadTemplate, JOIN_TIMEOUT
+from messaging import (
+    Commands,
+    Incidents,
+    CommandMessage,
+    IncidentMessage,
+    HOOK_SOURCE,
+    HOOK_START_FAILED,
+    HOOK_STOPPED,
+    SPOTIFY_SOURCE,
+    SPOTIFY_CONNECTED_EVENT,
+    SPOTIFY_DISCONNECTED_EVENT,
+    SPOTIFY_PLAYING_EVENT,
+    SPOTIFY_PAUSED_EVENT,
+    USB_SOURCE,
+    USB_ABSENT,
+    USB_PRESENT,
+)
+
+##### GLOBAL constants ####################################
+from constants import HOOK_EVENT_SOCKET
+
+##### LOCAL constants #####################################
+# Events a hook may send, and the command each one is published as
+HOOK_EVENTS = {
+    "spotify session_connected":    CommandMessage(SPOTIFY_SOURCE, SPOTIFY_CONNECTED_EVENT),
+    "spotify session_disconnected": CommandMessage(SPOTIFY_SOURCE, SPOTIFY_DISCONNECTED_EVENT),
+    "spotify playing":              CommandMessage(SPOTIFY_SOURCE, SPOTIFY_PLAYING_EVENT),
+    "spotify paused":               CommandMessage(SPOTIFY_SOURCE, SPOTIFY_PAUSED_EVENT),
+    "usb present":                  CommandMessage(USB_SOURCE, USB_PRESENT),
+    "usb absent":                   CommandMessage(USB_SOURCE, USB_ABSENT),
+}
+# Longer datagrams are truncated by recv() and rejected as unknown
+MAX_DATAGRAM = 256
+# Hooks run as the Oradio user (librespot) or root (udev): no access for others
+SOCKET_MODE = 0o660
+
+@singleton
+class HookEventServer(ThreadTemplate):
+    """
+    Singleton server for shell hook events on a datagram Unix socket.
+
+    The worker blocks in recv(), so it costs no wakeups while idle;
+    stop() wakes it with an empty datagram. Counts received, published
+    and rejected events.
+    """
+    def __init__(self) -> None:
+        """
+        Initialise the server. The socket is created by start().
+        """
+        # do_work() blocks in recv(), no interval needed
+        super().__init__(interval=0, name="HookEventServer")
+        self._socket: socket.socket | None = None
+        self._counters = {"received": 0, "published": 0, "rejected": 0}
+
+##### Helpers #############################################
+
+    @staticmethod
+    def _parse(datagram: bytes) -> str:
+        """
+        Return the event in a datagram, without a syslog header if present.
+
+        `logger` sends '<pri>timestamp [host] tag: event'; the event is the
+        text after the first ': '.
+        """
+        text = datagram.decode("utf-8", errors="replace").strip()
+        if text.startswith("<"):
+            text = text.partition(": ")[2]
+        return " ".join(text.split())
+
+##### ThreadTemplate overrides ############################
+
+    def setup(self) -> None:
+        """
+        Bind the socket, replacing one left behind by a previous run.
+
+        Raises:
+            OSError: If the socket cannot be created or bound; the crash is
+                reported by start() and the hooks' file markers take over.
+        """
+        os.makedirs(os.path.dirname(HOOK_EVENT_SOCKET), exist_ok=True)
+        try:
+            os.unlink(HOOK_EVENT_SOCKET)
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sock.bind(HOOK_EVENT_SOCKET)
+            os.chmod(HOOK_EVENT_SOCKET, SOCKET_MODE)
+        except OSError:
+            sock.close()
+            raise
+        self._socket = sock
+        oradio_log.info("Listening for hook events on %s", HOOK_EVENT_SOCKET)
+
+    def do_work(self) -> None:
+        """Receive one datagram and publish the command for a known event."""
+        if self._socket is None:
+            return
+        datagram = self._socket.recv(MAX_DATAGRAM)
+        if self.stopping:
+            return
+
+        self._counters["received"] += 1
+        event = self._parse(datagram)
+        message = HOOK_EVENTS.get(event)
+        if message is None:
+            self._counters["rejected"] += 1
+            oradio_log.warning("Unknown hook event rejected: %r", event)
+            return
+
+        Commands.publish(message)
+        self._counters["published"] += 1
+        oradio_log.debug("Hook event '%s' published", event)
+
+    def teardown(self) -> None:
+        """Remove the socket. Report incident: Oradio never intentionally stops the server."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.unlink(HOOK_EVENT_SOCKET)
+            except OSError:
+                pass
+        Incidents.publish(IncidentMessage(HOOK_SOURCE, HOOK_STOPPED))
+
+    def safe_stop(self, timeout: float = JOIN_TIMEOUT) -> bool:
+        """Signal the worker to stop, wake it from recv(), and wait for it to finish."""
+        self._stop_event.set()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as waker:
+            try:
+                waker.sendto(b"", HOOK_EVENT_SOCKET)
+            except OSError:
+                # Not bound: the worker is not blocked in recv()
+                pass
+        return super().safe_stop(timeout)
+
+##### Public API ##########################################
+
+    def get_counters(self) -> dict[str, int]:
+        """Return the number of received, published and rejected events."""
+        return dict(self._counters)
+
+    def start(self) -> None:
+        """
+        Start the server thread. Idempotent: calling start() when the
+        thread is already alive is a no-op.
+        """
+        if self.is_alive():
+            oradio_log.debug("Hook event server already running")
+            return
+
+        if not self.safe_start():
+            oradio_log.error("Hook event server failed to start")
+            Incidents.publish(IncidentMessage(HOOK_SOURCE, HOOK_START_FAILED))
+            return
+
+        if self.crashed:
+            oradio_log.error("Hook event server crashed during startup: %s", self.exception)
+            Incidents.publish(IncidentMessage(HOOK_SOURCE, HOOK_START_FAILED))
+            return
+
+        oradio_log.info("Hook event server started")
+
+    def stop(self) -> None:
+        """Signal the server thread to stop and wait for it to exit."""
+        self.safe_stop()
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from time import perf_counter
+    from constants import YELLOW, NC
+    from utilities import input_prompt              # pylint: disable=ungrouped-imports
+    from messaging import DebugMessageHandler       # pylint: disable=ungrouped-imports
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu() -> None:
+        """Show menu with test options"""
+        input_selection = (
+            "Select a function, input the number:\n"
+            " 0-Quit\n"
+            " 1-Start hook event server\n"
+            " 2-Stop hook event server\n"
+            " 3-Send event\n"
+            " 4-Show counters\n"
+            "Select: "
+        )
+
+        server = HookEventServer()
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    break
+                case 1:
+                    server.start()
+                case 2:
+                    server.stop()
+                case 3:
+                    event = input_prompt(f"Enter event {list(HOOK_EVENTS)}: ", str, "")
+                    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as client:
+                        start = perf_counter()
+                        try:
+                            client.sendto(event.encode(), HOOK_EVENT_SOCKET)
+                        except OSError as ex_err:
+                            print(f"\n{YELLOW}Send failed: {ex_err}{NC}\n")
+                            continue
+                        print(f"\nSent in {(perf_counter() - start) * 1000:.3f} ms\n")
+                case 4:
+                    print(f"\nCounters: {server.get_counters()}\n")
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+        server.stop()
+
+    print("\nStarting test program...\n")
+
+    # Subscribe to command and incident topics so published messages are printed to console
+    command_handler = DebugMessageHandler(Commands.subscribe())
+    incident_handler = DebugMessageHandler(Incidents.subscribe())
+
+    interactive_menu()
+
+    # Stop receiving messages
+    Commands.unsubscribe(command_handler.get_queue())
+    Incidents.unsubscribe(incident_handler.get_queue())
+    command_handler.stop()
+    incident_handler.stop()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
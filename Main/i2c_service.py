@@ -30,6 +30,7 @@ from smbus2 import SMBus
 ##### Oradio modules ######################################
 from log_service import oradio_log
 from singleton import singleton
+from metrics import MetricsRegistry
 from messaging import (
     Incidents,
     IncidentMessage,
@@ -42,6 +43,9 @@ from messaging import (
 ##### LOCAL constants #####################################
 I2C_RETRIES = 3
 I2C_BACKOFF = 1     # seconds
+# Metrics
+_RETRIES  = MetricsRegistry().counter("oradio_i2c_retries_total", "I2C writes repeated after a failed attempt")
+_FAILURES = MetricsRegistry().counter("oradio_i2c_failures_total", "I2C reads and writes failed for good")
 
 ORADIO_DEVICES = {
     0x4D: {"name": "MCP3021 - A/D Converter"},
@@ -180,6 +184,7 @@ class I2CService:
                 return value
             except (OSError, ValueError, TypeError) as ex_err:
                 oradio_log.error("I2C read: device=0x%02X, register=0x%02X -> %s", device, register, ex_err)
+                _FAILURES.inc()
                 Incidents.publish(IncidentMessage(I2C_SOURCE, I2C_READ_FAILED))
         return None
 
@@ -201,6 +206,8 @@ class I2CService:
             return
 
         for attempt in range(1, I2C_RETRIES + 1):
+            if attempt > 1:
+                _RETRIES.inc()
             with self._lock:
                 try:
                     self._bus.write_byte_data(device, register, value)
@@ -217,6 +224,7 @@ class I2CService:
             "Failed writing byte to device=0x%02X, register=0x%02X, value=0x%02X after %d attempts",
             device, register, value, I2C_RETRIES
         )
+        _FAILURES.inc()
         Incidents.publish(IncidentMessage(I2C_SOURCE, I2C_WRITE_FAILED))
 
 ##### Block operations ####################################
@@ -254,6 +262,7 @@ class I2CService:
                     "I2C read block ERROR: device=0x%02X, register=0x%02X, length=%d -> %s",
                     device, register, length, ex_err
                 )
+                _FAILURES.inc()
                 Incidents.publish(IncidentMessage(I2C_SOURCE, I2C_READ_FAILED))
         return None
 
@@ -279,6 +288,8 @@ class I2CService:
             return
 
         for attempt in range(1, I2C_RETRIES + 1):
+            if attempt > 1:
+                _RETRIES.inc()
             with self._lock:
                 try:
                     self._bus.write_i2c_block_data(device, register, data)
@@ -295,6 +306,7 @@ class I2CService:
             "Failed writing block to device=0x%02X, register=0x%02X, data=%s after %d attempts",
             device, register, data, I2C_RETRIES
         )
+        _FAILURES.inc()
         Incidents.publish(IncidentMessage(I2C_SOURCE, I2C_WRITE_FAILED))
 
 ##### Stand-alone entry point #############################
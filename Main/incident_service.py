@@ -23,19 +23,22 @@ Created on May 15, 2026
     for recognised incidents from registered sources.
     Unknown incidents are logged for further investigation.
 """
+from time import monotonic
 from collections.abc import Callable
 
 ##### Oradio modules ######################################
 from log_service import oradio_log
-from rms_service import RMService, INCIDENT
+from rms_service import RMService, INCIDENT, BUNDLE_REUSE_WINDOW
 from messaging import (
     Commands,
     Incidents,
     CommandMessage,
     IncidentMessage,
+    Overflow,
     MessageHandlerTemplate,
     BACKLIGHTING_SOURCE, BACKLIGHTING_START_FAILED, BACKLIGHTING_STOPPED,
     GPIO_SOURCE, GPIO_PINS_FAILED, GPIO_BUTTONS_FAILED,
+    HOOK_SOURCE, HOOK_START_FAILED, HOOK_STOPPED,
     I2C_SOURCE, I2C_BUS_FAILED, I2C_READ_FAILED, I2C_WRITE_FAILED,
     LED_SOURCE, LED_BLINK_START_FAILED, LED_BLINK_STOP_FAILED,
     MPD_SOURCE, MPD_CONNECT_FAILED, MPD_EXECUTE_FAILED, MPD_MONITOR_FAILED, MPD_PRESET_INVALID,
@@ -71,16 +74,21 @@ class IncidentHandler(MessageHandlerTemplate):
         which subscribes to the incident bus and starts the worker thread.
         """
         # Subscribe to incident messages and initialise base class and start the worker thread
-        self._queue = Incidents.subscribe()
+        # An incident storm keeps the latest incident per source rather than stalling publishers
+        self._queue = Incidents.subscribe(overflow=Overflow.COALESCE, name="IncidentHandler")
 
         # Used to post incidents to Remote Monitoring Service
         self._rms = RMService()
 
+        # monotonic() time of the last flight recorder dump, None before the first
+        self._last_dump: float | None = None
+
         # Map each source constant to its handler method.
         # Adding a new source only requires one new line here.
         self._dispatch: dict[str, Callable[[IncidentMessage], None]] = {
             BACKLIGHTING_SOURCE: self._handle_backlighting_incident,
             GPIO_SOURCE:         self._handle_gpio_incident,
+            HOOK_SOURCE:         self._handle_hook_incident,
             I2C_SOURCE:          self._handle_i2c_incident,
             LED_SOURCE:          self._handle_led_incident,
             LOG_SOURCE:          self._handle_log_incident,
@@ -149,6 +157,29 @@ class IncidentHandler(MessageHandlerTemplate):
         else:
             oradio_log.error("Unhandled GPIO incident: '%s'", incident.message)
 
+    def _handle_hook_incident(self, incident: IncidentMessage) -> None:
+        """
+        Handle hook event server-related incident.
+
+        Hooks keep signalling through their flag and marker files while the
+        server is down, so these incidents only degrade latency.
+
+        Args:
+            incident: Incident message received from the incident bus.
+        """
+        if incident.message == HOOK_START_FAILED:
+            # MITIGATION TO BE IMPLEMENTED:
+            #   Report hook event server start failed + status to RMS
+            #   If retry_count < MAX_RETRIES: retry starting hook event server
+            oradio_log.debug("Mitigation to be implemented")
+        elif incident.message == HOOK_STOPPED:
+            # MITIGATION TO BE IMPLEMENTED:
+            #   Report hook event server stopped + status to RMS
+            #   If retry_count < MAX_RETRIES: retry starting hook event server
+            oradio_log.debug("Mitigation to be implemented")
+        else:
+            oradio_log.error("Unhandled hook event incident: '%s'", incident.message)
+
     def _handle_i2c_incident(self, incident: IncidentMessage) -> None:
         """
         Handle I2C-related incident.
@@ -527,6 +558,12 @@ class IncidentHandler(MessageHandlerTemplate):
         """
         oradio_log.debug("Incident message received: %r", message)
 
+        # Save the detail logged before the incident, for the upload to RMS and for local inspection.
+        # Incidents within BUNDLE_REUSE_WINDOW share the log bundle, so a new dump would not be uploaded.
+        if self._last_dump is None or monotonic() - self._last_dump > BUNDLE_REUSE_WINDOW:
+            oradio_log.dump_flight_recorder()
+            self._last_dump = monotonic()
+
         # Post incident (if connected to internet)
         self._rms.send_message(INCIDENT, message)
 
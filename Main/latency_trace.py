@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary: Oradio button-to-audio latency tracing
+    A Trace is started when a button edge is detected and travels with the
+    button's CommandMessage.data to the state machine and MPD. Each stage
+    it passes marks the time since the previous stage into a histogram:
+    - button:   edge detected -> command published (debounce, click sound)
+    - bus:      published -> handle_message()
+    - dispatch: handle_message() -> state handler queued (guards)
+    - queue:    queued -> state handler started
+    - mpd:      previous stage -> MPD playback command done (one per command)
+    - handler:  previous stage -> state handler done
+    plus the totals to_first_mpd (edge -> first MPD playback command done,
+    when the audio changes) and end_to_end (edge -> state handler done).
+    The histograms are always on; snapshot() and dump() report percentiles.
+"""
+from bisect import bisect_left
+from itertools import count
+from threading import Lock, local
+from time import perf_counter
+from typing import Any
+
+##### Oradio modules ######################################
+from log_service import oradio_log
+
+##### LOCAL constants #####################################
+# Histogram bucket upper bounds in seconds: 4 buckets per doubling from
+# 10 us to about 80 s, so a reported percentile is within 19% of the real value
+BUCKET_BOUNDS = tuple(10e-6 * 2 ** (step / 4) for step in range(4 * 23))
+PERCENTILES   = (50, 90, 99)
+# Stage names, see summary
+STAGE_BUTTON       = "button"
+STAGE_BUS          = "bus"
+STAGE_DISPATCH     = "dispatch"
+STAGE_QUEUE        = "queue"
+STAGE_MPD          = "mpd"
+STAGE_HANDLER      = "handler"
+TOTAL_TO_FIRST_MPD = "to_first_mpd"
+TOTAL_END_TO_END   = "end_to_end"
+
+class LatencyHistogram:
+    """
+    Fixed log-bucket latency histogram. Recording is a bisect and a few
+    increments, with constant memory however many samples are recorded.
+    """
+    def __init__(self) -> None:
+        """Create an empty histogram."""
+        self._lock = Lock()
+        self._counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add a sample."""
+        index = bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += seconds
+            self._max = max(self._max, seconds)
+
+    def summary(self) -> dict[str, float]:
+        """
+        Return the sample count, and the mean, percentiles and maximum in ms.
+        A percentile is the upper bound of its bucket, capped at the maximum.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, seconds, maximum = self._count, self._sum, self._max
+        result: dict[str, float] = {"count": total}
+        if not total:
+            return result
+        result["mean_ms"] = round(seconds / total * 1000, 3)
+        for percentile in PERCENTILES:
+            rank = percentile / 100 * total
+            index, cumulative = 0, counts[0]
+            while cumulative < rank:
+                index += 1
+                cumulative += counts[index]
+            bound = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else maximum
+            result[f"p{percentile}_ms"] = round(min(bound, maximum) * 1000, 3)
+        result["max_ms"] = round(maximum * 1000, 3)
+        return result
+
+class Trace:
+    """
+    Timing of one button press on its way to the audio.
+
+    Marked by one thread at a time as the press is handed on, so it needs
+    no lock. Picklable, as it crosses the message bus in CommandMessage.data.
+    """
+    __slots__ = ("trace_id", "origin", "start", "last", "mpd_done")
+
+    def __init__(self, trace_id: int, origin: str) -> None:
+        """
+        Args:
+            trace_id: Number of the trace, to match its log lines.
+            origin: What started the trace, e.g. the button name.
+        """
+        self.trace_id = trace_id
+        self.origin = origin
+        self.start = perf_counter()
+        self.last = self.start
+        self.mpd_done = False
+
+    def __repr__(self) -> str:
+        """Keep message logs short."""
+        return f"Trace({self.trace_id}, {self.origin})"
+
+    def mark(self, stage: str) -> None:
+        """Record the time since the previous stage as the latency of stage."""
+        now = perf_counter()
+        _histogram(stage).record(now - self.last)
+        self.last = now
+        if stage == STAGE_MPD and not self.mpd_done:
+            self.mpd_done = True
+            _histogram(TOTAL_TO_FIRST_MPD).record(now - self.start)
+
+    def finish(self) -> None:
+        """Mark the state handler done and record the end-to-end latency."""
+        self.mark(STAGE_HANDLER)
+        total = self.last - self.start
+        _histogram(TOTAL_END_TO_END).record(total)
+        oradio_log.debug("Trace %d (%s) done in %.1f ms", self.trace_id, self.origin, total * 1000)
+
+class activate:      # pylint: disable=invalid-name
+    """
+    Context manager making a trace the current one of this thread, so code
+    further down the call chain (MPD) can mark it. None is allowed, and
+    clears the current trace.
+    """
+    __slots__ = ("_trace", "_previous")
+
+    def __init__(self, trace: Trace | None) -> None:
+        """
+        Args:
+            trace: Trace to make current, or None.
+        """
+        self._trace = trace
+        self._previous: Trace | None = None
+
+    def __enter__(self) -> Trace | None:
+        """Make the trace current."""
+        self._previous = getattr(_current, "trace", None)
+        _current.trace = self._trace
+        return self._trace
+
+    def __exit__(self, *_exc: object) -> None:
+        """Restore the previous current trace."""
+        _current.trace = self._previous
+
+##### Helpers #############################################
+
+_ids = count(1)
+_current = local()
+_histograms: dict[str, LatencyHistogram] = {}
+_histograms_lock = Lock()
+
+def _histogram(name: str) -> LatencyHistogram:
+    """Return the histogram of a stage, creating it on first use."""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(name, LatencyHistogram())
+    return histogram
+
+##### Public API ##########################################
+
+def new_trace(origin: str) -> Trace:
+    """Start a trace now."""
+    return Trace(next(_ids), origin)
+
+def from_data(data: Any) -> Trace | None:
+    """
+    Return the trace in a CommandMessage.data payload, or None.
+
+    Button messages carry their payload as a list; a trace may be its only
+    entry or sit next to other data, such as a module test's timestamp.
+    """
+    if isinstance(data, Trace):
+        return data
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, Trace):
+                return item
+    return None
+
+def current() -> Trace | None:
+    """Return the current trace of this thread, or None."""
+    return getattr(_current, "trace", None)
+
+def mark(stage: str) -> None:
+    """Mark the current trace of this thread, if there is one."""
+    trace = getattr(_current, "trace", None)
+    if trace is not None:
+        trace.mark(stage)
+
+def snapshot() -> dict[str, dict[str, float]]:
+    """Return the summary of each stage histogram, see LatencyHistogram.summary()."""
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {name: histogram.summary() for name, histogram in sorted(histograms.items())}
+
+def dump() -> None:
+    """Log the summary of each stage histogram."""
+    for name, summary in snapshot().items():
+        oradio_log.info("Latency %s: %s", name, summary)
+
+def reset() -> None:
+    """Discard all recorded latencies."""
+    with _histograms_lock:
+        _histograms.clear()
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from time import sleep                          # pylint: disable=ungrouped-imports
+    from constants import YELLOW, NC
+    from utilities import input_prompt
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu() -> None:
+        """Show menu with test options"""
+        input_selection = (
+            "Select a function, input the number:\n"
+            " 0-Quit\n"
+            " 1-Trace 100 simulated button presses\n"
+            " 2-Show latency percentiles\n"
+            " 3-Measure tracing overhead\n"
+            " 4-Reset latencies\n"
+            "Select: "
+        )
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    break
+                case 1:
+                    for _ in range(100):
+                        trace = new_trace("simulated")
+                        for stage in (STAGE_BUTTON, STAGE_BUS, STAGE_DISPATCH, STAGE_QUEUE):
+                            trace.mark(stage)
+                        with activate(trace):
+                            sleep(0.002)
+                            mark(STAGE_MPD)
+                        trace.finish()
+                    print("\nTraced 100 presses\n")
+                case 2:
+                    for name, summary in snapshot().items():
+                        print(f"{name:>14}: {summary}")
+                    print()
+                case 3:
+                    start = perf_counter()
+                    for _ in range(10000):
+                        mark(STAGE_MPD)
+                    idle = (perf_counter() - start) / 10000
+                    trace = new_trace("overhead")
+                    start = perf_counter()
+                    for _ in range(10000):
+                        trace.mark("overhead")
+                    active = (perf_counter() - start) / 10000
+                    print(f"\nMark without trace: {idle * 1e6:.2f} us, with trace: {active * 1e6:.2f} us\n")
+                case 4:
+                    reset()
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    interactive_menu()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
@@ -26,13 +26,13 @@ Created on January 29, 2025
     ThreadTemplate (utilities.py), so each blink can be cleanly started,
     stopped and restarted, and reports crashes instead of dying silently.
 """
-from threading import Timer
 
 ##### Oradio modules ######################################
 from log_service import oradio_log
 from gpio_service import GPIOService
 from singleton import singleton
 from utilities import ThreadTemplate
+from scheduler import Scheduler
 from messaging import (
     Incidents,
     IncidentMessage,
@@ -201,8 +201,7 @@ class LEDControl:
             if led_name in LED_NAMES:
                 self.turn_on_led(led_name)
                 oradio_log.debug("%s turned on, will turn off after %s seconds", led_name, period)
-                oneshot_timer = Timer(period, self.turn_off_led, args=(led_name,))
-                oneshot_timer.start()
+                Scheduler().call_later(period, self.turn_off_led, led_name)
             else:
                 oradio_log.error("Invalid LED name: %s", led_name)
         else:
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary: Oradio incident log bundle
+    Packs the logs in ORADIO_LOG_PATH into one gzipped tar archive for an
+    RMS incident upload, instead of sending every log file as is:
+    - current logs (*.log, including the flight recorder dump): their tail
+    - rotated logs (*.log.1, *.log-20260822, *.gz): a summary per file with
+      its size, level counts and last errors, cached as they do not change
+    The tails shrink until the archive fits in BUNDLE_MAX_BYTES. The archive
+    is reproducible, so identical logs give an identical digest and an
+    upload can be skipped.
+"""
+import io
+import gzip
+import tarfile
+import hashlib
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+
+##### Oradio modules ######################################
+from log_service import oradio_log, ORADIO_LOG_PATH
+
+##### LOCAL constants #####################################
+# Name of the archive in the upload
+BUNDLE_NAME = "incident_logs.tar.gz"
+# Largest archive, and the tail of each current log it starts from and may shrink to
+BUNDLE_MAX_BYTES      = 256 * 1024
+BUNDLE_TAIL_BYTES     = 1024 * 1024
+BUNDLE_MIN_TAIL_BYTES = 16 * 1024
+# Name of the rotated logs summary in the archive
+ROTATED_SUMMARY_NAME = "rotated_logs.txt"
+# Levels counted in a rotated log, and the number of its last ERROR/CRITICAL lines kept
+SUMMARY_LEVELS      = ("WARNING", "ERROR", "CRITICAL")
+SUMMARY_ERROR_LINES = 5
+
+@dataclass(frozen=True) # Immutable after creation
+class LogBundle:
+    """
+    Compressed log archive for one incident.
+
+    Attributes:
+        name:   File name of the archive in the upload.
+        data:   The gzipped tar archive.
+        digest: Short SHA-256 of data, equal for identical bundles.
+    """
+    name: str
+    data: bytes
+    digest: str
+
+##### Helpers #############################################
+
+# Summaries of rotated logs by (path, size, mtime), as rotated logs do not change
+_summaries: dict[tuple[str, int, int], str] = {}
+
+def _read_tail(path: Path, size: int) -> bytes:
+    """Return the last size bytes of a file, from the first complete line."""
+    with path.open("rb") as file:
+        file.seek(0, io.SEEK_END)
+        start = max(file.tell() - size, 0)
+        file.seek(start)
+        data = file.read()
+    return data[data.find(b"\n") + 1:] if start else data
+
+def _whole_lines(data: bytes, size: int) -> bytes:
+    """Return the last size bytes of data, from the first complete line."""
+    if len(data) <= size:
+        return data
+    tail = data[-size:]
+    return tail[tail.find(b"\n") + 1:]
+
+def _summarize(path: Path) -> tuple[tuple[str, int, int], str]:
+    """
+    Return the summary of a rotated log: size, date, line and level counts,
+    last errors; and its key in the cache.
+    """
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    summary = _summaries.get(key)
+    if summary is not None:
+        return key, summary
+
+    opener = gzip.open if path.suffix == ".gz" else open
+    lines = 0
+    counts = dict.fromkeys(SUMMARY_LEVELS, 0)
+    errors: list[str] = []
+    with opener(path, "rt", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            lines += 1
+            for level in SUMMARY_LEVELS:
+                if f" - {level} - " in line:
+                    counts[level] += 1
+                    if level != "WARNING":
+                        errors = (errors + [line.rstrip()])[-SUMMARY_ERROR_LINES:]
+                    break
+    modified = datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds")
+    levels = " ".join(f"{level}={count}" for level, count in counts.items())
+    summary = f"{path.name}: {stat.st_size} bytes, modified {modified}, {lines} lines, {levels}\n"
+    summary += "".join(f"    {error}\n" for error in errors)
+    _summaries[key] = summary
+    return key, summary
+
+def _pack(members: dict[str, bytes]) -> bytes:
+    """
+    Return members as a gzipped tar archive. Timestamps and owners are
+    left out, so the same members always give the same bytes.
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode="w", format=tarfile.USTAR_FORMAT) as archive:
+            for name, content in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                info.mode = 0o644
+                archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+##### Public API ##########################################
+
+def build_log_bundle(log_path: Path = ORADIO_LOG_PATH, max_bytes: int = BUNDLE_MAX_BYTES) -> LogBundle:
+    """
+    Pack the logs in log_path into an archive of at most max_bytes, see
+    module summary. Only when the tails are down to BUNDLE_MIN_TAIL_BYTES
+    and still too large may the archive exceed max_bytes.
+
+    Args:
+        log_path:  Directory with the logs.
+        max_bytes: Size the archive should fit in.
+
+    Returns:
+        The bundle.
+    """
+    tails: dict[str, bytes] = {}
+    summaries = []
+    keys = set()
+    for path in sorted(log_path.glob("*.log*")):
+        try:
+            if path.suffix == ".log":
+                tails[path.name] = _read_tail(path, BUNDLE_TAIL_BYTES)
+            else:
+                key, summary = _summarize(path)
+                keys.add(key)
+                summaries.append(summary)
+        except (OSError, EOFError) as ex_err:
+            # A log removed or rotated meanwhile, or a damaged .gz: bundle the rest
+            oradio_log.warning("Log bundle skips %s: %s", path.name, ex_err)
+
+    # logrotate renames the rotated logs on each rotation: forget the files gone
+    for key in _summaries.keys() - keys:
+        del _summaries[key]
+
+    tail_bytes = BUNDLE_TAIL_BYTES
+    while True:
+        members = {name: _whole_lines(data, tail_bytes) for name, data in tails.items()}
+        if summaries:
+            members[ROTATED_SUMMARY_NAME] = "".join(summaries).encode("utf-8")
+        data = _pack(members)
+        if len(data) <= max_bytes or tail_bytes <= BUNDLE_MIN_TAIL_BYTES:
+            break
+        tail_bytes //= 2
+
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    oradio_log.debug("Log bundle %s: %d bytes, tails of %d bytes", digest, len(data), tail_bytes)
+    return LogBundle(BUNDLE_NAME, data, digest)
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from time import perf_counter
+    from constants import YELLOW, NC
+    from utilities import input_prompt
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu() -> None:
+        """Show menu with test options"""
+        input_selection = (
+            "Select a function, input the number:\n"
+            " 0-Quit\n"
+            " 1-Build a log bundle and show its contents\n"
+            " 2-Build a log bundle capped at 16 kB\n"
+            "Select: "
+        )
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    break
+                case 1 | 2:
+                    start = perf_counter()
+                    bundle = build_log_bundle(max_bytes=BUNDLE_MAX_BYTES if test_choice == 1 else 16 * 1024)
+                    elapsed = perf_counter() - start
+                    print(f"\nBundle {bundle.digest}: {len(bundle.data)} bytes in {elapsed * 1000:.1f} ms")
+                    with tarfile.open(fileobj=io.BytesIO(bundle.data), mode="r:gz") as archive:
+                        for member in archive.getmembers():
+                            print(f"    {member.name}: {member.size} bytes")
+                    print()
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    interactive_menu()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
@@ -32,25 +32,38 @@ Created on January 17, 2025
     file handler opens in append mode (O_APPEND) precisely so that copytruncate is safe -- every write
     seeks to end-of-file atomically, so writing resumes at offset 0 after a truncate instead of leaving
     a sparse file padded with NULs. That append behavior is also what makes it safe for several Oradio
-    processes to share the log: each record reaches the file in a single write() because emit() flushes
-    per record.
+    processes to share the log: records are written as whole lines, a batch of them per write().
+    - Group commit: the file handler collects the records the listener drains from the queue and
+      writes them with one write() when the batch is LOG_FLUSH_DELAY seconds old, reaches
+      LOG_BATCH_BYTES, or holds an ERROR or CRITICAL record. At DEBUG level this turns a write per
+      record into a few per second, sparing the SD card.
+    - Rate limiting: records below WARNING get a token bucket per call site (file:line). A site
+      logging faster than its budget has its records suppressed before they are created or
+      formatted, except one in RATE_LIMIT_SAMPLE; every SUPPRESSED_REPORT_INTERVAL seconds a
+      "N similar messages suppressed" record reports what was left out.
+    - Flight recorder: the last FLIGHT_RECORDER_SIZE records of any level are kept in memory, while
+      the file only gets ORADIO_FILE_LOG_LEVEL and up. dump_flight_recorder() writes them to
+      FLIGHT_RECORDER_FILE_STR, where incident uploads and the crash action pick them up with the
+      other *.log* files; IncidentHandler dumps on each incident and _fatal_exit() before exiting.
 @Reference:
     https://docs.python.org/3/howto/logging.html
 """
+import os
 import atexit
 import logging
 import traceback
 import faulthandler
-from sys import stderr
-from time import sleep
+from sys import stderr, _getframe
+from time import sleep, monotonic, localtime, strftime
 from pathlib import Path
-from threading import Thread
-from queue import Queue, Full
+from threading import Thread, Lock
+from queue import Queue, Empty, Full
 from logging import DEBUG, INFO, WARNING, ERROR, CRITICAL
 from logging.handlers import QueueHandler, QueueListener, SysLogHandler
 
 ##### Oradio modules ######################################
 # NOTE: Do not import Oradio modules using oradio_log to avoid circular imports
+from metrics import MetricsRegistry
 
 ##### GLOBAL constants ####################################
 from constants import (
@@ -58,16 +71,36 @@ from constants import (
 )
 
 ##### LOCAL constants #####################################
-# Logger identifier and default level
-ORADIO_LOGGER    = "oradio"
-ORADIO_LOG_LEVEL = DEBUG
+# Logger identifier and default level, and the level written to the log file.
+# The flight recorder keeps the records below the file level in memory
+ORADIO_LOGGER         = "oradio"
+ORADIO_LOG_LEVEL      = DEBUG
+ORADIO_FILE_LOG_LEVEL = INFO
 # Log file constants
 ORADIO_LOG_PATH     = (Path(__file__).parent.parent / "logging").resolve()
 ORADIO_LOG_FILE_STR = str(ORADIO_LOG_PATH / 'oradio.log')
+# Flight recorder: records kept in memory, and the file they are dumped to
+FLIGHT_RECORDER_SIZE     = 2000
+FLIGHT_RECORDER_FILE_STR = str(ORADIO_LOG_PATH / 'flight_recorder.log')
 # Record layout, shared by both sinks. ColorFormatter wraps it per level
 LOG_FORMAT = "%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s"
 # Items to queue when busy
 QUEUE_SIZE = 10000
+# Group commit of the log file: a batch is written at most LOG_FLUSH_DELAY
+# seconds after its first record, when it reaches LOG_BATCH_BYTES, or at once
+# when it holds a record of LOG_FLUSH_LEVEL or higher
+LOG_FLUSH_DELAY = 0.5
+LOG_BATCH_BYTES = 64 * 1024
+LOG_FLUSH_LEVEL = ERROR
+# Rate limit per call site of records below RATE_LIMIT_LEVEL: a token bucket
+# holding RATE_LIMIT_BURST records, refilled at RATE_LIMIT_PER_SECOND. Of the
+# records over the limit one in RATE_LIMIT_SAMPLE is still logged
+RATE_LIMIT_LEVEL      = WARNING
+RATE_LIMIT_BURST      = 50
+RATE_LIMIT_PER_SECOND = 10.0
+RATE_LIMIT_SAMPLE     = 100
+# Seconds between "similar messages suppressed" reports
+SUPPRESSED_REPORT_INTERVAL = 10.0
 # How often (in dropped-item counts) to log a "still dropping" reminder
 DROP_LOG_INTERVAL = 50
 # Fallback delivery for drop/health notices, independent of stdout/stderr
@@ -141,8 +174,8 @@ def _emit_fallback(fallback_handlers: list[logging.Handler], level: int, msg: st
     the first success, since each is an independent failure domain; e.g. a 
     full disk takes out the file handler but not syslog, while a journald
     that's misconfigured or absent takes out syslog but not the file.
-    FileHandler and SysLogHandler are both safe to call directly like this
-    from any thread. Falls back to stderr only if every sink fails, so
+    The file handler and SysLogHandler are both safe to call directly like
+    this from any thread; the notice is flushed rather than left in a batch. Falls back to stderr only if every sink fails, so
     nothing is lost silently in any case.
     """
     record = logging.LogRecord(
@@ -153,6 +186,7 @@ def _emit_fallback(fallback_handlers: list[logging.Handler], level: int, msg: st
     for handler in fallback_handlers:
         try:
             handler.emit(record)
+            handler.flush()
             delivered = True
         except Exception:     # pylint: disable=broad-exception-caught
             continue  # try the next independent sink
@@ -197,6 +231,228 @@ class _NonBlockingQueueHandler(QueueHandler):
         """Total number of records dropped due to a full queue."""
         return self._dropped
 
+class _BatchingFileHandler(logging.Handler):
+    """
+    File handler writing records in batches, one write() per batch.
+
+    emit() only formats and buffers a record; the batch is written by
+    flush(), which the listener calls when the batch is due (see
+    _BatchingQueueListener). ERROR and CRITICAL records, and a batch
+    reaching LOG_BATCH_BYTES, are written at once from emit().
+
+    Opens the file with O_APPEND like FileHandler mode="a", so copytruncate
+    and sharing the file with other processes stay safe (see module
+    docstring): a batch holds whole records and lands at end-of-file.
+    """
+    def __init__(self, filename: str, flush_delay: float = LOG_FLUSH_DELAY) -> None:
+        """
+        Args:
+            filename: Log file, created if missing.
+            flush_delay: Seconds a record may wait in the batch.
+        """
+        super().__init__()
+        self._fd = os.open(filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._flush_delay = flush_delay
+        self._batch: list[bytes] = []
+        self._batch_bytes = 0
+        self._deadline: float | None = None
+        self.writes = 0
+        self.bytes_written = 0
+        self.records = 0
+
+    @property
+    def deadline(self) -> float | None:
+        """monotonic() time at which the batch is due, or None if it is empty."""
+        return self._deadline
+
+    def emit(self, record) -> None:
+        """Format record and add it to the batch; write the batch if it is urgent or full."""
+        try:
+            line = (self.format(record) + "\n").encode("utf-8", "backslashreplace")
+        except Exception:     # pylint: disable=broad-exception-caught
+            self.handleError(record)
+            return
+        with self.lock:     # type: ignore[union-attr]
+            if not self._batch:
+                self._deadline = monotonic() + self._flush_delay
+            self._batch.append(line)
+            self._batch_bytes += len(line)
+            self.records += 1
+            if record.levelno >= LOG_FLUSH_LEVEL or self._batch_bytes >= LOG_BATCH_BYTES:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write the batch to the file."""
+        with self.lock:     # type: ignore[union-attr]
+            if not self._batch or self._fd < 0:
+                return
+            data = b"".join(self._batch)
+            self._batch.clear()
+            self._batch_bytes = 0
+            self._deadline = None
+            try:
+                # A regular file takes the whole batch in one write() unless
+                # the disk is full or a signal interrupts it
+                while data:
+                    written = os.write(self._fd, data)
+                    self.writes += 1
+                    self.bytes_written += written
+                    data = data[written:]
+            except OSError as ex_err:
+                print(f"[SafeLogger] log file write failed ({ex_err}); batch lost", file=stderr)
+
+    def close(self) -> None:
+        """Write the batch and close the file."""
+        with self.lock:     # type: ignore[union-attr]
+            self.flush()
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+        super().close()
+
+class _BatchingQueueListener(QueueListener):
+    """
+    QueueListener which writes the batch of a _BatchingFileHandler when
+    it is due: waiting for the next record stops at the batch deadline.
+    Records arriving before then join the batch, so a burst drained from
+    the queue is written with a single write().
+    """
+    def __init__(self, queue: Queue[logging.LogRecord], *handlers, batch_handler: _BatchingFileHandler) -> None:
+        """
+        Args:
+            queue: Log record queue.
+            handlers: All output handlers, including batch_handler.
+            batch_handler: Handler whose batch this listener flushes.
+        """
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self._records = queue
+        self._batch_handler = batch_handler
+
+    def _monitor(self) -> None:
+        """Handle records until the sentinel, flushing the batch when due."""
+        while True:
+            deadline = self._batch_handler.deadline
+            timeout = None if deadline is None else deadline - monotonic()
+            if timeout is not None and timeout <= 0:
+                self._batch_handler.flush()
+                continue
+            try:
+                record = self._records.get(True, timeout)
+            except Empty:
+                self._batch_handler.flush()
+                continue
+            # stop() puts QueueListener's sentinel, None, on the queue
+            if record is None:
+                self._records.task_done()
+                break
+            self.handle(record)
+            self._records.task_done()
+        self._batch_handler.flush()
+
+class _FlightRecorderHandler(logging.Handler):
+    """
+    Keeps the last records in a preallocated ring, in memory only.
+
+    A slot holds a compact tuple of the record fields in LOG_FORMAT; the
+    message is already formatted by the QueueHandler, so storing it is cheap.
+    """
+    def __init__(self, size: int = FLIGHT_RECORDER_SIZE) -> None:
+        """
+        Args:
+            size: Number of records kept.
+        """
+        super().__init__()
+        self._slots: list[tuple[float, str, str, int, str] | None] = [None] * size
+        self._next = 0
+
+    def emit(self, record) -> None:
+        """Store record in the oldest slot."""
+        self._slots[self._next] = (record.created, record.levelname, record.filename,
+                                   record.lineno, record.getMessage())
+        self._next = (self._next + 1) % len(self._slots)
+
+    def dump(self, filename: str) -> int:
+        """
+        Write the records, oldest first, in LOG_FORMAT to filename.
+
+        The file is replaced as a whole, so an upload never reads half a dump.
+
+        Returns:
+            The number of records written.
+        """
+        with self.lock:     # type: ignore[union-attr]
+            slots = self._slots[self._next:] + self._slots[:self._next]
+        lines = []
+        for slot in slots:
+            if slot is not None:
+                created, levelname, filename_, lineno, message = slot
+                asctime = f"{strftime('%Y-%m-%d %H:%M:%S', localtime(created))},{int(created * 1000) % 1000:03d}"
+                lines.append(f"{asctime} - {filename_}:{lineno} - {levelname} - {message}\n")
+        temporary = f"{filename}.tmp"
+        with open(temporary, "w", encoding="utf-8", errors="backslashreplace") as file:
+            file.writelines(lines)
+        os.replace(temporary, filename)
+        return len(lines)
+
+class _CallSiteBudget:
+    """Token bucket and suppression counts of one call site."""
+    __slots__ = ("tokens", "stamp", "over", "suppressed", "level")
+
+    def __init__(self, now: float) -> None:
+        self.tokens = float(RATE_LIMIT_BURST)
+        self.stamp = now
+        self.over = 0           # records over the limit, for sampling
+        self.suppressed = 0     # suppressed since the last report
+        self.level = DEBUG      # highest level suppressed since the last report
+
+class _RateLimiter:
+    """
+    Per call site token buckets deciding whether SafeLogger creates a record.
+
+    Call sites are lines of code, so the number of buckets is bounded.
+    """
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._sites: dict[tuple[str, int], _CallSiteBudget] = {}
+        self._next_report = monotonic() + SUPPRESSED_REPORT_INTERVAL
+        self.suppressed = 0
+
+    def allow(self, site: tuple[str, int], level: int, now: float) -> bool:
+        """Take a token for a record at site; return whether it is logged."""
+        with self._lock:
+            budget = self._sites.get(site)
+            if budget is None:
+                budget = self._sites[site] = _CallSiteBudget(now)
+            budget.tokens = min(RATE_LIMIT_BURST, budget.tokens + (now - budget.stamp) * RATE_LIMIT_PER_SECOND)
+            budget.stamp = now
+            if budget.tokens >= 1:
+                budget.tokens -= 1
+                return True
+            budget.over += 1
+            if budget.over % RATE_LIMIT_SAMPLE == 0:
+                return True
+            budget.suppressed += 1
+            budget.level = max(budget.level, level)
+            self.suppressed += 1
+            return False
+
+    def take_reports(self, now: float, force: bool = False) -> list[tuple[tuple[str, int], int, int]]:
+        """
+        Return (site, level, count) of each site with suppressed records and
+        reset its count, if a report is due or force is set.
+        """
+        if not force and now < self._next_report:
+            return []
+        with self._lock:
+            self._next_report = now + SUPPRESSED_REPORT_INTERVAL
+            reports = []
+            for site, budget in self._sites.items():
+                if budget.suppressed:
+                    reports.append((site, budget.level, budget.suppressed))
+                    budget.suppressed = 0
+                    budget.level = DEBUG
+            return reports
+
 ##### Safe logger wrapper #################################
 
 class SafeLogger:
@@ -205,7 +461,7 @@ class SafeLogger:
     Architecture:
         Logger → QueueHandler → log_queue → QueueListener → real handlers
     """
-    def __init__(self, name=None, level=DEBUG) -> None:
+    def __init__(self, name=None, level=DEBUG, file_level=DEBUG, flush_delay=LOG_FLUSH_DELAY) -> None:
         # Get system logger
         self._logger = logging.getLogger(name)
         self._logger.setLevel(level)
@@ -216,6 +472,9 @@ class SafeLogger:
         # Get color formatter
         self._formatter = ColorFormatter()
 
+        # Per call site rate limit of records below RATE_LIMIT_LEVEL
+        self._limiter = _RateLimiter()
+
         # Ensure log directory exists
         ORADIO_LOG_PATH.mkdir(parents=True, exist_ok=True)
 
@@ -234,10 +493,17 @@ class SafeLogger:
         #
         # Kept as its own reference (not just inside `handlers`) because it's also one of the
         # disk-backed fallback sinks for drop/health notices below -- those need to survive
-        # headless operation, where stdout/stderr may not be captured anywhere.
-        file_handler = logging.FileHandler(ORADIO_LOG_FILE_STR, mode="a", encoding="utf-8")
+        # headless operation, where stdout/stderr may not be captured anywhere -- and the
+        # listener flushes its batches.
+        file_handler = _BatchingFileHandler(ORADIO_LOG_FILE_STR, flush_delay)
         file_handler.setFormatter(self._formatter)
+        file_handler.setLevel(file_level)
         handlers.append(file_handler)
+        self._file_handler = file_handler
+
+        # Flight recorder: all levels, in memory, for dump_flight_recorder()
+        self._flight_recorder = _FlightRecorderHandler()
+        handlers.append(self._flight_recorder)
 
         # Second, independent fallback sink for drop/health notices only
         # (not part of `handlers` / normal log routing -- adding it there
@@ -280,7 +546,7 @@ class SafeLogger:
         ]
 
         # QueueListener (consumer)
-        self._listener = QueueListener(self._log_queue, *handlers, respect_handler_level=True)
+        self._listener = _BatchingQueueListener(self._log_queue, *handlers, batch_handler=file_handler)
         self._listener.start()
         atexit.register(self.shutdown)
         # Flush + stop on normal exit
@@ -307,14 +573,30 @@ class SafeLogger:
     def _safe_log(self, level, msg, *args, **kwargs) -> None:
         """Internal helper to log messages safely."""
         try:
+            # Skip disabled levels before any other work
+            if not self._logger.isEnabledFor(level):
+                return
             # Use stacklevel=3 to skip SafeLogger wrapper
             kwargs.setdefault("stacklevel", 3)
+            if level < RATE_LIMIT_LEVEL:
+                now = monotonic()
+                # Frame 0 is this method, so the reported caller is frame stacklevel - 1
+                caller = _getframe(kwargs["stacklevel"] - 1)
+                if not self._limiter.allow((caller.f_code.co_filename, caller.f_lineno), level, now):
+                    return
+                self._report_suppressed(now)
             self._logger.log(level, msg, *args, **kwargs)
         # Catching ALL exceptions is fallback, makes logger safe
         except Exception as ex_err:     # pylint: disable=broad-exception-caught
             print(f"[SafeLogger fallback] {msg}. Exception: {ex_err}", file=stderr)
             traceback.print_exc(file=stderr)
 
+    def _report_suppressed(self, now: float, force: bool = False) -> None:
+        """Log the number of records suppressed per call site, if a report is due."""
+        for (filename, lineno), level, count in self._limiter.take_reports(now, force):
+            self._logger.log(level, "%d similar messages suppressed from %s:%d",
+                             count, Path(filename).name, lineno)
+
     # Level-specific methods
     def trace(self, msg, *args, **kwargs) -> None:
         """Log a message with TRACE severity level."""
@@ -354,6 +636,44 @@ class SafeLogger:
         """Whether the log queue is currently at capacity (further puts will be dropped)."""
         return self._log_queue.full()
 
+    def set_file_level(self, level) -> None:
+        """Set the logging level for the log file; lower levels only go to the flight recorder."""
+        self._file_handler.setLevel(level)
+
+    def dump_flight_recorder(self) -> None:
+        """
+        Write the records in the flight recorder to FLIGHT_RECORDER_FILE_STR.
+
+        Records still in the log queue are not included. Safe to call from
+        any thread, also after shutdown().
+        """
+        try:
+            count = self._flight_recorder.dump(FLIGHT_RECORDER_FILE_STR)
+        except OSError as ex_err:
+            print(f"[SafeLogger] flight recorder dump failed: {ex_err}", file=stderr)
+        else:
+            self._logger.info("Flight recorder: %d records written to %s", count, FLIGHT_RECORDER_FILE_STR)
+
+    @property
+    def suppressed_count(self) -> int:
+        """Total number of log records suppressed by the per call site rate limit."""
+        return self._limiter.suppressed
+
+    @property
+    def file_writes(self) -> int:
+        """Number of write() calls to the log file."""
+        return self._file_handler.writes
+
+    @property
+    def file_bytes_written(self) -> int:
+        """Number of bytes written to the log file."""
+        return self._file_handler.bytes_written
+
+    @property
+    def file_records(self) -> int:
+        """Number of records written or batched for the log file."""
+        return self._file_handler.records
+
     @property
     def listener_alive(self) -> bool:
         """
@@ -371,12 +691,27 @@ class SafeLogger:
 
     def shutdown(self):
         """Shutdown logging queue listener and fallback sinks."""
+        self._report_suppressed(monotonic(), force=True)
         self._listener.stop()
         for handler in self._fallback_handlers:
             handler.close()
 
 # Instantiate system logger
-oradio_log = SafeLogger(ORADIO_LOGGER, ORADIO_LOG_LEVEL)
+oradio_log = SafeLogger(ORADIO_LOGGER, ORADIO_LOG_LEVEL, ORADIO_FILE_LOG_LEVEL)
+
+# The logger keeps its own counts; export them as metrics
+MetricsRegistry().counter("oradio_log_records_dropped_total", "Log records dropped because the log queue was full",
+                          lambda: oradio_log.dropped_count)
+MetricsRegistry().gauge("oradio_log_queue_size", "Log records waiting in the log queue",
+                        lambda: oradio_log.queue_size)
+MetricsRegistry().counter("oradio_log_records_suppressed_total", "Log records suppressed by the call site rate limit",
+                          lambda: oradio_log.suppressed_count)
+MetricsRegistry().counter("oradio_log_file_records_total", "Log records for the log file",
+                          lambda: oradio_log.file_records)
+MetricsRegistry().counter("oradio_log_file_writes_total", "write() calls to the log file",
+                          lambda: oradio_log.file_writes)
+MetricsRegistry().counter("oradio_log_file_bytes_total", "Bytes written to the log file",
+                          lambda: oradio_log.file_bytes_written)
 
 ##### Stand-alone entry point #############################
 
@@ -429,7 +764,7 @@ if __name__ == '__main__':
 
         oradio_log.info("Completed multi-threaded logging test with %d threads and %d iterations each", thread_count, iterations)
 
-    def interactive_menu():
+    def interactive_menu():     # pylint: disable=too-many-branches
         """Show menu with test options"""
 
         # Show menu with test options
@@ -443,6 +778,8 @@ if __name__ == '__main__':
             " 5-Test log level ERROR\n"
             " 6-Test log level CRITICAL\n"
             " 7-Multi-threaded logging test\n"
+            " 8-Log 10000 debug records and show log file writes and suppressed records\n"
+            " 9-Dump flight recorder\n"
             "Select: "
         )
 
@@ -488,6 +825,21 @@ if __name__ == '__main__':
                     oradio_log.set_level(DEBUG)
                     print("\nStarting multi-threaded logging test (5 threads, 10 iterations each)...\n")
                     threaded_logging_test()
+                case 8:
+                    # Debug records only reach the log file at file level DEBUG
+                    oradio_log.set_level(DEBUG)
+                    oradio_log.set_file_level(DEBUG)
+                    records, writes = oradio_log.file_records, oradio_log.file_writes
+                    for idx in range(10000):
+                        oradio_log.debug("Burst record %d", idx)
+                    sleep(LOG_FLUSH_DELAY * 2)
+                    oradio_log.set_file_level(ORADIO_FILE_LOG_LEVEL)
+                    print(f"\n{oradio_log.file_records - records} records in "
+                          f"{oradio_log.file_writes - writes} writes, {oradio_log.file_bytes_written} bytes written so far, "
+                          f"{oradio_log.suppressed_count} records suppressed so far\n")
+                case 9:
+                    oradio_log.dump_flight_recorder()
+                    print(f"\nFlight recorder dumped to {FLIGHT_RECORDER_FILE_STR}\n")
                 case _:
                     print(f"\n{YELLOW}Please input a valid number{NC}\n")
 
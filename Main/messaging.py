@@ -27,17 +27,20 @@ Created on May 28, 2026
 import os
 import sys
 import uuid
-from enum import Enum
-from queue import Full
+from enum import Enum, StrEnum
+from functools import partial
+from queue import Empty, Full, Queue as LocalQueue
 from threading import Thread
 from typing import Any, NoReturn
 from dataclasses import dataclass
 from multiprocessing import Lock, Queue
+from multiprocessing.queues import Queue as ProcessQueue
 
 ##### Oradio modules ######################################
 from singleton import singleton
 from log_service import oradio_log
 from utilities import ThreadTemplate
+from metrics import MetricsRegistry
 
 ##### GLOBAL constants ####################################
 from constants import (
@@ -54,6 +57,16 @@ from constants import (
 # Bound queue size to detect runaway producers early.
 _MAX_QUEUE_SIZE = 1000
 
+# A subscriber queue: in-process (default) or across forked processes
+BusQueue = ProcessQueue | LocalQueue
+
+# Seconds an Overflow.BLOCK publish waits for room before dropping the message
+_BLOCK_TIMEOUT = 1.0
+# Seconds to wait for a cross-process queue's feeder thread to pass on its oldest message
+_FEEDER_TIMEOUT = 0.05
+# After the first, every this many dropped messages per subscriber are logged
+_DROP_LOG_INTERVAL = 100
+
 ##### Messaging constants #################################
 # Backlighting
 BACKLIGHTING_SOURCE       = "Backlighting message"
@@ -74,6 +87,11 @@ GPIO_SOURCE         = "GPIO message"
 GPIO_PINS_FAILED    = "GPIO failed to initialise and configure all GPIO pins"
 GPIO_BUTTONS_FAILED = "GPIO failed to enable GPIO edge detection on all button pins"
 
+# Shell hook events
+HOOK_SOURCE       = "Hook event message"
+HOOK_START_FAILED = "Hook event server failed to start"
+HOOK_STOPPED      = "Hook event server stopped"
+
 # I2C
 I2C_SOURCE       = "I2C message"
 I2C_BUS_FAILED   = "I2C bus error"
@@ -181,6 +199,42 @@ class Topic(str, Enum):
     COMMAND  = "COMMAND"
     INCIDENT = "INCIDENT"
 
+class Overflow(StrEnum):
+    """
+    What publish() does when a subscriber's queue is full.
+
+    BLOCK:       wait up to _BLOCK_TIMEOUT for the subscriber to make room,
+                 then drop the new message. Nothing is lost by a short burst;
+                 the publisher stalls while the subscriber is stuck, other
+                 publishers do not, as the wait is outside the bus lock.
+    DROP_OLDEST: drop the oldest queued message to make room.
+    COALESCE:    drop the queued messages from the new message's source, so
+                 only the latest per source is kept, as in the replay cache;
+                 if none are queued, drop the oldest message. Cross-process
+                 queues cannot be searched and drop the oldest message.
+    """
+    BLOCK       = "block"
+    DROP_OLDEST = "drop_oldest"
+    COALESCE    = "coalesce"
+
+# Metrics per topic
+_PUBLISHED = {
+    topic: MetricsRegistry().counter(f"oradio_bus_{topic.lower()}_published_total", f"{topic.title()} messages published")
+    for topic in Topic
+}
+_DELIVERED = {
+    topic: MetricsRegistry().counter(f"oradio_bus_{topic.lower()}_delivered_total", f"{topic.title()} messages queued for subscribers")
+    for topic in Topic
+}
+_DROPPED = {
+    topic: MetricsRegistry().counter(f"oradio_bus_{topic.lower()}_dropped_total", f"{topic.title()} messages dropped by a full subscriber queue")
+    for topic in Topic
+}
+_BLOCKED = {
+    topic: MetricsRegistry().counter(f"oradio_bus_{topic.lower()}_blocked_total", f"{topic.title()} publishes which waited for a full subscriber queue")
+    for topic in Topic
+}
+
 @dataclass(frozen=True) # Immutable after creation
 class CommandMessage:
     """
@@ -235,7 +289,7 @@ class IncidentMessage:
 
 def _fatal_exit(message: str, stacklevel: int = 6, *, exc: BaseException | None = None, code: int = 1) -> NoReturn:
     """
-    Log a fatal error, flush all buffers, and terminate the process.
+    Log a fatal error, flush all buffers, dump the flight recorder, and terminate the process.
 
     Intended for unrecoverable infrastructure failures such as queue
     corruption, invalid internal state, or IPC failure.
@@ -259,6 +313,9 @@ def _fatal_exit(message: str, stacklevel: int = 6, *, exc: BaseException | None
     # Flush the logging framework before exiting so no records are lost.
     oradio_log.shutdown()
 
+    # Save the detail logged before the failure; the crash action uploads it with the logs.
+    oradio_log.dump_flight_recorder()
+
     # Flush console buffers before terminating.
     sys.stderr.flush()
     sys.stdout.flush()
@@ -269,6 +326,120 @@ def _fatal_exit(message: str, stacklevel: int = 6, *, exc: BaseException | None
 
 ##### Pub-Sub Infrastructure ##############################
 
+class _Subscription:
+    """A subscriber queue with its source filter, overflow policy and counters."""
+    __slots__ = ("topic", "name", "queue", "source_filter", "overflow", "dropped", "blocked")
+
+    def __init__(self, topic: Topic, name: str, queue: BusQueue,   # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 source_filter: frozenset[str] | None, overflow: Overflow) -> None:
+        """
+        Args:
+            topic: Topic subscribed to.
+            name: Name in logs and stats.
+            queue: Queue the subscriber reads.
+            source_filter: Sources delivered, or None for all.
+            overflow: Policy when the queue is full.
+        """
+        self.topic = topic
+        self.name = name
+        self.queue = queue
+        self.source_filter = source_filter
+        self.overflow = overflow
+        self.dropped = 0
+        self.blocked = 0
+
+    def _drop(self, count: int = 1) -> None:
+        """Count dropped messages, logging the first and then every _DROP_LOG_INTERVAL."""
+        before = self.dropped
+        self.dropped += count
+        _DROPPED[self.topic].inc(count)
+        if before == 0 or before // _DROP_LOG_INTERVAL != self.dropped // _DROP_LOG_INTERVAL:
+            oradio_log.warning("Subscriber %s is not keeping up: %d messages dropped (%s)",
+                               self.name, self.dropped, self.overflow.value)
+
+    def _coalesce(self, source: str) -> int:
+        """Remove the queued messages from source; return how many were removed."""
+        queue = self.queue
+        if not isinstance(queue, LocalQueue):
+            return 0
+        with queue.mutex:
+            kept = [queued for queued in queue.queue if getattr(queued, "source", None) != source]
+            removed = len(queue.queue) - len(kept)
+            if removed:
+                queue.queue.clear()
+                queue.queue.extend(kept)
+                queue.unfinished_tasks -= removed
+                queue.not_full.notify(removed)
+        return removed
+
+    def _drop_oldest(self) -> None:
+        """Remove the oldest queued message, if the consumer did not take it meanwhile."""
+        try:
+            if isinstance(self.queue, LocalQueue):
+                self.queue.get_nowait()
+            else:
+                self.queue.get(timeout=_FEEDER_TIMEOUT)
+            self._drop()
+        except Empty:
+            pass
+
+    def put(self, message: CommandMessage | IncidentMessage) -> bool | None:
+        """
+        Queue message without waiting, applying the overflow policy if the
+        queue is full.
+
+        Returns:
+            True if the message was queued, False if it was dropped, None if
+            the queue is full and the policy is Overflow.BLOCK: the caller
+            then calls put_wait() once it no longer holds the bus lock.
+        """
+        try:
+            safe_put(self.queue, message, timeout=0)
+            return True
+        except Full:
+            pass
+
+        if self.overflow is Overflow.BLOCK:
+            return None
+
+        if self.overflow is Overflow.COALESCE and (removed := self._coalesce(message.source)):
+            self._drop(removed)
+        else:
+            self._drop_oldest()
+        try:
+            safe_put(self.queue, message, timeout=0)
+            return True
+        except Full:
+            # Cross-process queue whose oldest message is still in its feeder thread
+            self._drop()
+            return False
+
+    def put_wait(self, message: CommandMessage | IncidentMessage) -> bool:
+        """
+        Wait up to _BLOCK_TIMEOUT for room for message, else drop it.
+
+        Returns:
+            True if the message was queued, False if it was dropped.
+        """
+        self.blocked += 1
+        _BLOCKED[self.topic].inc()
+        try:
+            safe_put(self.queue, message, timeout=_BLOCK_TIMEOUT)
+            return True
+        except Full:
+            self._drop()
+            return False
+
+    def stats(self) -> dict[str, Any]:
+        """Return the name, policy, queue depth and drop and block counts."""
+        return {
+            "name": self.name,
+            "overflow": self.overflow.value,
+            "depth": self.queue.qsize(),
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+        }
+
 @singleton
 class PubSubManager:
     """
@@ -276,22 +447,25 @@ class PubSubManager:
     delivery for all pub-sub topics.
 
     Maintains subscriber queues and provides thread-safe subscribe,
-    unsubscribe, and publish operations. The implementation uses
-    multiprocessing primitives to support communication between
-    threads and Linux forked child processes.
+    unsubscribe, and publish operations. A subscriber in this process
+    gets an in-process queue, which passes the message object itself:
+    no pickling, pipe or feeder thread. A subscriber which must receive
+    messages published in forked child processes (or lives in one)
+    subscribes with cross_process=True and gets a multiprocessing queue.
     """
     def __init__(self) -> None:
         """
         Initialise subscriber registries and message caches.
         """
-        # Each subscriber entry is a (queue, source_filter) pair.
-        # source_filter is a frozenset of allowed source names, or None to
-        # receive messages from all sources.
+        # Each subscriber entry holds its queue, its source_filter (a
+        # frozenset of allowed source names, or None to receive messages
+        # from all sources) and its overflow policy.
         # Built from the Topic enum so adding a new topic member
         # automatically gets registries here too.
-        self._subscribers: dict[Topic, list[tuple[Queue, frozenset[str] | None]]] = {
+        self._subscribers: dict[Topic, list[_Subscription]] = {
             topic: [] for topic in Topic
         }
+        self._subscribed_count = 0
 
         # Cache of the most recent message per source, per topic.
         # New subscribers receive all cached messages on subscribe so they
@@ -305,7 +479,9 @@ class PubSubManager:
         # just across threads within one process.
         self._lock = Lock()
 
-    def subscribe(self, topic: Topic, sources: tuple[str, ...] | None = None) -> Queue:
+    def subscribe(self, topic: Topic, sources: tuple[str, ...] | None = None,     # pylint: disable=too-many-arguments,too-many-positional-arguments
+                  cross_process: bool = False, overflow: Overflow = Overflow.BLOCK,
+                  name: str | None = None) -> BusQueue:
         """
         Register a new subscriber for a topic, optionally filtering messages by source.
 
@@ -315,6 +491,12 @@ class PubSubManager:
         Args:
             topic: Topic to subscribe to.
             sources: Optional source filter.
+            cross_process: Use a multiprocessing queue, for a subscriber which
+                must receive messages published in forked child processes, or
+                which lives in one. Messages are then pickled on every publish.
+            overflow: What to do when the subscriber's queue is full, see Overflow.
+            name: Name of the subscriber in logs and stats; defaults to the
+                topic and a sequence number.
 
         Returns:
             Subscriber queue.
@@ -332,8 +514,12 @@ class PubSubManager:
         source_filter: frozenset[str] | None = frozenset(sources) if sources is not None else None
 
         with self._lock:
-            queue: Queue = Queue(_MAX_QUEUE_SIZE)
-            self._subscribers[topic].append((queue, source_filter))
+            queue: BusQueue = Queue(_MAX_QUEUE_SIZE) if cross_process else LocalQueue(_MAX_QUEUE_SIZE)
+            self._subscribed_count += 1
+            subscription = _Subscription(
+                topic, name or f"{topic.value.lower()}-{self._subscribed_count}", queue, source_filter, overflow
+            )
+            self._subscribers[topic].append(subscription)
 
             # Replay happens inside the lock so a concurrent publish cannot
             # slip between the cache replay and the queue registration,
@@ -343,13 +529,13 @@ class PubSubManager:
             for cached_message in self._last_messages[topic].values():
                 if source_filter is not None and cached_message.source not in source_filter:
                     continue
-                # safe_put calls _fatal_exit on queue failure; the lock is
+                # put() calls _fatal_exit on queue failure; the lock is
                 # still held but os._exit is immediate so no deadlock can occur.
-                safe_put(queue, cached_message)
+                subscription.put(cached_message)
 
         return queue
 
-    def unsubscribe(self, topic: Topic, queue: Queue) -> None:
+    def unsubscribe(self, topic: Topic, queue: BusQueue) -> None:
         """
         Remove a subscriber queue from a topic.
 
@@ -367,7 +553,7 @@ class PubSubManager:
             # Identity comparison (is), not equality: we want the exact Queue
             # object returned by subscribe(), not one that merely compares
             # equal to it. Do not change this to '=='.
-            entry = next((e for e in self._subscribers[topic] if e[0] is queue), None)
+            entry = next((e for e in self._subscribers[topic] if e.queue is queue), None)
             if entry is None:
                 oradio_log.warning("unsubscribe called for a queue not registered on topic %r — ignored", topic)
                 return
@@ -390,23 +576,57 @@ class PubSubManager:
         if topic not in self._subscribers:
             _fatal_exit(f"Unknown topic: {topic!r}")
 
+        _PUBLISHED[topic].inc()
+        delivered = 0
+        waiting: list[_Subscription] = []
         with self._lock:
             # Update the cache inside the lock so it stays consistent with
             # what has been delivered to subscribers.
             self._last_messages[topic][message.source] = message
 
-            for queue, source_filter in self._subscribers[topic]:
+            for subscription in self._subscribers[topic]:
                 # Apply the source filter before touching the queue so
                 # filtered-out messages never consume queue space.
-                if source_filter is not None and message.source not in source_filter:
+                if subscription.source_filter is not None and message.source not in subscription.source_filter:
                     continue
-                # safe_put calls _fatal_exit on queue failure; the lock is
+                # A full queue is handled by the subscription's overflow policy.
+                # put() calls _fatal_exit on queue failure; the lock is
                 # still held but os._exit is immediate so no deadlock can occur.
-                safe_put(queue, message)
+                queued = subscription.put(message)
+                if queued is None:
+                    waiting.append(subscription)
+                else:
+                    delivered += queued
+
+        # Wait for full Overflow.BLOCK queues outside the lock, so a slow
+        # subscriber stalls only this publisher, not the other topic,
+        # other publishers or subscribe()/unsubscribe().
+        for subscription in waiting:
+            delivered += subscription.put_wait(message)
+        _DELIVERED[topic].inc(delivered)
+
+    def subscriber_stats(self) -> dict[str, list[dict[str, Any]]]:
+        """Return per topic the stats of each subscriber, see _Subscription.stats()."""
+        with self._lock:
+            return {
+                topic.value: [subscription.stats() for subscription in subscriptions]
+                for topic, subscriptions in self._subscribers.items()
+            }
 
 # Global PubSub manager (singleton — only one instance per process).
 _pubsub = PubSubManager()
 
+def _max_depth(topic: Topic) -> int:
+    """Return the number of messages waiting in the fullest subscriber queue of topic."""
+    return max((entry["depth"] for entry in _pubsub.subscriber_stats()[topic.value]), default=0)
+
+# A subscriber falling behind shows here before it drops messages
+for _topic in Topic:
+    MetricsRegistry().gauge(
+        f"oradio_bus_{_topic.lower()}_max_depth", f"Messages waiting in the fullest {_topic.lower()} subscriber queue",
+        partial(_max_depth, _topic),
+    )
+
 ##### Public API ##########################################
 
 class Commands:
@@ -415,20 +635,22 @@ class Commands:
     """
 
     @staticmethod
-    def subscribe(sources: tuple[str, ...] | None = None) -> Queue:
+    def subscribe(sources: tuple[str, ...] | None = None, cross_process: bool = False,
+                  overflow: Overflow = Overflow.BLOCK, name: str | None = None) -> BusQueue:
         """
         Subscribe to command messages.
 
         Args:
             sources: Optional source filter.
+            cross_process, overflow, name: See PubSubManager.subscribe().
 
         Returns:
             Subscriber queue.
         """
-        return _pubsub.subscribe(Topic.COMMAND, sources)
+        return _pubsub.subscribe(Topic.COMMAND, sources, cross_process, overflow, name)
 
     @staticmethod
-    def unsubscribe(queue: Queue) -> None:
+    def unsubscribe(queue: BusQueue) -> None:
         """
         Remove a queue from the COMMAND topic.
 
@@ -464,20 +686,22 @@ class Incidents:
     """
 
     @staticmethod
-    def subscribe(sources: tuple[str, ...] | None = None) -> Queue:
+    def subscribe(sources: tuple[str, ...] | None = None, cross_process: bool = False,
+                  overflow: Overflow = Overflow.BLOCK, name: str | None = None) -> BusQueue:
         """
         Subscribe to incident messages.
 
         Args:
             sources: Optional source filter.
+            cross_process, overflow, name: See PubSubManager.subscribe().
 
         Returns:
             Subscriber queue.
         """
-        return _pubsub.subscribe(Topic.INCIDENT, sources)
+        return _pubsub.subscribe(Topic.INCIDENT, sources, cross_process, overflow, name)
 
     @staticmethod
-    def unsubscribe(queue: Queue) -> None:
+    def unsubscribe(queue: BusQueue) -> None:
         """
         Remove a queue from the INCIDENT topic.
 
@@ -507,7 +731,7 @@ class Incidents:
 
         _pubsub.publish(Topic.INCIDENT, message)
 
-def safe_get(queue: Queue) -> Any:
+def safe_get(queue: BusQueue) -> Any:
     """
     Return the next message from a queue.
 
@@ -538,22 +762,33 @@ def safe_get(queue: Queue) -> Any:
         # Rare internal multiprocessing queue failure.
         _fatal_exit("Queue internal error on get", exc=ex_err)
 
-def safe_put(queue: Queue, message: object) -> None:
+def safe_put(queue: BusQueue, message: object, timeout: float | None = None) -> None:
     """
     Safely put a message into a queue.
 
-    Terminates the process if the queue cannot be written to.
+    Terminates the process if the queue cannot be written to. A full queue
+    is fatal too, unless a timeout is given.
 
     Args:
         queue:   The queue to put the message into.
         message: The object to put.
+        timeout: Seconds to wait for room, 0 for none; None to treat a
+                 full queue as fatal.
+
+    Raises:
+        Full: If a timeout is given and the queue is still full after it.
     """
     try:
-        queue.put_nowait(message)
+        if timeout:
+            queue.put(message, timeout=timeout)
+        else:
+            queue.put_nowait(message)
 
     except Full:
-        # A full queue indicates a runaway producer or stalled consumer —
-        # treat it as a critical infrastructure failure.
+        if timeout is not None:
+            raise
+        # Without an overflow policy a full queue indicates a runaway
+        # producer or stalled consumer — treat it as a critical infrastructure failure.
         _fatal_exit(f"Queue overflow while publishing message: {message}")
 
     except (OSError, EOFError, ValueError) as ex_err:
@@ -583,7 +818,7 @@ class MessageHandlerTemplate(ThreadTemplate):
     sentinel unblocks the pending get(), the worker's loop condition is already
     false and it exits on the next check instead of blocking on get() again.
     """
-    def __init__(self, queue: Queue) -> None:
+    def __init__(self, queue: BusQueue) -> None:
         """
         Initialize the message handler and start the worker thread.
 
@@ -631,8 +866,12 @@ class MessageHandlerTemplate(ThreadTemplate):
             # do_work() (and blocking on get()) again.
             self._stop_event.set()
 
-        # Wake the worker thread out of its blocking safe_get().
-        safe_put(self._queue, self._stop_sentinel)
+        # Wake the worker thread out of its blocking safe_get(). The worker
+        # is still draining, so a full queue soon has room.
+        try:
+            safe_put(self._queue, self._stop_sentinel, timeout=_BLOCK_TIMEOUT)
+        except Full:
+            oradio_log.warning("%s queue stays full; cannot wake its worker to stop", self.__class__.__name__)
 
         # Uses safe_stop()'s own default timeout; it already logs a
         # warning on timeout, so no extra logging is needed here.
@@ -689,7 +928,7 @@ class DebugMessageHandler(MessageHandlerTemplate):
     includes an index to distinguish multiple handlers subscribed to the
     same topic.
     """
-    def __init__(self, queue: Queue, index: int | None = None) -> None:
+    def __init__(self, queue: BusQueue, index: int | None = None) -> None:
         """
         Initialize the debug message handler.
 
@@ -714,7 +953,7 @@ class DebugMessageHandler(MessageHandlerTemplate):
         tag = "" if self._index is None else f"[{self._index}]"
         oradio_log.debug("DebugMessageHandler%s received: %s", tag, message)
 
-    def get_queue(self) -> Queue:
+    def get_queue(self) -> BusQueue:
         """
         Return the underlying subscription queue.
 
@@ -743,6 +982,7 @@ if __name__ == '__main__':
         Allows subscribing and unsubscribing multiple handlers, publishing
         command and incident messages from both threads and the main process, and
         deliberately triggering the invalid-message fatal-exit path.
+        For throughput and latency, run module_test/messaging_benchmark.py.
 
         DebugMessageHandler objects are stored in command_handlers / incident_handlers,
         keyed by handler index, so individual handlers can be targeted by the stop
@@ -750,7 +990,9 @@ if __name__ == '__main__':
 
         Note: options 8 and 9 publish from a forked child process. On Linux
         (fork start method) these messages are received by the parent's
-        subscribers. On Windows and macOS (spawn start method) they are not.
+        cross-process subscribers only; in-process queues are not shared with
+        the child. On Windows and macOS (spawn start method) they are not
+        received at all.
         """
 
         input_selection = (
@@ -787,15 +1029,17 @@ if __name__ == '__main__':
                     break
                 case 1:
                     n = int(input("Enter number of COMMAND handlers to subscribe [1]: ").strip() or "1")
+                    shared = input("Receive messages from child processes? [y/N]: ").strip().lower() == "y"
                     for _ in range(n):
                         print(f"Subscribe COMMAND handler {cmd_index}...")
-                        command_handlers[cmd_index] = DebugMessageHandler(Commands.subscribe(), cmd_index)
+                        command_handlers[cmd_index] = DebugMessageHandler(Commands.subscribe(cross_process=shared), cmd_index)
                         cmd_index += 1
                 case 2:
                     n = int(input("Enter number of INCIDENT handlers to subscribe [1]: ").strip() or "1")
+                    shared = input("Receive messages from child processes? [y/N]: ").strip().lower() == "y"
                     for _ in range(n):
                         print(f"Subscribe INCIDENT handler {err_index}...")
-                        incident_handlers[err_index] = DebugMessageHandler(Incidents.subscribe(), err_index)
+                        incident_handlers[err_index] = DebugMessageHandler(Incidents.subscribe(cross_process=shared), err_index)
                         err_index += 1
                 case 3:
                     if not command_handlers:
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@references:
+    https://prometheus.io/docs/instrumenting/exposition_formats/
+@summary: Oradio process-wide metrics registry
+    Counters, gauges and fixed-bucket histograms which modules register
+    once at import and update on their hot paths for the cost of a lock
+    and an addition.
+    - A counter or gauge may instead read its value from a function when
+      exported, for values another object already keeps
+    - render_prometheus() serves web_server's /metrics route
+    - summary() is the compact form sent with the RMS heartbeat
+    Imports no Oradio module which logs, not even when stand-alone, so any
+    module, log_service included, can register metrics.
+"""
+from bisect import bisect_left
+from typing import TypeVar, cast
+from threading import Lock
+from collections.abc import Callable
+
+##### Oradio modules ######################################
+from singleton import singleton
+
+##### LOCAL constants #####################################
+# Default histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Prefix of all metric names, left out of summary() to keep it compact
+NAME_PREFIX = "oradio_"
+
+class Counter:
+    """A value which only goes up."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, function: Callable[[], float] | None = None) -> None:
+        """
+        Args:
+            name: Metric name, ending in _total by convention.
+            description: Help text.
+            function: Returns the value when exported; inc() is not used then.
+        """
+        self.name = name
+        self.description = description
+        self._function = function
+        self._lock = Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        """Add amount to the counter."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """Current value."""
+        if self._function is not None:
+            return self._function()
+        return self._value
+
+class Gauge(Counter):
+    """A value which goes up and down."""
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        """Set the gauge to value."""
+        with self._lock:
+            self._value = value
+
+    def dec(self, amount: float = 1) -> None:
+        """Subtract amount from the gauge."""
+        self.inc(-amount)
+
+class Histogram:
+    """Distribution of observed values over fixed buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        Args:
+            name: Metric name, with the unit as suffix, e.g. _seconds.
+            description: Help text.
+            buckets: Ascending bucket upper bounds; +Inf is added.
+        """
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._lock = Lock()
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add an observation."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        """Return the per-bucket counts (last is +Inf) and the sum."""
+        with self._lock:
+            return list(self._counts), self._sum
+
+    def quantile(self, counts: list[int], fraction: float) -> float:
+        """
+        Return the upper bound of the bucket holding the given fraction of
+        the observations in counts, or the largest bound for the +Inf bucket.
+        Returns 0 without observations.
+        """
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = fraction * total
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound
+        return self.buckets[-1]
+
+M = TypeVar("M", Counter, Gauge, Histogram)
+
+@singleton
+class MetricsRegistry:
+    """
+    Singleton registry of all metrics in the process.
+
+    Registering a name twice returns the metric registered first, so a
+    module reloaded or instantiated twice keeps counting in one place.
+    """
+    def __init__(self) -> None:
+        """Create the empty registry."""
+        self._lock = Lock()
+        self._metrics: dict[str, Counter | Histogram] = {}
+
+##### Helpers #############################################
+
+    def _register(self, metric: M) -> M:
+        """
+        Add metric unless its name is taken; return the registered one.
+
+        Raises:
+            ValueError: If the name is registered for another kind of metric.
+        """
+        with self._lock:
+            registered = self._metrics.setdefault(metric.name, metric)
+        if type(registered) is not type(metric):
+            raise ValueError(f"Metric '{metric.name}' already registered as a {registered.kind}")
+        return cast(M, registered)
+
+##### Public API ##########################################
+
+    def counter(self, name: str, description: str, function: Callable[[], float] | None = None) -> Counter:
+        """Register and return a counter, see Counter."""
+        return self._register(Counter(name, description, function))
+
+    def gauge(self, name: str, description: str, function: Callable[[], float] | None = None) -> Gauge:
+        """Register and return a gauge, see Gauge."""
+        return self._register(Gauge(name, description, function))
+
+    def histogram(self, name: str, description: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Register and return a histogram, see Histogram."""
+        return self._register(Histogram(name, description, buckets))
+
+    def render_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                counts, total = metric.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric.name}_bucket{{le="{bound:g}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'{metric.name}_bucket{{le="+Inf"}} {cumulative}')
+                lines.append(f"{metric.name}_sum {total:g}")
+                lines.append(f"{metric.name}_count {cumulative}")
+            else:
+                lines.append(f"{metric.name} {metric.value:g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict[str, float | list[float]]:
+        """
+        Return a compact form of all metrics: the value of a counter or
+        gauge, and [count, p50, p95] of a histogram, keyed by the name
+        without the 'oradio_' prefix.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        result: dict[str, float | list[float]] = {}
+        for metric in metrics:
+            name = metric.name.removeprefix(NAME_PREFIX)
+            if isinstance(metric, Histogram):
+                counts, _ = metric.snapshot()
+                result[name] = [sum(counts), metric.quantile(counts, 0.5), metric.quantile(counts, 0.95)]
+            else:
+                value = metric.value
+                result[name] = int(value) if value == int(value) else round(value, 3)
+        return result
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from time import perf_counter
+    from constants import YELLOW, NC
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu() -> None:
+        """Show menu with test options"""
+        input_selection = (
+            "Select a function, input the number:\n"
+            " 0-Quit\n"
+            " 1-Increment a test counter\n"
+            " 2-Observe 1000 test values\n"
+            " 3-Show Prometheus text\n"
+            " 4-Show heartbeat summary\n"
+            " 5-Measure increment overhead\n"
+            "Select: "
+        )
+
+        registry = MetricsRegistry()
+        counter = registry.counter("oradio_test_events_total", "Test events")
+        histogram = registry.histogram("oradio_test_seconds", "Test durations")
+
+        while True:
+            # Not utilities.input_prompt(): metrics must not import modules which log
+            try:
+                test_choice = int(input(input_selection))
+            except (ValueError, EOFError):
+                test_choice = -1
+            match test_choice:
+                case 0:
+                    break
+                case 1:
+                    counter.inc()
+                    print(f"\nCounter is {counter.value:g}\n")
+                case 2:
+                    for step in range(1000):
+                        histogram.observe(step / 1000)
+                    print("\nObserved 0.000 to 0.999 seconds\n")
+                case 3:
+                    print(f"\n{registry.render_prometheus()}")
+                case 4:
+                    print(f"\nSummary: {registry.summary()}\n")
+                case 5:
+                    start = perf_counter()
+                    for _ in range(100000):
+                        counter.inc()
+                    print(f"\nIncrement takes {(perf_counter() - start) * 10:.3f} us\n")
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    interactive_menu()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
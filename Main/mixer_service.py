@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary:
+    Oradio ALSA mixer access module
+    - Keeps one ALSA control handle open for the life of the process,
+      accessed through libasound via ctypes, so a volume change costs a
+      few ioctl()s instead of a fork+exec of `amixer` per control.
+    - Applies several controls in one batched, locked operation.
+    - Falls back to `amixer cset` via the shell when libasound or a
+      control is unavailable, so volume control keeps working regardless.
+@references:
+    https://www.alsa-project.org/alsa-doc/alsa-lib/group___control.html
+"""
+import ctypes
+import ctypes.util
+from threading import Lock
+
+##### Oradio modules ######################################
+from singleton import singleton
+from log_service import oradio_log
+from utilities import run_shell_script
+from metrics import MetricsRegistry
+
+##### LOCAL constants #####################################
+# Sound card index, matches `amixer -c 0`
+ALSA_CARD = 0
+# snd_ctl_elem_iface_t value for mixer controls (SND_CTL_ELEM_IFACE_MIXER)
+SND_CTL_ELEM_IFACE_MIXER = 2
+# Metrics
+_ALSA_WRITES  = MetricsRegistry().counter("oradio_mixer_alsa_writes_total", "Mixer batches written through the ALSA control handle")
+_AMIXER_CALLS = MetricsRegistry().counter("oradio_mixer_amixer_calls_total", "amixer shell calls by the mixer fallback")
+
+class _AlsaElement:
+    """
+    Resolved ALSA control element: the preallocated value container plus
+    the value range needed to convert a percentage the way amixer does.
+    """
+    def __init__(self, value: ctypes.c_void_p, count: int, minimum: int, maximum: int) -> None:
+        self.value = value
+        self.count = count
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def percent_to_raw(self, percent: int) -> int:
+        """
+        Convert a percentage to a raw control value.
+        Mirrors amixer's percent_to_int(), so both backends set identical values.
+        """
+        return self.minimum + round(percent * (self.maximum - self.minimum) * 0.01)
+
+class _AlsaCtlBackend:
+    """
+    Minimal ctypes binding to the libasound control API.
+
+    The control handle is opened once; each control element is resolved on
+    first use and cached, so subsequent writes do no lookups at all.
+    Not thread-safe on its own: MixerService serializes access.
+    """
+    def __init__(self, card: int) -> None:
+        """
+        Load libasound and open the control interface of the sound card.
+
+        Raises:
+            OSError: If libasound cannot be loaded or the card cannot be opened.
+        """
+        library = ctypes.util.find_library("asound")
+        if library is None:
+            raise OSError("libasound not found")
+        self._lib = ctypes.CDLL(library)
+        self._declare_prototypes()
+
+        self._handle = ctypes.c_void_p()
+        err = self._lib.snd_ctl_open(ctypes.byref(self._handle), f"hw:{card}".encode(), 0)
+        if err < 0:
+            raise OSError(f"snd_ctl_open(hw:{card}) failed: {self._strerror(err)}")
+
+        self._elements: dict[str, _AlsaElement] = {}
+
+    def _declare_prototypes(self) -> None:
+        """Declare argument and return types; required for pointers on 64-bit."""
+        lib = self._lib
+        void_p, void_pp = ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p)
+        prototypes = {
+            "snd_ctl_open":                   (ctypes.c_int,   [void_pp, ctypes.c_char_p, ctypes.c_int]),
+            "snd_ctl_close":                  (ctypes.c_int,   [void_p]),
+            "snd_ctl_elem_id_malloc":         (ctypes.c_int,   [void_pp]),
+            "snd_ctl_elem_id_free":           (None,           [void_p]),
+            "snd_ctl_elem_id_set_interface":  (None,           [void_p, ctypes.c_int]),
+            "snd_ctl_elem_id_set_name":       (None,           [void_p, ctypes.c_char_p]),
+            "snd_ctl_elem_info_malloc":       (ctypes.c_int,   [void_pp]),
+            "snd_ctl_elem_info_free":         (None,           [void_p]),
+            "snd_ctl_elem_info_set_id":       (None,           [void_p, void_p]),
+            "snd_ctl_elem_info":              (ctypes.c_int,   [void_p, void_p]),
+            "snd_ctl_elem_info_get_count":    (ctypes.c_uint,  [void_p]),
+            "snd_ctl_elem_info_get_min":      (ctypes.c_long,  [void_p]),
+            "snd_ctl_elem_info_get_max":      (ctypes.c_long,  [void_p]),
+            "snd_ctl_elem_value_malloc":      (ctypes.c_int,   [void_pp]),
+            "snd_ctl_elem_value_free":        (None,           [void_p]),
+            "snd_ctl_elem_value_set_id":      (None,           [void_p, void_p]),
+            "snd_ctl_elem_value_set_integer": (None,           [void_p, ctypes.c_uint, ctypes.c_long]),
+            "snd_ctl_elem_write":             (ctypes.c_int,   [void_p, void_p]),
+            "snd_strerror":                   (ctypes.c_char_p, [ctypes.c_int]),
+        }
+        for name, (restype, argtypes) in prototypes.items():
+            function = getattr(lib, name)
+            function.restype = restype
+            function.argtypes = argtypes
+
+    def _strerror(self, err: int) -> str:
+        """Return the libasound error description for a negative error code."""
+        message = self._lib.snd_strerror(err)
+        return message.decode(errors="replace") if message else str(err)
+
+    def _resolve(self, control: str) -> _AlsaElement:
+        """
+        Look up a mixer control by name and cache its value container and range.
+
+        Raises:
+            OSError: If the control does not exist or cannot be queried.
+        """
+        element = self._elements.get(control)
+        if element is not None:
+            return element
+
+        lib = self._lib
+        elem_id, info, value = ctypes.c_void_p(), ctypes.c_void_p(), ctypes.c_void_p()
+        if lib.snd_ctl_elem_id_malloc(ctypes.byref(elem_id)) < 0:
+            raise OSError("snd_ctl_elem_id_malloc failed")
+        try:
+            lib.snd_ctl_elem_id_set_interface(elem_id, SND_CTL_ELEM_IFACE_MIXER)
+            lib.snd_ctl_elem_id_set_name(elem_id, control.encode())
+
+            if lib.snd_ctl_elem_info_malloc(ctypes.byref(info)) < 0:
+                raise OSError("snd_ctl_elem_info_malloc failed")
+            try:
+                lib.snd_ctl_elem_info_set_id(info, elem_id)
+                err = lib.snd_ctl_elem_info(self._handle, info)
+                if err < 0:
+                    raise OSError(f"control '{control}' not available: {self._strerror(err)}")
+                count = lib.snd_ctl_elem_info_get_count(info)
+                minimum = lib.snd_ctl_elem_info_get_min(info)
+                maximum = lib.snd_ctl_elem_info_get_max(info)
+            finally:
+                lib.snd_ctl_elem_info_free(info)
+
+            # The value container is kept for the life of the process
+            if lib.snd_ctl_elem_value_malloc(ctypes.byref(value)) < 0:
+                raise OSError("snd_ctl_elem_value_malloc failed")
+            lib.snd_ctl_elem_value_set_id(value, elem_id)
+        finally:
+            lib.snd_ctl_elem_id_free(elem_id)
+
+        element = _AlsaElement(value, count, minimum, maximum)
+        self._elements[control] = element
+        return element
+
+    def write(self, volumes: dict[str, int]) -> None:
+        """
+        Write all given controls, setting every channel of each control.
+
+        Args:
+            volumes: Mapping of ALSA control name to volume percentage (0..100).
+
+        Raises:
+            OSError: On the first control that cannot be resolved or written.
+        """
+        lib = self._lib
+        for control, percent in volumes.items():
+            element = self._resolve(control)
+            raw = element.percent_to_raw(percent)
+            for channel in range(element.count):
+                lib.snd_ctl_elem_value_set_integer(element.value, channel, raw)
+            err = lib.snd_ctl_elem_write(self._handle, element.value)
+            if err < 0:
+                raise OSError(f"writing control '{control}' failed: {self._strerror(err)}")
+
+    def close(self) -> None:
+        """Release the cached value containers and close the control handle."""
+        for element in self._elements.values():
+            self._lib.snd_ctl_elem_value_free(element.value)
+        self._elements.clear()
+        self._lib.snd_ctl_close(self._handle)
+
+@singleton
+class MixerService:
+    """
+    Thread-safe access to the ALSA mixer controls of the sound card.
+    - Uses a persistent libasound control handle when available.
+    - Falls back to one `amixer cset` shell call per control otherwise.
+    - Serializes batches so controls set together are applied together.
+    """
+    def __init__(self) -> None:
+        """
+        Open the persistent ALSA control handle.
+        Logs a warning and selects the shell fallback if it cannot be opened.
+        """
+        self._lock = Lock()
+        self._alsa: _AlsaCtlBackend | None = None
+        try:
+            self._alsa = _AlsaCtlBackend(ALSA_CARD)
+            oradio_log.info("Mixer using persistent ALSA control handle")
+        except (OSError, AttributeError) as ex_err:
+            # AttributeError: libasound loaded but lacks an expected symbol
+            oradio_log.warning("Persistent ALSA mixer unavailable, using amixer fallback: %s", ex_err)
+
+    @property
+    def backend(self) -> str:
+        """Name of the active backend: 'alsa' or 'amixer'."""
+        return "alsa" if self._alsa is not None else "amixer"
+
+    def _shell_set_volumes(self, volumes: dict[str, int]) -> bool:
+        """
+        Fallback: set each control with its own `amixer cset` call.
+
+        Returns:
+            True if all controls were set, False if any failed.
+        """
+        success = True
+        for control, percent in volumes.items():
+            _AMIXER_CALLS.inc()
+            result, response = run_shell_script(f"amixer -c {ALSA_CARD} cset name='{control}' {percent}%")
+            if not result:
+                oradio_log.error("Error setting '%s' via amixer: %s", control, response)
+                success = False
+        return success
+
+    def set_volumes(self, volumes: dict[str, int]) -> bool:
+        """
+        Set one or more mixer controls in one batched operation.
+
+        If the persistent handle fails (e.g. a softvol control that does not
+        exist yet), the batch is retried via the amixer fallback.
+
+        Args:
+            volumes: Mapping of ALSA control name to volume percentage (0..100).
+
+        Returns:
+            True if all controls were set, False otherwise.
+        """
+        with self._lock:
+            if self._alsa is not None:
+                try:
+                    self._alsa.write(volumes)
+                    _ALSA_WRITES.inc()
+                    return True
+                except OSError as ex_err:
+                    oradio_log.warning("ALSA mixer write failed, retrying via amixer: %s", ex_err)
+            return self._shell_set_volumes(volumes)
+
+    def close(self) -> None:
+        """Close the persistent handle; later calls use the amixer fallback."""
+        with self._lock:
+            if self._alsa is not None:
+                self._alsa.close()
+                self._alsa = None
+
+##### Stand-alone entry point #############################
+
+if __name__ == '__main__':
+
+    # Imports only relevant when stand-alone
+    from time import perf_counter
+    from constants import YELLOW, NC
+    from utilities import input_prompt      # pylint: disable=ungrouped-imports
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu():
+        """Show menu with test options"""
+
+        # Show menu with test options
+        input_selection = (
+            "Select a function, input the number.\n"
+            " 0-Quit\n"
+            " 1-Show active backend\n"
+            " 2-Set master and system sound volume\n"
+            "Select: "
+        )
+
+        mixer = MixerService()
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    break
+                case 1:
+                    print(f"\nActive mixer backend: {mixer.backend}\n")
+                case 2:
+                    volume = input_prompt("Enter master volume (0..100): ", int, -1)
+                    if not 0 <= volume <= 100:
+                        print(f"\n{YELLOW}Please input a volume in range 0..100{NC}\n")
+                        continue
+                    start = perf_counter()
+                    result = mixer.set_volumes({"Digital Playback Volume": volume, "VolumeSysSound": 90})
+                    print(f"\nresult={result}, took {(perf_counter() - start) * 1000:.2f} ms\n")
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    # Present menu with tests
+    interactive_menu()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
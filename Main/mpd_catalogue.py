@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@references:
+    https://mpd.readthedocs.io/en/latest/protocol.html#querying-mpd-s-status
+@summary:
+    Oradio MPD library catalogue module
+    - Caches library listings (directories, playlists, songs per list)
+      in memory, so browsing costs no MPD round-trips in steady state
+    - Each entry records the MPD idle events it depends on, and is
+      dropped precisely when MPDMonitor reports one of those events
+    - Only caches while MPDMonitor is running: without its events the
+      cache could go stale, so every lookup goes to MPD instead
+"""
+from typing import Any, TypeVar
+from threading import Lock
+from collections.abc import Callable
+
+##### Oradio modules ######################################
+from log_service import oradio_log
+from mpd_monitor import MPDMonitor
+
+##### LOCAL constants #####################################
+# MPD idle events which change the library
+DATABASE_EVENT        = "database"
+STORED_PLAYLIST_EVENT = "stored_playlist"
+
+T = TypeVar("T")
+
+class MPDCatalogue:
+    """
+    Invalidation-aware in-memory cache of MPD library listings.
+
+    Entries are loaded lazily by the caller-supplied loader on first use
+    and kept until an MPD idle event they depend on arrives. A generation
+    counter guards against a load racing with an invalidation: a result
+    loaded while an event arrived is returned but not stored.
+    """
+    def __init__(self) -> None:
+        """Register with MPDMonitor for library change events."""
+        self._lock = Lock()
+        self._entries: dict[str, tuple[Any, frozenset[str]]] = {}
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._monitor = MPDMonitor()
+        self._monitor.add_listener(self.invalidate)
+
+    def invalidate(self, events: set[str]) -> None:
+        """
+        Drop all entries depending on any of the given MPD idle events.
+        Called by MPDMonitor on its worker thread, and by MPDControl after
+        its own library changes so they are visible before the event arrives.
+
+        Args:
+            events: Names of the MPD idle events which fired.
+        """
+        with self._lock:
+            self._generation += 1
+            stale = [key for key, (_, depends_on) in self._entries.items() if depends_on & events]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            oradio_log.debug("Catalogue invalidated by %s: %s", ", ".join(sorted(events)), ", ".join(stale))
+
+    def get(self, key: str, loader: Callable[[], T | None], depends_on: frozenset[str]) -> T | None:
+        """
+        Return the cached entry for key, loading it if not cached.
+
+        Args:
+            key: Name of the entry.
+            loader: Fetches the entry from MPD; returns None on failure,
+                which is passed on to the caller but never cached.
+            depends_on: MPD idle events which invalidate this entry.
+
+        Returns:
+            The cached or freshly loaded entry, or None if loading failed.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+            generation = self._generation
+
+        # Load outside the lock; MPD round-trips must not block other lookups
+        value = loader()
+
+        # Only cache while events keep the entry up to date, and only if no event arrived meanwhile
+        if value is not None and self._monitor.is_running():
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[key] = (value, depends_on)
+        return value
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of cached entries, hits and misses."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self._hits, "misses": self._misses}
@@ -23,6 +23,9 @@ Created on January 10, 2025
     Oradio MPD control module
     - Automatic reconnect if MPD is down or connection drops
     - Retries commands logging error on failure
+    - The current song is read from the event-driven MPDStateCache, falling
+      back to MPD when it is not up to date; command guards (pause, next,
+      stop) query MPD directly, as the cache trails MPD by a round-trip
     Terminology:
     - directory/directories: read-only collection(s) of music files
     - playlist/playlists: collection(s) which can be created, saved, edited and deleted
@@ -30,13 +33,17 @@ Created on January 10, 2025
     - current: the directory/playlist in the playback queue
 """
 from os import path
-from unicodedata import normalize, category
+from time import monotonic
+from threading import Event
 
 ##### Oradio modules ######################################
 from singleton import singleton
 from log_service import oradio_log
 from utilities import load_presets, ThreadTemplate
 from mpd_service import MPDService
+from mpd_state import MPDStateCache, MPDSnapshot
+from mpd_catalogue import MPDCatalogue, DATABASE_EVENT, STORED_PLAYLIST_EVENT
+from mpd_search import MPDSearchIndex, fold
 from messaging import (
     Incidents,
     IncidentMessage,
@@ -57,9 +64,13 @@ DEFAULT_PRESET = "Preset1"  # Used when Play is pressed and the queue is empty
 # entries left behind by an interrupted create sequence.
 _PLAYLIST_DUMMY_URI = "https://dummy.mp3"
 
-# Poll interval for _SongFinishMonitor, matches the previous manual sleep(0.5).
+# Poll interval for _SongFinishMonitor, only used while the MPD state cache
+# is not up to date and the monitor falls back to polling MPD status.
 _MONITOR_POLL_INTERVAL = 0.5  # seconds
 
+# The monitored song is removed this many seconds before its end.
+_MONITOR_END_MARGIN = 0.5     # seconds
+
 class _SongFinishMonitor(ThreadTemplate):
     """
     Background worker (built on ThreadTemplate) that watches a single
@@ -67,13 +78,22 @@ class _SongFinishMonitor(ThreadTemplate):
     it -- either because it finished playing naturally, or because it was
     explicitly preempted by a new play_song() call.
 
-    do_work() polls MPD status every _MONITOR_POLL_INTERVAL seconds; once the
-    monitored song is within 0.5s of its end, it signals its own stop_event
-    so run() exits the loop -- a *natural* finish. teardown() then removes
-    the song from the queue; this runs exactly once, whether the loop ended
-    naturally or via preempt(), mirroring the cleanup guarantee ThreadTemplate
-    provides for any worker. On a natural finish (not a preemption), teardown()
-    also resumes queue playback if the queue still has other songs in it.
+    Driven by the MPDStateCache instead of polling: do_work() sleeps until
+    either a player/playlist event refreshes the cache, or the song's
+    deadline (duration minus _MONITOR_END_MARGIN, extrapolated from the
+    elapsed time in the cached status) passes. Once the monitored song is
+    no longer current, or its deadline has passed, it signals its own
+    stop_event so run() exits the loop -- a *natural* finish. While the
+    cache is not up to date it falls back to polling MPD status every
+    _MONITOR_POLL_INTERVAL seconds. The cache trails MPD by a round-trip,
+    so until it shows the monitored song as current it still holds the
+    state from before play_song() and is treated as not up to date.
+
+    teardown() then removes the song from the queue, read from MPD rather
+    than the cache; this runs exactly once, whether the loop ended naturally
+    or via preempt(), mirroring the cleanup guarantee ThreadTemplate
+    provides for any worker. On a natural finish (not a preemption), teardown() also
+    resumes queue playback if the queue still has other songs in it.
 
     A single persistent instance is reused across songs via monitor():
     ThreadTemplate supports repeated safe_start()/safe_stop() cycles on the
@@ -81,19 +101,28 @@ class _SongFinishMonitor(ThreadTemplate):
     preempt() to stop-and-remove the previous song before starting the next.
     """
 
-    def __init__(self, control: "MPDControl", name: str = "SongFinishMonitor") -> None:
+    def __init__(self, control: "MPDControl", state: MPDStateCache, name: str = "SongFinishMonitor") -> None:
         """
         Args:
             control: The MPDControl instance to issue MPD commands through.
+            state: The MPD state cache whose updates drive this monitor.
             name: Thread name.
         """
-        super().__init__(interval=_MONITOR_POLL_INTERVAL, name=name)
+        # interval=0: do_work() itself blocks on _wake until the next state
+        # update or the song's deadline, so the loop adds no delay.
+        super().__init__(interval=0, name=name)
         self._control = control
+        self._state = state
         self._song_id: int | None = None
+        # True once a cache snapshot showed the monitored song as current
+        self._cache_caught_up = False
         # True while teardown() should skip resuming queue playback, because the
         # stop was forced by preempt() (a new song is about to start right away)
         # rather than the song finishing naturally.
         self._suppress_resume = False
+        # Set by every cache refresh and by preempt(), to wake up do_work()
+        self._wake = Event()
+        self._state.add_listener(self._wake.set)
 
     def monitor(self, song_id: int) -> None:
         """
@@ -107,6 +136,7 @@ class _SongFinishMonitor(ThreadTemplate):
             song_id: MPD song ID (queue entry) to monitor and remove.
         """
         self._song_id = song_id
+        self._cache_caught_up = False
         self._suppress_resume = False
         self.safe_start()
 
@@ -126,6 +156,9 @@ class _SongFinishMonitor(ThreadTemplate):
             safe_stop() timeout.
         """
         self._suppress_resume = True
+        # Set the stop flag before waking do_work(), so it exits at once
+        self._stop_event.set()
+        self._wake.set()
         stopped = self.safe_stop()
         if not stopped:
             oradio_log.warning(
@@ -137,34 +170,39 @@ class _SongFinishMonitor(ThreadTemplate):
     def do_work(self) -> None:
         """
         Check whether the monitored song is still playing. If it has been
-        superseded (skipped, replaced, already removed) or is about to end,
-        signal the run() loop to stop so teardown() can remove it.
+        superseded (skipped, replaced, already removed) or has reached its
+        deadline, signal the run() loop to stop so teardown() can remove it.
+        Otherwise sleep until the next state update or the deadline.
         """
-        status = self._control._execute("status") or {}   # pylint: disable=protected-access
-
-        try:
-            current_song_id = int(status.get("songid", -1))
-        except (TypeError, ValueError):
-            current_song_id = -1
+        snapshot = self._state.snapshot()
+        if snapshot is not None and not self._cache_caught_up:
+            if snapshot.song_id == self._song_id:
+                self._cache_caught_up = True
+            else:
+                snapshot = None     # Still the state from before play_song()
+        if snapshot is None:
+            # Cache not up to date: poll MPD directly
+            status = self._control._execute("status") or {}   # pylint: disable=protected-access
+            snapshot = MPDSnapshot(status, {}, timestamp=monotonic())
+            max_wait: float | None = _MONITOR_POLL_INTERVAL
+        else:
+            max_wait = None
 
-        if current_song_id != self._song_id:
+        if snapshot.song_id != self._song_id:
             self._stop_event.set()
             return
 
-        time_str = status.get("time")
-        if time_str:
-            try:
-                elapsed_str, duration_str = time_str.strip().split(":")
-                elapsed  = float(elapsed_str)
-                duration = float(duration_str)
-                if elapsed >= duration - 0.5:
-                    self._stop_event.set()
-            except (ValueError, AttributeError) as ex_err:
-                # Transient parse failure; will retry on next poll cycle.
-                oradio_log.debug(
-                    "Transient time parse failure for song id %s: '%s' (%s)",
-                    self._song_id, time_str, ex_err,
-                )
+        # Deadline only runs while playing and the duration is known (not a stream)
+        elapsed, duration = snapshot.elapsed_now(), snapshot.duration
+        if snapshot.state == "play" and elapsed is not None and duration is not None:
+            remaining = duration - _MONITOR_END_MARGIN - elapsed
+            if remaining <= 0:
+                self._stop_event.set()
+                return
+            max_wait = remaining if max_wait is None else min(max_wait, remaining)
+
+        self._wake.wait(max_wait)
+        self._wake.clear()
 
     def teardown(self) -> None:
         """
@@ -172,14 +210,9 @@ class _SongFinishMonitor(ThreadTemplate):
         On a natural finish (i.e. not stopped via preempt()), also resume
         queue playback if the queue still has other songs.
         """
-        playlist = self._control._execute("playlistinfo") or []   # pylint: disable=protected-access
-        for song in playlist:
-            if isinstance(song, dict) and int(song.get("id", -1)) == self._song_id:
-                self._control._execute("deleteid", self._song_id)  # pylint: disable=protected-access
-                oradio_log.debug("Removed song id %s from playlist", self._song_id)
-                break
-        else:
-            oradio_log.debug("Song id %s already removed", self._song_id)
+        # Sent blind: MPD answers "No such song" if it was already removed
+        self._control._execute("deleteid", self._song_id, expected_error="No such song")  # pylint: disable=protected-access
+        oradio_log.debug("Song id %s removed from playlist", self._song_id)
 
         if not self._suppress_resume:
             self._control._resume_queue_if_not_empty()   # pylint: disable=protected-access
@@ -199,15 +232,27 @@ class MPDControl(MPDService):
         # Initialise the parent MPDService with crossfade.
         super().__init__(crossfade=MPD_CROSSFADE)
 
+        # Library listings, cached while MPDMonitor reports library changes.
+        self._catalogue = MPDCatalogue()
+
         # Remove any dummy entries left by a prior interrupted playlist creation.
         self._sanitize_playlists()
 
         # Verify presets playlists/directories exist.
         self._validate_presets()
 
+        # Player state kept up to date by MPD idle events on a dedicated
+        # connection, so state reads need no round-trips on this one.
+        self._state = MPDStateCache()
+        self._state.start()
+
+        # Songs searched in memory; built in the background.
+        self._search_index = MPDSearchIndex()
+        self._search_index.start()
+
         # Reused across play_song() calls when idle, to avoid spawning a new
         # OS thread per call in the common (sequential) case. See play_song().
-        self._song_monitor = _SongFinishMonitor(self)
+        self._song_monitor = _SongFinishMonitor(self, self._state)
 
     def update_database(self) -> None:
         """
@@ -221,15 +266,18 @@ class MPDControl(MPDService):
         directories = self.get_directories()
 
         # Stage 1: Update MPD database for each preset's directory (if it exists).
+        commands: list[tuple] = []
         for preset, mpdlist in presets.items():
             if mpdlist and mpdlist in directories:
-                _ = self._execute("update", mpdlist)
+                commands.append(("update", mpdlist))
                 oradio_log.debug("Updating MPD database for preset '%s' (directory: '%s')", preset, mpdlist)
             else:
                 oradio_log.debug("Skipping MPD update for preset '%s' (invalid or missing directory: '%s')", preset, mpdlist)
 
         # Stage 2: Update the rest of the MPD database.
-        _ = self._execute("update")
+        # MPD queues the update jobs in order, so both stages go in one round-trip.
+        commands.append(("update",))
+        _ = self._execute_batch(commands)
         oradio_log.debug("Updating MPD database for all remaining music files")
 
 ##### Helpers #############################################
@@ -246,20 +294,33 @@ class MPDControl(MPDService):
         Args:
             playlist: Name of the playlist to create.
         """
-        self._execute("playlistadd", playlist, _PLAYLIST_DUMMY_URI)
-        self._execute("playlistdelete", playlist, 0)
+        # Create, empty and read back the playlist in one round-trip
+        results = self._execute_batch([
+            ("playlistadd", playlist, _PLAYLIST_DUMMY_URI),
+            ("playlistdelete", playlist, 0),
+            ("listplaylist", playlist),
+        ]) or [None, None, None]
 
         # Verify the playlist is clean; remove any surviving dummy entries.
-        # Iterate in reverse so index-based deletion stays valid.
-        contents = self._execute("listplaylist", playlist) or []
-        for i, entry in reversed(list(enumerate(contents))):
-            uri = entry.get("file") if isinstance(entry, dict) else entry
-            if uri == _PLAYLIST_DUMMY_URI:
-                self._execute("playlistdelete", playlist, i)
+        stale = self._dummy_indices(results[2] or [])
+        if stale:
+            _ = self._execute_batch([("playlistdelete", playlist, i) for i in stale])
+            for i in stale:
                 oradio_log.warning(
                     "Removed stale dummy entry at index %d from playlist '%s'", i, playlist,
                 )
 
+    @staticmethod
+    def _dummy_indices(contents: list) -> list[int]:
+        """
+        Return the indices of dummy entries in a playlist listing, in reverse
+        order so index-based deletion stays valid.
+        """
+        return [
+            i for i, entry in reversed(list(enumerate(contents)))
+            if (entry.get("file") if isinstance(entry, dict) else entry) == _PLAYLIST_DUMMY_URI
+        ]
+
     def _sanitize_playlists(self) -> None:
         """
         Remove any dummy entries left in playlists by a previous interrupted run.
@@ -267,18 +328,44 @@ class MPDControl(MPDService):
         Called once during __init__ to ensure no playlist permanently contains
         the sentinel URI from a prior failed create sequence.
         """
-        for entry in self._execute("listplaylists") or []:
-            name = entry.get("playlist") if isinstance(entry, dict) else None
-            if not name:
-                continue
-            contents = self._execute("listplaylist", name) or []
-            for i, item in reversed(list(enumerate(contents))):
-                uri = item.get("file") if isinstance(item, dict) else item
-                if uri == _PLAYLIST_DUMMY_URI:
-                    self._execute("playlistdelete", name, i)
-                    oradio_log.warning(
-                        "Startup cleanup: removed stale dummy entry from playlist '%s'", name,
-                    )
+        names = [
+            entry["playlist"] for entry in self._execute("listplaylists") or []
+            if isinstance(entry, dict) and entry.get("playlist")
+        ]
+
+        # Read all playlists in one batch, then delete all dummies in another
+        listings = self._list_playlists(names) or []
+        deletes: list[tuple] = []
+        for name, contents in zip(names, listings):
+            for i in self._dummy_indices(contents or []):
+                deletes.append(("playlistdelete", name, i))
+                oradio_log.warning(
+                    "Startup cleanup: removed stale dummy entry from playlist '%s'", name,
+                )
+        if deletes:
+            _ = self._execute_batch(deletes)
+
+    def _list_playlists(self, names: list[str]) -> list[list | None] | None:
+        """
+        Read the contents of the given playlists in one command list.
+
+        MPD stops a command list at the first failing command, so the
+        playlists without a result are read again one by one.
+
+        Args:
+            names: Names of the playlists to read.
+
+        Returns:
+            The contents of each playlist in order (None if it could not be
+            read), or None if MPD could not be queried.
+        """
+        listings = self._execute_batch([("listplaylist", name) for name in names])
+        if listings is None:
+            return None
+        return [
+            listing if listing is not None else self._execute("listplaylist", name)
+            for name, listing in zip(names, listings)
+        ]
 
     def _validate_presets(self) -> None:
         """
@@ -291,11 +378,7 @@ class MPDControl(MPDService):
         user actually pressed that preset button).
         """
         presets = load_presets()
-        playlists = self._execute("listplaylists") or []
-        playlist_names = {
-            p.get("playlist") for p in playlists
-            if isinstance(p, dict) and p.get("playlist")
-        }
+        playlist_names = set(self._playlist_flags())
         directories = set(self.get_directories())
 
         for preset, listname in presets.items():
@@ -308,7 +391,11 @@ class MPDControl(MPDService):
 
     def _current_uri(self) -> str | None:
         """Return the URI of the currently playing song."""
-        current_song = self._execute("currentsong") or {}
+        snapshot = self._state.snapshot()
+        if snapshot is not None:
+            current_song = snapshot.current_song
+        else:
+            current_song = self._execute("currentsong") or {}
         file_uri = current_song.get("file")
 
         if isinstance(file_uri, str):
@@ -317,51 +404,77 @@ class MPDControl(MPDService):
         oradio_log.debug("Current song missing or invalid file: %r", file_uri)
         return None
 
-    def _playlist_first_uri(self, mpdlist: str, valid_names: set[str] | None = None) -> str | None:
+    def _load_directories(self) -> list[str] | None:
         """
-        Return the URI of the first entry in an MPD playlist.
+        Fetch the directory names from MPD, for the catalogue.
 
-        Args:
-            mpdlist: Name of the playlist to check.
-            valid_names: Optional pre-fetched set of existing playlist names.
-                Pass this when the caller already has a fresh `listplaylists`
-                result (e.g. get_playlists() iterating many playlists) to
-                avoid re-issuing that MPD command for every entry. If None,
-                fetched fresh via `listplaylists`.
-        """
-        if valid_names is None:
-            playlists = self._execute("listplaylists") or []
-            valid_names = {
-                p["playlist"]
-                for p in playlists
-                if isinstance(p, dict) and p.get("playlist")
-            }
-
-        if mpdlist not in valid_names:
-            oradio_log.debug("mpdlist '%s' not found in playlists", mpdlist)
+        Returns:
+            Case-insensitive alphabetically sorted list of directory names,
+            or None if MPD could not be queried.
+        """
+        directories = self._execute("listfiles")
+        if directories is None:
             return None
 
-        songs = self._execute("listplaylist", mpdlist) or []
-        if not songs:
-            oradio_log.debug("Playlist '%s' is empty", mpdlist)
+        result = []
+        for directory in directories:
+            if not isinstance(directory, dict):
+                oradio_log.debug("Skipping invalid directory entry: %s", directory)
+                continue
+
+            name = directory.get("directory")
+            if not name or not isinstance(name, str) or not name.strip():
+                oradio_log.debug("Skipping empty or invalid directory name: %s", directory)
+                continue
+
+            result.append(name.strip())
+
+        return sorted(result, key=str.casefold)
+
+    def _load_playlist_flags(self) -> dict[str, bool] | None:
+        """
+        Fetch the playlists and their web radio flag from MPD, for the catalogue.
+
+        A playlist is a web radio if its first entry is an http(s) URI. All
+        playlists are read in one command list instead of one round-trip each.
+
+        Returns:
+            Mapping of playlist name to web radio flag, in case-insensitive
+            alphabetical order, or None if MPD could not be queried.
+        """
+        playlists = self._execute("listplaylists")
+        if playlists is None:
             return None
 
-        first_song = songs[0]
-        file_uri = (
-            first_song.get("file")
-            if isinstance(first_song, dict)
-            else first_song
-        )
+        names = []
+        for playlist in playlists:
+            if not isinstance(playlist, dict):
+                oradio_log.debug("Skipping invalid playlist entry: %s", playlist)
+                continue
 
-        if isinstance(file_uri, str):
-            return file_uri
+            name = playlist.get("playlist")
+            if not isinstance(name, str) or not name.strip():
+                oradio_log.debug("Skipping empty playlist entry: %s", playlist)
+                continue
 
-        oradio_log.debug(
-            "Unexpected song entry type in '%s': %r",
-            mpdlist,
-            file_uri,
-        )
-        return None
+            names.append(name)
+        names.sort(key=str.casefold)
+
+        listings = self._list_playlists(names)
+        if listings is None:
+            return None
+
+        flags = {}
+        for name, songs in zip(names, listings):
+            first_song = songs[0] if songs else None
+            file_uri = first_song.get("file") if isinstance(first_song, dict) else first_song
+            flags[name] = isinstance(file_uri, str) and file_uri.lower().startswith(("http://", "https://"))
+        return flags
+
+    def _playlist_flags(self) -> dict[str, bool]:
+        """Return the cached mapping of playlist name to web radio flag."""
+        flags = self._catalogue.get("playlists", self._load_playlist_flags, frozenset({STORED_PLAYLIST_EVENT}))
+        return flags or {}
 
 ##### Playback functions ##################################
 
@@ -384,11 +497,13 @@ class MPDControl(MPDService):
         Args:
             preset: Optional preset name to load and play.
         """
-        songs_in_queue = self._execute("playlistinfo") or []
+        # Queue and status in one round-trip
+        songs_in_queue, status = self._execute_batch([("playlistinfo",), ("status",)]) or [None, None]
+        songs_in_queue = songs_in_queue or []
 
         # No preset and queue filled: resume current playlist.
         if preset is None and songs_in_queue:
-            status = self._execute("status") or {}
+            status = status or {}
             state  = status.get("state", "").lower()
 
             if state == "play":
@@ -410,8 +525,7 @@ class MPDControl(MPDService):
                 parent_dir = path.dirname(songs_in_queue[0].get("file"))
                 directory  = path.basename(parent_dir)
                 oradio_log.debug("Play random song of directory '%s'", directory)
-                _ = self._execute("shuffle")
-                _ = self._execute("play")
+                _ = self._execute_batch([("shuffle",), ("play",)])
 
             return
 
@@ -425,42 +539,36 @@ class MPDControl(MPDService):
             preset = DEFAULT_PRESET
             oradio_log.debug("No current playlist, using default preset '%s'", preset)
 
-        _ = self._execute("clear")
-
         presets  = load_presets()
         listname = presets.get(preset.lower())
 
         if not listname:
+            _ = self._execute("clear")
             oradio_log.warning("Preset '%s' does not resolve to a playlist", preset)
             Incidents.publish(IncidentMessage(MPD_SOURCE, MPD_PRESET_INVALID))
             return
 
-        playlists = self._execute("listplaylists") or []
-        playlist_names = [
-            name.get("playlist") for name in playlists
-            if isinstance(name, dict) and name.get("playlist")
-        ]
-
-        directories = self.get_directories()
-
-        if listname in playlist_names:
-            _ = self._execute("load", listname)
-            oradio_log.debug("Loaded playlist '%s'", listname)
-        elif listname in directories:
-            _ = self._execute("add", listname)
-            _ = self._execute("shuffle")
-            oradio_log.debug("Added directory '%s' and shuffled", listname)
+        # Clearing the queue goes in the same command list as loading it
+        commands: list[tuple] = [("clear",)]
+        if listname in self._playlist_flags():
+            commands.append(("load", listname))
+            oradio_log.debug("Loading playlist '%s'", listname)
+        elif listname in self.get_directories():
+            commands += [("add", listname), ("shuffle",)]
+            oradio_log.debug("Adding directory '%s' and shuffling", listname)
         else:
+            _ = self._execute("clear")
             oradio_log.warning("Playlist or directory '%s' not found for preset '%s'", listname, preset)
             return
 
         # Disable MPD's own random mode; shuffle was applied at load time for directories.
-        _ = self._execute("random", 0)
+        commands.append(("random", 0))
 
         # Never stop playing music.
-        _ = self._execute("repeat", 1)
+        commands.append(("repeat", 1))
 
-        _ = self._execute("play")
+        commands.append(("play",))
+        _ = self._execute_batch(commands)
         oradio_log.debug("Playback started for: %s", listname)
 
     def play_song(self, song: str) -> None:
@@ -538,6 +646,7 @@ class MPDControl(MPDService):
         naturally and been removed from the queue. Called from
         _SongFinishMonitor.teardown(); no-op if the queue is now empty.
         """
+        # Not from the state cache: it still holds the song just deleted
         if self._execute("playlistinfo"):
             oradio_log.debug("Queue not empty after play_song song finished; resuming queue playback")
             self.play()
@@ -566,14 +675,16 @@ class MPDControl(MPDService):
         Does nothing if playback is not active or a web radio is playing.
         Relies on _execute() to handle expected MPD logical errors.
         """
-        status = self._execute("status") or {}
-        state  = status.get("state", "").lower()
+        # Not from the state cache: it may not reflect a play just sent
+        status, current_song = self._execute_batch([("status",), ("currentsong",)]) or [None, None]
+        state = (status or {}).get("state", "").lower()
 
         if state != "play":
             oradio_log.debug("Ignore next: not currently playing (state=%s)", state)
             return
 
-        if self.is_webradio():
+        file_uri = (current_song or {}).get("file")
+        if isinstance(file_uri, str) and file_uri.lower().startswith(("http://", "https://")):
             oradio_log.debug("Ignore next: current item is a web radio")
             return
 
@@ -621,16 +732,11 @@ class MPDControl(MPDService):
 
         playlist = playlist.strip()
 
-        playlists = self._execute("listplaylists") or []
-        playlist_names = [
-            entry.get("playlist")
-            for entry in playlists
-            if isinstance(entry, dict) and entry.get("playlist")
-        ]
-
-        if playlist not in playlist_names:
+        if playlist not in self._playlist_flags():
             oradio_log.debug("Creating playlist '%s'", playlist)
             self._create_empty_playlist(playlist)
+            # Make the change visible before MPD's stored_playlist event arrives
+            self._catalogue.invalidate({STORED_PLAYLIST_EVENT})
             oradio_log.debug("Playlist '%s' created", playlist)
         else:
             oradio_log.debug("Playlist '%s' already exists", playlist)
@@ -659,6 +765,7 @@ class MPDControl(MPDService):
             # it can be dropped after testing direct-from-disk reads
             # immediately after playlistadd/playlistdelete.
             _ = self._execute("listplaylistinfo", playlist)
+            self._catalogue.invalidate({STORED_PLAYLIST_EVENT})
 
             oradio_log.debug("Song '%s' added to playlist '%s'", song, playlist)
 
@@ -682,15 +789,9 @@ class MPDControl(MPDService):
 
         if not song:
             oradio_log.debug("Attempting to remove playlist '%s'", playlist)
-            playlists = self._execute("listplaylists") or []
-            playlist_names = [
-                entry.get("playlist")
-                for entry in playlists
-                if isinstance(entry, dict) and entry.get("playlist")
-            ]
-
-            if playlist in playlist_names:
+            if playlist in self._playlist_flags():
                 _ = self._execute("rm", playlist)
+                self._catalogue.invalidate({STORED_PLAYLIST_EVENT})
                 oradio_log.debug("Playlist '%s' removed", playlist)
             else:
                 oradio_log.warning("Playlist '%s' does not exist", playlist)
@@ -724,17 +825,13 @@ class MPDControl(MPDService):
         # NOTE: see the matching comment in add() -- kept defensively pending
         # confirmation of whether this is still needed.
         _ = self._execute("listplaylistinfo", playlist)
+        self._catalogue.invalidate({STORED_PLAYLIST_EVENT})
 
         oradio_log.debug("Song '%s' removed from playlist '%s'", song, playlist)
 
 ##### Informative functions ###############################
 
-    def is_webradio(
-        self,
-        preset: str | None = None,
-        mpdlist: str | None = None,
-        known_playlist_names: set[str] | None = None,
-    ) -> bool:
+    def is_webradio(self, preset: str | None = None, mpdlist: str | None = None) -> bool:
         """
         Determine if the current song, a preset, or a playlist is a web radio stream.
 
@@ -746,11 +843,6 @@ class MPDControl(MPDService):
         Args:
             preset: Name of the preset to check.
             mpdlist: Name of the playlist to check.
-            known_playlist_names: Optional pre-fetched set of existing
-                playlist names, forwarded to _playlist_first_uri() to avoid
-                an extra `listplaylists` round-trip when the caller (e.g.
-                get_playlists()) already has a fresh one. Ignored unless
-                mpdlist is given.
 
         Returns:
             True if the URI starts with "http://" or "https://".
@@ -768,12 +860,11 @@ class MPDControl(MPDService):
                 oradio_log.warning("No playlist found for preset: %s", preset)
                 return False
 
-        file_uri = (
-            self._current_uri()
-            if mpdlist is None
-            else self._playlist_first_uri(mpdlist, valid_names=known_playlist_names)
-        )
+        if mpdlist is not None:
+            # Playlist flags come from the catalogue; directories are never web radio
+            return self._playlist_flags().get(mpdlist, False)
 
+        file_uri = self._current_uri()
         return (
             isinstance(file_uri, str)
             and file_uri.lower().startswith(("http://", "https://"))
@@ -781,67 +872,26 @@ class MPDControl(MPDService):
 
     def get_directories(self) -> list[str]:
         """
-        Retrieve available directories from MPD.
+        Retrieve available directories, from the catalogue when cached.
 
         Returns:
             list[str]: Case-insensitive alphabetically sorted list of directory names.
         """
-        directories = self._execute("listfiles") or []
-
-        result = []
-        for directory in directories:
-            if not isinstance(directory, dict):
-                oradio_log.debug("Skipping invalid directory entry: %s", directory)
-                continue
-
-            name = directory.get("directory")
-            if not name or not isinstance(name, str) or not name.strip():
-                oradio_log.debug("Skipping empty or invalid directory name: %s", directory)
-                continue
-
-            result.append(name.strip())
-
-        return sorted(result, key=str.casefold)
+        directories = self._catalogue.get("directories", self._load_directories, frozenset({DATABASE_EVENT}))
+        return list(directories or [])
 
     def get_playlists(self) -> list[dict]:
         """
-        Retrieve available playlists from MPD.
+        Retrieve available playlists, from the catalogue when cached.
 
         Returns:
             list[dict]: Case-insensitive sorted list of dicts with keys:
                         'playlist' (str) and 'webradio' (bool).
         """
-        playlists = self._execute("listplaylists") or []
-
-        # Built once from the listing we already have, so is_webradio() ->
-        # _playlist_first_uri() doesn't re-issue `listplaylists` per entry.
-        # Explicit isinstance(name, str) check (rather than dict.get(...)
-        # truthiness alone) so mypy narrows the element type to plain str,
-        # not "str | None" from dict.get()'s return type.
-        known_playlist_names: set[str] = set()
-        for entry in playlists:
-            if isinstance(entry, dict):
-                name = entry.get("playlist")
-                if isinstance(name, str) and name:
-                    known_playlist_names.add(name)
-
-        result = []
-        for playlist in playlists:
-            if not isinstance(playlist, dict):
-                oradio_log.debug("Skipping invalid playlist entry: %s", playlist)
-                continue
-
-            name = playlist.get("playlist")
-            if not name or not name.strip():
-                oradio_log.debug("Skipping empty playlist entry: %s", playlist)
-                continue
-
-            result.append({
-                "playlist": name,
-                "webradio": self.is_webradio(mpdlist=name, known_playlist_names=known_playlist_names)
-            })
-
-        return sorted(result, key=lambda x: x["playlist"].casefold())
+        return [
+            {"playlist": name, "webradio": webradio}
+            for name, webradio in self._playlist_flags().items()
+        ]
 
     def get_songs(self, mpdlist: str) -> list[dict[str, str]]:
         """
@@ -856,87 +906,135 @@ class MPDControl(MPDService):
                 Playlist songs preserve their stored order; directory songs
                 are sorted by artist name (case-insensitive).
         """
+        songs, _ = self.get_songs_page(mpdlist)
+        return songs
+
+    def get_songs_page(
+        self,
+        mpdlist: str,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[dict[str, str]], int]:
+        """
+        Retrieve a page of songs from a playlist or directory in MPD.
+
+        The list is fetched and sorted once and kept in the catalogue, so
+        each page is a slice of the same array.
+
+        Args:
+            mpdlist (str): Name of the playlist or directory.
+            offset (int): Number of songs to skip.
+            limit (int | None): Max number of songs to return; None returns all.
+
+        Returns:
+            The page of songs, see get_songs(), and the total number of songs.
+        """
         def _safe(value: object, fallback: str) -> str:
             """Return value if it is a non-empty string, otherwise return fallback."""
             return value.strip() if isinstance(value, str) and value.strip() else fallback
 
         if not mpdlist or not str(mpdlist).strip():
             oradio_log.warning("Cannot get songs for invalid mpdlist '%s'", mpdlist)
-            return []
-
-        playlists     = self._execute("listplaylists") or []
-        playlist_names = {
-            p.get("playlist") for p in playlists
-            if isinstance(p, dict) and p.get("playlist")
-        }
+            return [], 0
 
-        if mpdlist in playlist_names:
-            details       = self._execute("listplaylistinfo", mpdlist) or []
+        if mpdlist in self._playlist_flags():
+            command        = "listplaylistinfo"
             sort_by_artist = False  # playlists have a user-defined order; preserve it
             source_type    = "playlist"
+            # Song tags come from the database, so database changes apply too
+            depends_on     = frozenset({STORED_PLAYLIST_EVENT, DATABASE_EVENT})
+        elif mpdlist in self.get_directories():
+            command        = "lsinfo"
+            sort_by_artist = True   # directory songs have no inherent order; sort by artist
+            source_type    = "directory"
+            depends_on     = frozenset({DATABASE_EVENT})
         else:
-            # Only fetch directories when mpdlist isn't already a known
-            # playlist, so the common case (mpdlist is a playlist) skips
-            # this extra MPD round-trip entirely.
-            directories     = self._execute("listfiles") or []
-            directory_names = {
-                d.get("directory") for d in directories
-                if isinstance(d, dict) and d.get("directory")
-            }
+            oradio_log.debug("mpdlist '%s' not found as playlist or directory", mpdlist)
+            return [], 0
+
+        def _load() -> list[dict[str, str]] | None:
+            """Fetch the songs of mpdlist from MPD, for the catalogue."""
+            details = self._execute(command, mpdlist)
+            if details is None:
+                return None
+
+            songs: list[dict[str, str]] = [
+                {
+                    "file":   _safe(d.get("file"),   ""),
+                    "artist": _safe(d.get("artist"), "Unknown artist"),
+                    "title":  _safe(d.get("title"),  "Unknown title"),
+                }
+                for d in details
+                if isinstance(d, dict)
+            ]
 
-            if mpdlist in directory_names:
-                details        = self._execute("lsinfo", mpdlist) or []
-                sort_by_artist = True   # directory songs have no inherent order; sort by artist
-                source_type    = "directory"
-            else:
-                oradio_log.debug("mpdlist '%s' not found as playlist or directory", mpdlist)
-                return []
+            if sort_by_artist:
+                songs.sort(key=lambda x: x["artist"].casefold())
+            return songs
 
-        if not details:
+        songs = self._catalogue.get(f"{source_type}:{mpdlist}", _load, depends_on)
+        if not songs:
             oradio_log.debug("No songs found for %s '%s'", source_type, mpdlist)
-            return []
-
-        songs: list[dict[str, str]] = [
-            {
-                "file":   _safe(d.get("file"),   ""),
-                "artist": _safe(d.get("artist"), "Unknown artist"),
-                "title":  _safe(d.get("title"),  "Unknown title"),
-            }
-            for d in details
-            if isinstance(d, dict)
-        ]
+            return [], 0
 
-        if sort_by_artist:
-            songs.sort(key=lambda x: x["artist"].casefold())
+        end = None if limit is None else offset + limit
+        return songs[offset:end], len(songs)
 
-        return songs
-
-    def search(self, pattern: str) -> list[dict[str, str]]:
+    def search(self, pattern: str, prefix: bool = False) -> list[dict[str, str]]:
         """
         Search for songs by artist or title, removing duplicates.
 
         Args:
-            pattern (str): Search string to match against artist or title.
+            pattern (str): Search words to match against artist or title.
+            prefix (bool): Match words at the start of artist/title words only.
 
         Returns:
             list[dict[str, str]]: Unique songs sorted by normalised artist then title.
                 Each dict has keys: 'file', 'artist', 'title',
                 'normalized_artist', 'normalized_title'.
         """
-        def _normalize(text: str) -> str:
-            """Normalise a string for comparison by removing case and diacritics."""
-            if not isinstance(text, str):
-                return ""
-            text = text.strip().lower()
-            text = normalize('NFD', text)
-            return ''.join(c for c in text if category(c) != 'Mn')
+        songs, _ = self.search_page(pattern, prefix=prefix)
+        return songs
 
+    def search_page(
+        self,
+        pattern: str,
+        prefix: bool = False,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[dict[str, str]], int]:
+        """
+        Search for a page of songs by artist or title, removing duplicates.
+
+        Served from the in-memory search index when it is ready; otherwise
+        falls back to MPD's own search, which ignores prefix and matches
+        the pattern as a whole.
+
+        Args:
+            pattern (str): Search words to match against artist or title.
+            prefix (bool): Match words at the start of artist/title words only.
+            offset (int): Number of matching songs to skip.
+            limit (int | None): Max number of songs to return; None returns all.
+
+        Returns:
+            The page of songs, see search(), and the total number of matches.
+        """
         if not pattern or not isinstance(pattern, str) or not pattern.strip():
             oradio_log.debug("Empty or invalid search pattern: %s", pattern)
-            return []
+            return [], 0
+
+        if self._search_index.ready():
+            return self._search_index.query(pattern, prefix=prefix, offset=offset, limit=limit)
 
-        pattern = pattern.strip()
+        songs = self._search_mpd(pattern.strip())
+        end = None if limit is None else offset + limit
+        return songs[offset:end], len(songs)
 
+    def _search_mpd(self, pattern: str) -> list[dict[str, str]]:
+        """
+        Search via MPD for songs by artist or title, removing duplicates.
+        Fallback for search() while the search index is not ready.
+        """
         results = [
             result
             for field in ('artist', 'title')
@@ -948,9 +1046,9 @@ class MPDControl(MPDService):
             {
                 'file':               result['file'],
                 'artist':             result.get('artist', "Unknown artist"),
-                'normalized_artist':  _normalize(result.get('artist', "Unknown artist")),
+                'normalized_artist':  fold(result.get('artist', "Unknown artist")),
                 'title':              result.get('title', "Unknown title"),
-                'normalized_title':   _normalize(result.get('title', "Unknown title")),
+                'normalized_title':   fold(result.get('title', "Unknown title")),
             }
             for result in results
         ]
@@ -24,10 +24,14 @@ Created on January 10, 2025
       (built on ThreadTemplate, utilities.py), so the monitor can be
       cleanly started, stopped and restarted, and reports crashes instead
       of dying silently.
+    - Lets listeners (e.g. the library catalogue) react to MPD events
+    - Lets database listeners (e.g. the search index) react to the
+      directories whose files were added or removed
 """
 from os import path
 from time import sleep
 from collections import defaultdict
+from collections.abc import Callable
 
 ##### Oradio modules ######################################
 from log_service import oradio_log
@@ -74,16 +78,27 @@ class _MPDMonitorWorker(ThreadTemplate):
         feature, and MPDService deliberately doesn't grow a public
         arbitrary-command method just to serve this one caller.
     """
-    def __init__(self, mpd_service: MPDService) -> None:
+    def __init__(
+        self,
+        mpd_service: MPDService,
+        listeners: list[Callable[[set[str]], None]],
+        database_listeners: list[Callable[[dict[str, set[str]] | None], None]],
+    ) -> None:
         """
         Args:
             mpd_service: The MPDService connection to issue idle/status/
                 listall commands against. Owned and connected by the
                 enclosing MPDMonitor, passed in rather than constructed
                 here, so MPDMonitor controls the connection's lifetime.
+            listeners: Callbacks to notify of each batch of MPD events,
+                owned by MPDMonitor (see MPDMonitor.add_listener()).
+            database_listeners: Callbacks to notify of database changes,
+                owned by MPDMonitor (see MPDMonitor.add_database_listener()).
         """
         super().__init__(interval=0.0, name="MPDMonitorWorker")
         self._mpd_service = mpd_service
+        self._listeners = listeners
+        self._database_listeners = database_listeners
 
         # Snapshot of MPD database: directory -> set of file paths.
         # Rebuilt from scratch in setup() at the start of every run.
@@ -91,6 +106,27 @@ class _MPDMonitorWorker(ThreadTemplate):
 
 ##### Helpers #############################################
 
+    def _notify_listeners(self, events: set[str]) -> None:
+        """Pass a batch of events to all listeners; a failing listener is logged, not fatal."""
+        for listener in list(self._listeners):
+            try:
+                listener(events)
+            except Exception as ex_err:  # pylint: disable=broad-exception-caught
+                oradio_log.error("MPD event listener failed for events %s: %s", ", ".join(sorted(events)), ex_err)
+
+    def _notify_database_listeners(self, changes: dict[str, set[str]] | None) -> None:
+        """Pass database changes to all database listeners; a failing listener is logged, not fatal."""
+        for listener in list(self._database_listeners):
+            try:
+                listener(changes)
+            except Exception as ex_err:  # pylint: disable=broad-exception-caught
+                oradio_log.error("MPD database listener failed: %s", ex_err)
+
+    def _notify_all(self) -> None:
+        """Tell all listeners that events may have been missed."""
+        self._notify_listeners(set(MPD_EVENT_ACTIONS))
+        self._notify_database_listeners(None)
+
     def _build_initial_snapshot(self) -> None:
         """Build the initial snapshot of the MPD database (directory -> files)."""
         for song in self._mpd_service._execute("listall") or []:    # pylint: disable=protected-access
@@ -149,6 +185,9 @@ class _MPDMonitorWorker(ThreadTemplate):
         self._snapshot = defaultdict(set)
         self._build_initial_snapshot()
 
+        # Events may have been missed while not running
+        self._notify_all()
+
     def do_work(self) -> None:
         """
         Process a single batch of MPD idle events.
@@ -162,11 +201,13 @@ class _MPDMonitorWorker(ThreadTemplate):
         down), since otherwise there'd be no pacing at all in that case.
 
         For each batch of events returned by a single idle call:
+            - Notifies listeners of the events.
+            - Diffs the database snapshot for database events and notifies
+              database listeners.
             - Fetches MPD status once for the whole batch.
             - Logs each event with its description.
             - Skips further processing if MPD reports an error.
             - Logs current song info for playlist/player events.
-            - Diffs the database snapshot for database events.
 
         A falsy idle() result normally means a genuine failure (connection
         drop, lock timeout, retries exhausted -- _execute() already logs and
@@ -187,12 +228,31 @@ class _MPDMonitorWorker(ThreadTemplate):
             if self.stopping:
                 return  # Interrupted by stop(), not a real failure.
             oradio_log.error("MPD idle command returned no events or failed")
+            # Events may be missed until idle works again
+            self._notify_all()
             sleep(1)
             return
 
         event_set  = set(events)
+
+        # Notify listeners first, so caches are invalidated as soon as possible
+        self._notify_listeners(event_set)
         detail_map = {event: MPD_EVENT_ACTIONS.get(event, "Unknown event") for event in events}
 
+        # Diff the database snapshot for database events, also when MPD reports
+        # an error below, so database listeners never miss a library change.
+        if "database" in event_set:
+            added, removed = self._handle_database_update()
+            for directory, files in added.items():
+                oradio_log.info("[%s] Added: %d files", directory, len(files))
+            for directory, files in removed.items():
+                oradio_log.info("[%s] Removed: %d files", directory, len(files))
+            # Without added or removed files the tags of existing files changed
+            changed = set(added) | set(removed)
+            self._notify_database_listeners(
+                {directory: set(self._snapshot.get(directory, set())) for directory in changed} if changed else None
+            )
+
         # Fetch status once for the entire event batch.
         status = self._mpd_service._execute("status") or {}
 
@@ -222,17 +282,11 @@ class _MPDMonitorWorker(ThreadTemplate):
                 current_song.get("artist", ""), current_song.get("title", ""),
             )
 
-        # Diff the database snapshot for database events.
-        if "database" in event_set:
-            added, removed = self._handle_database_update()
-            for directory, files in added.items():
-                oradio_log.info("[%s] Added: %d files", directory, len(files))
-            for directory, files in removed.items():
-                oradio_log.info("[%s] Removed: %d files", directory, len(files))
-
     def teardown(self) -> None:
         """Called once when the monitoring loop stops, cleanly or via crash."""
         oradio_log.debug("%s stopping", self.name)
+        # No more events will arrive, so listeners must not rely on earlier ones
+        self._notify_all()
 
 @singleton
 class MPDMonitor:
@@ -278,12 +332,55 @@ class MPDMonitor:
         # test harness below) and by the background worker.
         self._mpd_service = MPDService()
 
+        # Callbacks notified of each batch of MPD events, see add_listener()
+        self._listeners: list[Callable[[set[str]], None]] = []
+
+        # Callbacks notified of database changes, see add_database_listener()
+        self._database_listeners: list[Callable[[dict[str, set[str]] | None], None]] = []
+
         # Created once; safe_start()/safe_stop() can be called on it
         # repeatedly since ThreadTemplate itself supports restarting.
-        self._worker = _MPDMonitorWorker(self._mpd_service)
+        self._worker = _MPDMonitorWorker(self._mpd_service, self._listeners, self._database_listeners)
 
 ##### Public API ##########################################
 
+    def add_listener(self, listener: Callable[[set[str]], None]) -> None:
+        """
+        Register a callback for MPD events.
+
+        The callback is called on the worker thread with the set of event
+        names of each idle batch, so it must return quickly and must not
+        block on MPD. It is also called with all event names whenever
+        events may have been missed: when the worker starts, stops, or
+        its idle call fails.
+
+        Args:
+            listener: Callable taking the set of MPD event names.
+        """
+        self._listeners.append(listener)
+
+    def add_database_listener(self, listener: Callable[[dict[str, set[str]] | None], None]) -> None:
+        """
+        Register a callback for changes of the MPD database.
+
+        The callback is called on the worker thread, after the database
+        snapshot has been diffed, with the directories whose files were
+        added or removed, each mapped to the files it now holds (empty if
+        the directory is gone). It is called with None when the changes
+        are unknown: when the worker starts, stops, or its idle call
+        fails, and when no files were added or removed, so only the tags
+        of existing files changed. Like add_listener() callbacks, it must
+        return quickly and must not block on MPD.
+
+        Args:
+            listener: Callable taking the changed directories, or None.
+        """
+        self._database_listeners.append(listener)
+
+    def is_running(self) -> bool:
+        """Return True if the worker thread is running and delivering events."""
+        return self._worker.is_alive() and not self._worker.stopping
+
     def start(self) -> None:
         """
         Start the background polling thread.
@@ -320,26 +417,17 @@ class MPDMonitor:
         setting the stop flag alone would have to wait for that, possibly
         for a long time. MPD's idle protocol supports interrupting a
         blocked idle() by sending "noidle" on the same connection from
-        another thread, so that's done here directly, bypassing
-        MPDService._execute()'s lock/retry machinery -- that lock is
-        exactly what the blocked idle() call is currently holding, so
-        going through _execute() here would just block until idle()
-        itself returns, which is the problem being worked around.
+        another thread, see MPDService.interrupt_idle().
 
         The stop flag is set before noidle() is sent (rather than left to
         safe_stop() below) so the worker is guaranteed to see the stop
         request as soon as the interrupted idle() call returns, instead of
-        racing to loop back into another blocking idle() first.
+        racing to loop back into another blocking idle() first. If the
+        worker was not idling, safe_stop() still applies -- worst case it
+        waits out its normal join timeout instead of returning early.
         """
         self._worker._stop_event.set()  # pylint: disable=protected-access
-        try:
-            self._mpd_service._client.noidle()  # pylint: disable=protected-access
-        except Exception:  # pylint: disable=broad-exception-caught
-            # Not currently idling, or the connection is already down.
-            # Either way, safe_stop() below still applies -- worst case it
-            # waits out its normal join timeout instead of returning early.
-            pass
-
+        self._mpd_service.interrupt_idle()
         self._worker.safe_stop()
 
 ##### Stand-alone entry point #############################
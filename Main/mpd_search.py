@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@references:
+    https://mpd.readthedocs.io/en/latest/protocol.html#the-music-database
+@summary:
+    Oradio MPD search index module
+    - In-memory index of artist and title of all songs, folded for case
+      and diacritics once when built, so queries need no MPD traffic
+    - Substring and token prefix matching; all words must match
+    - Results sorted by artist and title, with offset/limit pagination
+    - Updated in the background when MPDMonitor reports a database
+      change: only the changed directories are read and patched in
+"""
+from os import path
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from threading import Event, Lock
+from dataclasses import dataclass
+from unicodedata import normalize, category
+
+##### Oradio modules ######################################
+from log_service import oradio_log
+from singleton import singleton
+from mpd_service import MPDService
+from mpd_monitor import MPDMonitor
+from utilities import ThreadTemplate
+
+##### LOCAL constants #####################################
+# Default values for songs without tags, as shown in the web interface
+UNKNOWN_ARTIST = "Unknown artist"
+UNKNOWN_TITLE  = "Unknown title"
+# Delay before retrying a failed rebuild
+REBUILD_RETRY  = 10   # seconds
+
+def fold(text: object) -> str:
+    """Fold a string for comparison by removing case and diacritics."""
+    if not isinstance(text, str):
+        return ""
+    text = normalize('NFD', text.strip().lower())
+    return ''.join(c for c in text if category(c) != 'Mn')
+
+def _tokens(text: str) -> set[str]:
+    """Split folded text into alphanumeric tokens, for prefix matching."""
+    return set(''.join(c if c.isalnum() else ' ' for c in text).split())
+
+def _tag(song: dict, name: str, default: str) -> str:
+    """Return a tag as a string; MPD returns a list for repeated tags."""
+    value = song.get(name)
+    if isinstance(value, list):
+        value = ", ".join(v for v in value if isinstance(v, str))
+    return value if isinstance(value, str) and value.strip() else default
+
+@dataclass(frozen=True) # Immutable after creation, so queries need no lock
+class _IndexData:
+    """
+    One version of the search index.
+
+    Attributes:
+        songs:     Unique songs sorted by folded artist and title, as
+                   returned to callers.
+        keys:      Folded (artist, title) per song, for sorted insertion.
+        texts:     Folded "artist title" per song.
+        corpus:    All texts joined by newlines, scanned with str.find() for
+                   substring matching, which is much faster than a loop.
+        starts:    Offset in corpus of each song's text.
+        positions: Song position per key.
+        tokens:    Sorted unique tokens of all songs, for prefix matching.
+        postings:  Song keys per token; keys rather than positions, so a
+                   patch does not renumber the postings of unchanged songs.
+    """
+    songs: tuple[dict[str, str], ...]
+    keys: tuple[tuple[str, str], ...]
+    texts: tuple[str, ...]
+    corpus: str
+    starts: tuple[int, ...]
+    positions: dict[tuple[str, str], int]
+    tokens: tuple[str, ...]
+    postings: dict[str, frozenset[tuple[str, str]]]
+
+def _key(entry: dict[str, str]) -> tuple[str, str]:
+    """Return the sort and deduplication key of an index entry."""
+    return entry['normalized_artist'], entry['normalized_title']
+
+def _text(entry: dict[str, str]) -> str:
+    """Return the folded text of an index entry, as matched by queries."""
+    return f"{entry['normalized_artist']} {entry['normalized_title']}"
+
+def _index_data(
+    songs: list[dict[str, str]],
+    keys: list[tuple[str, str]],
+    texts: list[str],
+    tokens: list[str],
+    postings: dict[str, frozenset[tuple[str, str]]],
+) -> _IndexData:
+    """Freeze sorted songs and their postings, deriving the corpus and positions."""
+    starts = list(accumulate((len(text) + 1 for text in texts[:-1]), initial=0)) if texts else []
+    return _IndexData(
+        songs=tuple(songs),
+        keys=tuple(keys),
+        texts=tuple(texts),
+        corpus="\n".join(texts),
+        starts=tuple(starts),
+        positions=dict(zip(keys, range(len(keys)))),
+        tokens=tuple(tokens),
+        postings=postings,
+    )
+
+class _IndexPatch:
+    """Mutable copy of index data, patched one key at a time."""
+    def __init__(self, data: _IndexData) -> None:
+        """
+        Args:
+            data: The index data to copy.
+        """
+        self._songs, self._keys, self._texts = list(data.songs), list(data.keys), list(data.texts)
+        self._tokens, self._postings = list(data.tokens), dict(data.postings)
+
+    def remove(self, key: tuple[str, str], entry: dict[str, str]) -> None:
+        """Remove the song of a key and its postings."""
+        position = bisect_left(self._keys, key)
+        del self._songs[position], self._keys[position], self._texts[position]
+        for token in _tokens(_text(entry)):
+            found = self._postings[token] - {key}
+            if found:
+                self._postings[token] = found
+            else:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def insert(self, key: tuple[str, str], entry: dict[str, str]) -> None:
+        """Insert the song of a key in sorted order and add its postings."""
+        position = bisect_left(self._keys, key)
+        self._songs.insert(position, entry)
+        self._keys.insert(position, key)
+        self._texts.insert(position, _text(entry))
+        for token in _tokens(_text(entry)):
+            if token not in self._postings:
+                insort(self._tokens, token)
+            self._postings[token] = self._postings.get(token, frozenset()) | {key}
+
+    def freeze(self) -> _IndexData:
+        """Return the patched index data."""
+        return _index_data(self._songs, self._keys, self._texts, self._tokens, self._postings)
+
+class _SearchIndexWorker(ThreadTemplate):
+    """
+    Background worker which keeps the owning MPDSearchIndex up to date.
+
+    The index is built from the whole database when the worker starts or
+    the changes are unknown. Otherwise only the directories MPDMonitor
+    reports as changed are read, and the previous index is patched.
+
+    Reads use a short-lived MPDService connection of their own, so reading
+    a large database never holds the MPDControl connection, and no
+    connection is left open between the (rare) database changes.
+
+    Note:
+        _execute() is a protected member of MPDService; reaching into it is
+        intentional, see _MPDMonitorWorker for the rationale.
+    """
+    def __init__(self, index: "MPDSearchIndex") -> None:
+        """
+        Args:
+            index: The index to publish updated data to.
+        """
+        super().__init__(interval=0.0, name="MPDSearchIndexWorker")
+        self._index = index
+        self._update = Event()
+        # Requested changes, merged until the worker takes them
+        self._pending_lock = Lock()
+        self._pending: dict[str, set[str]] = {}
+        self._full = True
+        # Library as indexed, only used on the worker thread:
+        # entry per file, files per directory, files per key
+        self._files: dict[str, dict[str, str]] = {}
+        self._directories: dict[str, set[str]] = {}
+        self._by_key: dict[tuple[str, str], set[str]] = {}
+
+    def request(self, changes: dict[str, set[str]] | None = None) -> None:
+        """
+        Request an update; requests arriving during an update are merged.
+
+        Args:
+            changes: Changed directories, see MPDMonitor.add_database_listener(),
+                or None to rebuild from the whole database.
+        """
+        with self._pending_lock:
+            if changes is None:
+                self._full = True
+            else:
+                self._pending.update(changes)
+        self._update.set()
+
+    def _take_request(self) -> tuple[bool, dict[str, set[str]]]:
+        """Return and clear the requested changes: (full rebuild, changed directories)."""
+        with self._pending_lock:
+            full, pending = self._full, self._pending
+            self._full, self._pending = False, {}
+        return full, pending
+
+    @staticmethod
+    def _read(directories: list[str] | None) -> list[dict] | None:
+        """
+        Read songs with their tags. The whole database is read per top-level
+        directory, so a large library does not exceed MPD's output buffer in
+        one response.
+
+        Args:
+            directories: Directories to read the songs of (not recursive),
+                or None to read all songs.
+
+        Returns:
+            List of MPD song dicts, or None if MPD could not be read.
+        """
+        # pylint: disable=protected-access
+        mpd_service = MPDService()
+        try:
+            if directories is not None:
+                songs = []
+                for directory in directories:
+                    entries = mpd_service._execute("lsinfo", directory)
+                    if entries is None:
+                        return None
+                    songs += [entry for entry in entries if isinstance(entry, dict) and "file" in entry]
+                return songs
+
+            root = mpd_service._execute("lsinfo")
+            if root is None:
+                return None
+            songs = [entry for entry in root if isinstance(entry, dict) and "file" in entry]
+            top_level = [entry["directory"] for entry in root if isinstance(entry, dict) and "directory" in entry]
+            for directory in top_level:
+                entries = mpd_service._execute("listallinfo", directory)
+                if entries is None:
+                    return None
+                songs += [entry for entry in entries if isinstance(entry, dict) and "file" in entry]
+            return songs
+        finally:
+            try:
+                mpd_service._client.disconnect()
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass    # Already disconnected
+
+    @staticmethod
+    def _entry(song: dict) -> dict[str, str]:
+        """Create the folded index entry of an MPD song dict."""
+        artist = _tag(song, "artist", UNKNOWN_ARTIST)
+        title  = _tag(song, "title", UNKNOWN_TITLE)
+        return {
+            'file':               song["file"],
+            'artist':             artist,
+            'normalized_artist':  fold(artist),
+            'title':              title,
+            'normalized_title':   fold(title),
+        }
+
+    def _add_file(self, entry: dict[str, str]) -> tuple[str, str]:
+        """Add an entry to the library as indexed and return its key."""
+        self._files[entry['file']] = entry
+        self._directories.setdefault(path.dirname(entry['file']), set()).add(entry['file'])
+        key = _key(entry)
+        self._by_key.setdefault(key, set()).add(entry['file'])
+        return key
+
+    def _remove_file(self, file: str) -> tuple[str, str]:
+        """Remove a file from the library as indexed and return its key."""
+        key = _key(self._files.pop(file))
+        files = self._by_key[key]
+        files.discard(file)
+        if not files:
+            del self._by_key[key]
+        return key
+
+    def _song(self, key: tuple[str, str]) -> dict[str, str] | None:
+        """Return the entry shown for a key: of its first file, so duplicates are listed once."""
+        files = self._by_key.get(key)
+        return self._files[min(files)] if files else None
+
+    def _build(self, songs: list[dict]) -> _IndexData:
+        """Build index data from all MPD song dicts."""
+        self._files, self._directories, self._by_key = {}, {}, {}
+        for song in songs:
+            self._add_file(self._entry(song))
+
+        keys = sorted(self._by_key)
+        entries = [self._files[min(self._by_key[key])] for key in keys]
+        texts = [_text(entry) for entry in entries]
+        postings: dict[str, set[tuple[str, str]]] = {}
+        for key, text in zip(keys, texts):
+            for token in _tokens(text):
+                postings.setdefault(token, set()).add(key)
+
+        return _index_data(
+            entries, keys, texts,
+            sorted(postings),
+            {token: frozenset(found) for token, found in postings.items()},
+        )
+
+    def _patch(self, data: _IndexData, changes: dict[str, set[str]], songs: list[dict]) -> _IndexData:
+        """
+        Patch index data with the songs read from the changed directories.
+        Only the songs, texts and postings of changed keys are touched; the
+        corpus is joined again, which is a single copy.
+        """
+        touched: set[tuple[str, str]] = set()
+        for directory in changes:
+            for file in self._directories.pop(directory, set()):
+                touched.add(self._remove_file(file))
+        for song in songs:
+            touched.add(self._add_file(self._entry(song)))
+
+        patch = _IndexPatch(data)
+        for key in sorted(touched):
+            old = data.songs[data.positions[key]] if key in data.positions else None
+            new = self._song(key)
+            if old == new:
+                continue
+            if old is not None:
+                patch.remove(key, old)
+            if new is not None:
+                patch.insert(key, new)
+        return patch.freeze()
+
+##### ThreadTemplate overrides ############################
+
+    def setup(self) -> None:
+        """Build the index at the start of every run."""
+        self.request()
+
+    def do_work(self) -> None:
+        """Wait for an update request, then read the changes from MPD and publish the index."""
+        self._update.wait()
+        if self.stopping:
+            return
+        self._update.clear()
+
+        full, changes = self._take_request()
+        previous = self._index.data()
+        if full or previous is None:
+            songs = self._read(None)
+        elif changes:
+            songs = self._read(sorted(directory for directory, files in changes.items() if files))
+        else:
+            return
+
+        if songs is None:
+            oradio_log.error("Reading MPD database for the search index failed")
+            self._index.publish(None)
+            if not self._stop_event.wait(REBUILD_RETRY):
+                self.request()
+            return
+
+        if full or previous is None:
+            data = self._build(songs)
+            oradio_log.info("Search index built: %d songs", len(data.songs))
+        else:
+            data = self._patch(previous, changes, songs)
+            oradio_log.info("Search index updated for %d directories: %d songs", len(changes), len(data.songs))
+        self._index.publish(data)
+
+    def teardown(self) -> None:
+        """Queries must not use an index which is no longer kept up to date."""
+        self._index.publish(None)
+        oradio_log.debug("%s stopping", self.name)
+
+@singleton
+class MPDSearchIndex:
+    """
+    Singleton, in-memory search index of the MPD database.
+
+    Call start() to build it in the background; until it is built, or
+    while MPDMonitor is not running to report database changes, ready()
+    is False and callers should fall back to searching via MPD.
+    """
+    def __init__(self) -> None:
+        """Create the worker and register with MPDMonitor for database changes."""
+        self._lock = Lock()
+        self._data: _IndexData | None = None
+        self._worker = _SearchIndexWorker(self)
+        self._monitor = MPDMonitor()
+        self._monitor.add_database_listener(self._worker.request)
+
+##### Worker interface ####################################
+
+    def publish(self, data: _IndexData | None) -> None:
+        """Swap in new index data, or None if the index is not usable."""
+        with self._lock:
+            self._data = data
+
+    def data(self) -> _IndexData | None:
+        """Return the current index data, or None if not built."""
+        with self._lock:
+            return self._data
+
+##### Public API ##########################################
+
+    def start(self) -> None:
+        """Start the background worker, which builds the index. Idempotent."""
+        if self._worker.is_alive():
+            oradio_log.debug("Search index thread already running")
+            return
+
+        if not self._worker.safe_start() or self._worker.crashed:
+            oradio_log.error("Search index thread failed to start: %s", self._worker.exception)
+            return
+
+        oradio_log.info("Search index thread started")
+
+    def stop(self) -> None:
+        """Stop the background worker, waking it if it waits for a request."""
+        self._worker._stop_event.set()  # pylint: disable=protected-access
+        self._worker.request()
+        self._worker.safe_stop()
+
+    def ready(self) -> bool:
+        """Return True if the index is built and kept up to date."""
+        return self.data() is not None and self._monitor.is_running()
+
+    def query(
+        self,
+        pattern: str,
+        prefix: bool = False,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[dict[str, str]], int]:
+        """
+        Find songs whose artist or title match all words of the pattern.
+
+        Args:
+            pattern: Search words; case and diacritics are ignored.
+            prefix: If True, each word must match the start of a word in the
+                artist or title; otherwise it may match anywhere, like MPD's
+                own search.
+            offset: Number of matching songs to skip.
+            limit: Max number of songs to return; None returns all.
+
+        Returns:
+            The requested page of matching songs, sorted by normalised artist
+            then title, and the total number of matching songs. Each dict has
+            keys: 'file', 'artist', 'title', 'normalized_artist',
+            'normalized_title'. No matches if the index is not built.
+        """
+        data = self.data()
+        # Prefix words are split like the indexed tokens, e.g. "ac/dc" into "ac" and "dc"
+        words = sorted(_tokens(fold(pattern))) if prefix else fold(pattern).split()
+        if data is None or not words:
+            return [], 0
+
+        if prefix:
+            positions = self._prefix_matches(data, words)
+        else:
+            positions = self._substring_matches(data, words)
+
+        end = None if limit is None else offset + limit
+        return [dict(data.songs[i]) for i in positions[offset:end]], len(positions)
+
+    @staticmethod
+    def _prefix_matches(data: _IndexData, words: list[str]) -> list[int]:
+        """Return the positions of songs with a token starting with each word."""
+        matches: set[tuple[str, str]] | None = None
+        for word in words:
+            found: set[tuple[str, str]] = set()
+            position = bisect_left(data.tokens, word)
+            while position < len(data.tokens) and data.tokens[position].startswith(word):
+                found.update(data.postings[data.tokens[position]])
+                position += 1
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+        return sorted(data.positions[key] for key in matches or ())
+
+    @staticmethod
+    def _substring_matches(data: _IndexData, words: list[str]) -> list[int]:
+        """
+        Return the positions of songs containing all words. The longest word
+        is searched in the corpus; only its hits are checked for the others.
+        """
+        words = sorted(words, key=len, reverse=True)
+        longest, others = words[0], words[1:]
+        positions = []
+        hit = data.corpus.find(longest)
+        while hit >= 0:
+            position = bisect_right(data.starts, hit) - 1
+            if all(word in data.texts[position] for word in others):
+                positions.append(position)
+            # Continue after this song's text; each song is matched once
+            if position + 1 >= len(data.starts):
+                break
+            hit = data.corpus.find(longest, data.starts[position + 1])
+        return positions
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from time import perf_counter
+    from constants import YELLOW, NC
+    from utilities import input_prompt              # pylint: disable=ungrouped-imports
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu(index: MPDSearchIndex) -> None:
+        """Show menu with test options"""
+        input_selection = (
+            "\nSelect a function, input the number.\n"
+            " 0-Quit\n"
+            " 1-Show index status\n"
+            " 2-Search (substring)\n"
+            " 3-Search (prefix)\n"
+            "Select: "
+        )
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    break
+                case 1:
+                    data = index.data()
+                    print(f"\nready={index.ready()}, songs={len(data.songs) if data else 0}\n")
+                case 2 | 3:
+                    pattern = input_prompt("Enter search pattern: ", str, "")
+                    start = perf_counter()
+                    songs, total = index.query(pattern, prefix=test_choice == 3, limit=20)
+                    took = (perf_counter() - start) * 1000
+                    for song in songs:
+                        print(f"{song['artist']} - {song['title']}")
+                    print(f"\n{len(songs)} of {total} songs, took {took:.2f} ms\n")
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    # The index is only used while MPDMonitor reports database changes
+    MPDMonitor().start()
+    search_index = MPDSearchIndex()
+    search_index.start()
+
+    # Present menu with tests
+    interactive_menu(search_index)
+
+    search_index.stop()
+    MPDMonitor().stop()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
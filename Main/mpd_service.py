@@ -23,20 +23,25 @@ Created on January 10, 2025
     Oradio MPD service module
     - Automatic reconnect if MPD is down or connection drops
     - Retries commands logging error on failure
+    - Batches command groups into one command list round-trip
     Terminology:
     - directory/directories: read-only collection(s) of music files
     - playlist/playlists: collection(s) which can be created, saved, edited and deleted
     - mpdlist/mpdlists: the combination of directories and playlists
     - current: the directory/playlist in the playback queue
 """
+import re
+from types import GeneratorType
 from typing import Any
-from time import sleep
+from time import sleep, perf_counter
 from threading import Lock  # Safeguard against concurrent access; callers using one thread or process per instance do not require it.
 # Use MPDConnectionError because mpd2 raises a different ConnectionError than Python's built-in one
 from mpd import MPDClient, CommandError, ProtocolError, ConnectionError as MPDConnectionError
 
 ##### Oradio modules ######################################
 from log_service import oradio_log
+from latency_trace import mark, STAGE_MPD
+from metrics import MetricsRegistry
 from messaging import (
     Incidents,
     IncidentMessage,
@@ -51,6 +56,19 @@ MPD_PORT     = 6600
 MPD_RETRIES  = 3
 MPD_BACKOFF  = 1    # seconds between retry attempts, to avoid hammering the MPD server
 LOCK_TIMEOUT = 5    # seconds
+BATCH_SIZE   = 256  # commands per command list, well below MPD's max_command_list_size
+# Commands that change what is heard; only these mark the latency trace
+PLAYBACK_COMMANDS = frozenset({
+    "play", "playid", "pause", "stop", "next", "previous",
+    "seek", "seekid", "seekcur", "clear", "load",
+})
+# Position of the failing command in a command list error: "[50@2] {load} No such playlist"
+_COMMAND_LIST_INDEX = re.compile(r"^\[\d+@(\d+)\]")
+# Metrics, a command list counts as one command
+_COMMANDS = MetricsRegistry().counter("oradio_mpd_commands_total", "MPD commands and command lists sent")
+_RETRIES  = MetricsRegistry().counter("oradio_mpd_retries_total", "MPD command attempts repeated after a connection error or lock timeout")
+_FAILURES = MetricsRegistry().counter("oradio_mpd_failures_total", "MPD commands given up after an unexpected error or all retries")
+_DURATION = MetricsRegistry().histogram("oradio_mpd_command_seconds", "Duration of successful MPD commands")
 
 class MPDService:
     """
@@ -137,14 +155,40 @@ class MPDService:
         oradio_log.error("Failed to connect to MPD after %d attempts", MPD_RETRIES)
         Incidents.publish(IncidentMessage(MPD_SOURCE, MPD_CONNECT_FAILED))
 
-    def _execute(self, command: str, *args, allow_reconnect: bool = True, **kwargs) -> Any | None:
+    @staticmethod
+    def _log_command_error(command: str, ex_cmd: CommandError, expected_error: str | None = None) -> None:
+        """
+        Log a CommandError; expected ones (e.g. "Not playing", or the
+        caller's expected_error) only as a warning.
+        """
+        ignored_errors = ["Not playing"]
+        if expected_error:
+            ignored_errors.append(expected_error)
+        msg = str(ex_cmd)
+        if any(err in msg for err in ignored_errors):
+            oradio_log.warning(
+                "Ignoring expected CommandError: '%s' for command '%s'",
+                msg, command,
+            )
+        else:
+            oradio_log.error("MPD command '%s' failed: %s", command, ex_cmd)
+
+    def _execute(
+        self,
+        command: str,
+        *args,
+        allow_reconnect: bool = True,
+        expected_error: str | None = None,
+        **kwargs,
+    ) -> Any | None:
         """
         Execute an MPD command safely with retry logic and lock protection.
 
         Retries only on connection-related errors. Some expected CommandErrors
         (e.g. "Not playing") are silently ignored; others are logged as errors.
         Acquires the instance lock with a timeout on each attempt to prevent
-        deadlocks.
+        deadlocks. A successful playback command (see PLAYBACK_COMMANDS) marks
+        the thread's latency trace.
 
         Args:
             command (str):          MPD command to execute.
@@ -153,6 +197,9 @@ class MPDService:
                                     _connect_client() before retrying. Pass False
                                     when calling from _connect_client() itself
                                     to prevent infinite recursion. Default is True.
+            expected_error (str | None): CommandError message this call
+                                    expects (e.g. "No such song"); logged
+                                    only as a warning. Default is None.
             **kwargs:               Keyword arguments passed to the command.
 
         Returns:
@@ -166,8 +213,11 @@ class MPDService:
             oradio_log.error("Invalid MPD command: '%s'", command)
             return None
 
+        _COMMANDS.inc()
         for attempt in range(1, MPD_RETRIES + 1):
             acquired = False
+            if attempt > 1:
+                _RETRIES.inc()
             try:
                 # Acquire lock with timeout (therefore not using 'with').
                 acquired = self._lock.acquire(timeout=LOCK_TIMEOUT)     # pylint: disable=consider-using-with
@@ -177,19 +227,15 @@ class MPDService:
                         attempt, MPD_RETRIES, command,
                     )
                 else:
-                    return function(*args, **kwargs)
+                    start = perf_counter()
+                    result = function(*args, **kwargs)
+                    _DURATION.observe(perf_counter() - start)
+                    if command in PLAYBACK_COMMANDS:
+                        mark(STAGE_MPD)
+                    return result
 
             except CommandError as ex_cmd:
-                # Some CommandErrors are expected (e.g. "Not playing"); ignore those and log the rest.
-                ignored_errors = ["Not playing"]
-                msg = str(ex_cmd)
-                if any(err in msg for err in ignored_errors):
-                    oradio_log.warning(
-                        "Ignoring expected CommandError: '%s' for command '%s'",
-                        msg, command,
-                    )
-                else:
-                    oradio_log.error("MPD command '%s' failed: %s", command, ex_cmd)
+                self._log_command_error(command, ex_cmd, expected_error)
                 return None
 
             except (MPDConnectionError, ProtocolError, BrokenPipeError, ConnectionResetError) as ex_err:
@@ -202,6 +248,7 @@ class MPDService:
 
             except Exception as ex_unexpected:  # pylint: disable=broad-exception-caught
                 oradio_log.error("Unexpected error executing MPD command '%s': %s", command, ex_unexpected)
+                _FAILURES.inc()
                 Incidents.publish(IncidentMessage(MPD_SOURCE, MPD_EXECUTE_FAILED))
                 return None
 
@@ -213,11 +260,144 @@ class MPDService:
 
         # All retries exhausted
         oradio_log.error("Failed to execute MPD command '%s' after %d retries", command, MPD_RETRIES)
+        _FAILURES.inc()
+        Incidents.publish(IncidentMessage(MPD_SOURCE, MPD_EXECUTE_FAILED))
+        return None
+
+    def _execute_batch(self, commands: list[tuple], allow_reconnect: bool = True) -> list[Any] | None:
+        """
+        Execute a group of MPD commands as command lists, one round-trip per
+        BATCH_SIZE commands, with the same lock, retry and logging behaviour
+        as _execute().
+
+        MPD executes a command list as a unit: it only starts once the whole
+        list has arrived, and stops at the first failing command. A lost
+        connection therefore retries the complete unfinished list, while a
+        CommandError is not retried: the failing command and the commands
+        after it in the same list get None as their result.
+
+        Args:
+            commands (list[tuple]): Commands as (command, *args) tuples.
+            allow_reconnect (bool): As for _execute().
+
+        Returns:
+            A list with the result of each command in order (None for failed
+            or skipped commands), or None if a command name is invalid or the
+            retries are exhausted.
+        """
+        for command, *_ in commands:
+            if not callable(getattr(self._client, command, None)):
+                oradio_log.error("Invalid MPD command: '%s'", command)
+                return None
+
+        results: list[Any] = []
+        for start in range(0, len(commands), BATCH_SIZE):
+            chunk = commands[start:start + BATCH_SIZE]
+            chunk_results = self._execute_command_list(chunk, allow_reconnect)
+            if chunk_results is None:
+                return None
+            results.extend(chunk_results)
+        return results
+
+    def _send_command_list(self, commands: list[tuple], results: list[Any]) -> None:
+        """
+        Send one command list and append the per-command results to results.
+        The response is iterated, so results before a failing command are kept.
+        """
+        self._client.command_list_ok_begin()    # pylint: disable=no-member
+        for command, *args in commands:
+            getattr(self._client, command)(*args)
+        self._client.iterate = True
+        try:
+            for result in self._client.command_list_end():    # pylint: disable=no-member
+                # List results are lazy in iterate mode; read them before the next result
+                results.append(list(result) if isinstance(result, GeneratorType) else result)
+        finally:
+            self._client.iterate = False
+
+    def _execute_command_list(self, commands: list[tuple], allow_reconnect: bool) -> list[Any] | None:
+        """
+        Send one command list and collect the per-command results.
+        See _execute_batch() for the semantics.
+        """
+        names = ", ".join(command for command, *_ in commands)
+        _COMMANDS.inc()
+        for attempt in range(1, MPD_RETRIES + 1):
+            acquired = False
+            results: list[Any] = []
+            if attempt > 1:
+                _RETRIES.inc()
+            try:
+                # Acquire lock with timeout (therefore not using 'with').
+                acquired = self._lock.acquire(timeout=LOCK_TIMEOUT)     # pylint: disable=consider-using-with
+                if not acquired:
+                    oradio_log.warning(
+                        "Timeout waiting for MPD lock (attempt %d/%d, command list '%s')",
+                        attempt, MPD_RETRIES, names,
+                    )
+                else:
+                    start = perf_counter()
+                    self._send_command_list(commands, results)
+                    _DURATION.observe(perf_counter() - start)
+                    if any(command in PLAYBACK_COMMANDS for command, *_ in commands):
+                        mark(STAGE_MPD)
+                    return results
+
+            except CommandError as ex_cmd:
+                match = _COMMAND_LIST_INDEX.match(str(ex_cmd))
+                failed = int(match.group(1)) if match else len(results)
+                self._log_command_error(commands[min(failed, len(commands) - 1)][0], ex_cmd)
+                return results + [None] * (len(commands) - len(results))
+
+            except (MPDConnectionError, ProtocolError, BrokenPipeError, ConnectionResetError) as ex_err:
+                oradio_log.warning(
+                    "MPD connection error '%s' for command list '%s'. Retry %d/%d...",
+                    ex_err, names, attempt, MPD_RETRIES,
+                )
+                # Drop the half-sent command list, so the retry starts from a clean connection
+                try:
+                    self._client.disconnect()
+                except MPDConnectionError:
+                    pass    # Already disconnected; safe to ignore
+                if allow_reconnect:
+                    self._connect_client()
+
+            except Exception as ex_unexpected:  # pylint: disable=broad-exception-caught
+                oradio_log.error("Unexpected error executing MPD command list '%s': %s", names, ex_unexpected)
+                _FAILURES.inc()
+                Incidents.publish(IncidentMessage(MPD_SOURCE, MPD_EXECUTE_FAILED))
+                return None
+
+            finally:
+                if acquired:
+                    self._lock.release()
+
+            sleep(MPD_BACKOFF)
+
+        # All retries exhausted
+        oradio_log.error("Failed to execute MPD command list '%s' after %d retries", names, MPD_RETRIES)
+        _FAILURES.inc()
         Incidents.publish(IncidentMessage(MPD_SOURCE, MPD_EXECUTE_FAILED))
         return None
 
 ##### Public API ##########################################
 
+    def interrupt_idle(self) -> None:
+        """
+        Make a blocked "idle" on this connection return, by sending "noidle"
+        from another thread.
+
+        Sent directly, bypassing _execute()'s lock/retry machinery: that
+        lock is exactly what the blocked idle() call is currently holding,
+        so going through _execute() would just block until idle() itself
+        returns, which is the problem being worked around.
+        """
+        try:
+            self._client.noidle()   # pylint: disable=no-member
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Not currently idling, or the connection is already down.
+            pass
+
     def get_stats(self) -> dict[str, Any]:
         """
         Retrieve and combine MPD playback statistics and current status.
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@references:
+    https://mpd.readthedocs.io/en/latest/protocol.html#querying-mpd-s-status
+@summary:
+    Oradio MPD state cache module
+    - Keeps an in-memory snapshot of MPD status, current song and queue
+    - Uses its own MPDService connection, parked in "idle", so it never
+      blocks the command connection used by MPDControl
+    - Refreshes only when player/playlist/mixer/options events fire, so
+      reading the state costs no MPD round-trips
+    - Lets subscribers wait for the next update or a song change instead
+      of polling
+    Composes an MPDService connection and a background _MPDStateWorker
+    (built on ThreadTemplate, utilities.py), mirroring MPDMonitor.
+"""
+from time import sleep, monotonic
+from threading import Condition
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+##### Oradio modules ######################################
+from log_service import oradio_log
+from singleton import singleton
+from mpd_service import MPDService
+from utilities import ThreadTemplate
+from messaging import (
+    Incidents,
+    IncidentMessage,
+    MPD_SOURCE,
+    MPD_MONITOR_FAILED,
+)
+
+##### LOCAL constants #####################################
+# Idle subsystems which change status, current song or queue
+STATE_SUBSYSTEMS = ("player", "playlist", "mixer", "options")
+
+@dataclass(frozen=True) # Immutable after creation
+class MPDSnapshot:
+    """
+    Consistent view of the MPD player state at one moment.
+
+    Attributes:
+        status:       Result of the MPD 'status' command.
+        current_song: Result of the MPD 'currentsong' command; empty if none.
+        queue:        Result of the MPD 'playlistinfo' command.
+        events:       Idle events which triggered this refresh; empty for a full refresh.
+        generation:   Incremented on every refresh, for wait_for_update().
+        timestamp:    monotonic() time at which status was fetched.
+    """
+    status: dict
+    current_song: dict
+    queue: tuple = ()
+    events: frozenset[str] = field(default_factory=frozenset)
+    generation: int = 0
+    timestamp: float = 0.0
+
+    @property
+    def song_id(self) -> int | None:
+        """MPD song id of the current song, or None if there is none."""
+        try:
+            return int(self.status["songid"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @property
+    def state(self) -> str:
+        """Player state: 'play', 'pause' or 'stop'."""
+        return str(self.status.get("state", "")).lower()
+
+    def elapsed_now(self) -> float | None:
+        """
+        Estimate the current song's elapsed time in seconds, extrapolated
+        from the snapshot time while playing. None if unknown.
+        """
+        try:
+            elapsed = float(self.status["elapsed"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if self.state == "play":
+            elapsed += monotonic() - self.timestamp
+        return elapsed
+
+    @property
+    def duration(self) -> float | None:
+        """Duration of the current song in seconds, or None if unknown (e.g. a stream)."""
+        try:
+            return float(self.status["duration"])
+        except (KeyError, TypeError, ValueError):
+            pass
+        # Older MPD versions only report "elapsed:duration" in whole seconds
+        try:
+            return float(str(self.status["time"]).split(":")[1]) or None
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    def has_song(self, song_id: int) -> bool:
+        """Return True if the queue holds the song with the given MPD song id."""
+        return any(str(song.get("id")) == str(song_id) for song in self.queue if isinstance(song, dict))
+
+class _MPDStateWorker(ThreadTemplate):
+    """
+    Background worker which waits in MPD idle for state events and
+    refreshes the owning MPDStateCache.
+
+    Note:
+        _execute() is a protected member of MPDService; reaching into it is
+        intentional, see _MPDMonitorWorker for the rationale.
+    """
+    def __init__(self, mpd_service: MPDService, cache: "MPDStateCache") -> None:
+        """
+        Args:
+            mpd_service: Dedicated connection for idle and refresh commands.
+            cache: The cache to publish refreshed snapshots to.
+        """
+        super().__init__(interval=0.0, name="MPDStateWorker")
+        self._mpd_service = mpd_service
+        self._cache = cache
+
+    def _refresh(self, events: frozenset[str]) -> None:
+        """
+        Fetch the state changed by the given events and publish a new snapshot.
+        An empty event set means a full refresh.
+        """
+        # pylint: disable=protected-access
+        previous = self._cache.snapshot()
+
+        status = self._mpd_service._execute("status")
+        if status is None:
+            self._cache.invalidate()
+            return
+        timestamp = monotonic()
+
+        if previous is None or not events or events & {"player", "playlist"}:
+            current_song = self._mpd_service._execute("currentsong") or {}
+        else:
+            current_song = previous.current_song
+
+        if previous is None or not events or "playlist" in events:
+            queue = tuple(self._mpd_service._execute("playlistinfo") or ())
+        else:
+            queue = previous.queue
+
+        self._cache.publish(status, current_song, queue, events, timestamp)
+
+##### ThreadTemplate overrides ############################
+
+    def setup(self) -> None:
+        """Take a full snapshot before the first idle wait of this run."""
+        self._cache.invalidate()
+        self._refresh(frozenset())
+
+    def do_work(self) -> None:
+        """
+        Wait for the next batch of state events and refresh the snapshot.
+
+        A falsy idle() result is either a clean stop (MPDStateCache.stop()
+        sends noidle after setting the stop flag) or a failure; on failure
+        the cache is invalidated, so readers fall back to direct commands,
+        and a full refresh is attempted before the next idle.
+        """
+        # pylint: disable=protected-access
+        if self._cache.snapshot() is None:
+            self._refresh(frozenset())
+
+        events = self._mpd_service._execute("idle", *STATE_SUBSYSTEMS)
+
+        if not events:
+            if self.stopping:
+                return  # Interrupted by stop(), not a real failure.
+            oradio_log.error("MPD state idle command returned no events or failed")
+            self._cache.invalidate()
+            sleep(1)
+            return
+
+        oradio_log.debug("MPD state events: %s", ", ".join(events))
+        self._refresh(frozenset(events))
+
+    def teardown(self) -> None:
+        """Readers must not use a snapshot which is no longer kept up to date."""
+        self._cache.invalidate()
+        oradio_log.debug("%s stopping", self.name)
+
+@singleton
+class MPDStateCache:
+    """
+    Singleton, event-driven cache of the MPD player state.
+
+    Construction only connects to MPD; call start() to begin tracking.
+    While not running, or after a connection failure, snapshot() returns
+    None so callers fall back to querying MPD directly.
+
+    The cache trails MPD by one round-trip: a command sent on another
+    connection is reflected once MPD's resulting idle event is processed.
+    """
+    def __init__(self) -> None:
+        """Connect the dedicated idle connection and create the worker."""
+        self._mpd_service = MPDService()
+        self._condition = Condition()
+        self._snapshot: MPDSnapshot | None = None
+        self._generation = 0
+        self._listeners: list[Callable[[], None]] = []
+        self._worker = _MPDStateWorker(self._mpd_service, self)
+
+##### Worker interface ####################################
+
+    def publish(self, status: dict, current_song: dict, queue: tuple, events: frozenset[str], timestamp: float) -> None:
+        """Store a refreshed snapshot and wake up all waiters and listeners."""
+        with self._condition:
+            self._generation += 1
+            self._snapshot = MPDSnapshot(status, current_song, queue, events, self._generation, timestamp)
+            self._condition.notify_all()
+        self._notify_listeners()
+
+    def invalidate(self) -> None:
+        """Mark the cache as not up to date and wake up all waiters and listeners."""
+        with self._condition:
+            self._snapshot = None
+            self._condition.notify_all()
+        self._notify_listeners()
+
+    def _notify_listeners(self) -> None:
+        """Call every listener; runs on the worker thread, outside the lock."""
+        for listener in list(self._listeners):
+            listener()
+
+##### Public API ##########################################
+
+    def start(self) -> None:
+        """
+        Start the background idle thread; blocks until the first snapshot
+        is taken. Idempotent: no-op if already running.
+        """
+        if self._worker.is_alive():
+            oradio_log.debug("MPD state cache thread already running")
+            return
+
+        if not self._worker.safe_start() or self._worker.crashed:
+            oradio_log.error("MPD state cache thread failed to start: %s", self._worker.exception)
+            Incidents.publish(IncidentMessage(MPD_SOURCE, MPD_MONITOR_FAILED))
+            return
+
+        oradio_log.info("MPD state cache thread started")
+
+    def stop(self) -> None:
+        """
+        Stop the background idle thread. The stop flag is set first, so the
+        worker sees it as soon as noidle interrupts its blocking idle.
+        """
+        self._worker._stop_event.set()  # pylint: disable=protected-access
+        self._mpd_service.interrupt_idle()
+        self._worker.safe_stop()
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Register a callback for snapshot changes: it takes no arguments,
+        as the new state is read with snapshot(). Runs on the cache's
+        worker thread after each refresh and invalidation, so it should
+        only signal, e.g. set an Event, and leave the MPD work to the caller.
+        """
+        self._listeners.append(listener)
+
+    def snapshot(self) -> MPDSnapshot | None:
+        """
+        Return the latest snapshot, or None if the cache is not up to date.
+        Snapshot contents are shared: callers must not modify them.
+        """
+        with self._condition:
+            return self._snapshot
+
+    def wait_for_update(self, generation: int, timeout: float) -> MPDSnapshot | None:
+        """
+        Block until a snapshot newer than generation is available.
+
+        Args:
+            generation: Generation of the snapshot the caller last saw.
+            timeout: Max seconds to wait.
+
+        Returns:
+            The newer snapshot, or None on timeout or if the cache became invalid.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._snapshot is None or self._snapshot.generation > generation,
+                timeout,
+            )
+            if self._snapshot is not None and self._snapshot.generation > generation:
+                return self._snapshot
+            return None
+
+    def wait_song_changed(self, timeout: float) -> MPDSnapshot | None:
+        """
+        Block until the current song changes (or playback ends).
+
+        Args:
+            timeout: Max seconds to wait.
+
+        Returns:
+            The snapshot with the new song, or None on timeout or if the
+            cache is not up to date.
+        """
+        deadline = monotonic() + timeout
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return None
+        song_id = snapshot.song_id
+        while (remaining := deadline - monotonic()) > 0:
+            snapshot = self.wait_for_update(snapshot.generation, remaining)
+            if snapshot is None:
+                return None
+            if snapshot.song_id != song_id:
+                return snapshot
+        return None
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from constants import YELLOW, NC
+    from utilities import input_prompt              # pylint: disable=ungrouped-imports
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu(cache: MPDStateCache) -> None:
+        """
+        Run an interactive self-test menu for MPDStateCache.
+
+        Args:
+            cache: The MPDStateCache instance used to trigger test actions.
+        """
+        input_selection = (
+            "\nSelect a function, input the number.\n"
+            " 0-Quit\n"
+            " 1-Start MPD state cache\n"
+            " 2-Stop MPD state cache\n"
+            " 3-Show cached state\n"
+            " 4-Wait for song change (max 60s)\n"
+            "Select: "
+        )
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    cache.stop()
+                    break
+                case 1:
+                    cache.start()
+                case 2:
+                    cache.stop()
+                case 3:
+                    snapshot = cache.snapshot()
+                    if snapshot is None:
+                        print(f"\n{YELLOW}Cache is not up to date{NC}\n")
+                    else:
+                        print(f"\ngeneration={snapshot.generation}, state={snapshot.state}, events={set(snapshot.events)}")
+                        print(f"current song: {snapshot.current_song.get('file')}")
+                        print(f"queue length: {len(snapshot.queue)}\n")
+                case 4:
+                    print("\nChange song to continue...")
+                    snapshot = cache.wait_song_changed(60)
+                    print(f"\nNew song: {snapshot.current_song.get('file') if snapshot else None}\n")
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    # Launch the interactive test menu; blocks until the user quits.
+    interactive_menu(MPDStateCache())
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
@@ -21,8 +21,11 @@ Created on Januari 31, 2025
 @summary: Oradio control and statemachine
 
 """
+import signal
 import threading
-from time import sleep
+from time import sleep, perf_counter
+from collections import deque
+from collections.abc import Callable
 
 from log_service import oradio_log
 from backlight_service import Backlighting
@@ -34,21 +37,26 @@ from touch_buttons import TouchButtons
 from rms_service import RMService
 from spotify_connect_direct import SpotifyConnect
 from usb_service import USBService
+from hook_events import HookEventServer
 from web_service import WebService
 from wifi_service import WifiService
-from utilities import has_internet
+from utilities import has_internet, ThreadTemplate, JOIN_TIMEOUT
 # from system_sounds import play_sound    # For better readability. pylint: disable=wrong-import-order
-from system_sounds import play_sound
+from system_sounds import play_sound, preload_sounds
+from scheduler import Scheduler, TimerHandle
 from incident_service import IncidentHandler
 from log_monitor import LogHealthMonitor
 from rpi_monitor import RPiThrottlingMonitor
 from power_service import get_power_status
+import latency_trace
+from latency_trace import Trace, STAGE_BUS, STAGE_DISPATCH, STAGE_QUEUE
 
 # Moved from constants
 from messaging import (
     Commands,
     CommandMessage,
     MessageHandlerTemplate,
+    Overflow,
     USB_SOURCE,
     USB_ABSENT,
     USB_PRESENT,
@@ -139,6 +147,9 @@ usb_present.set() # USB present to go over start-up sequence (will be updated af
 remote_monitor = RMService()
 remote_monitor.start()
 
+# Decode the system sounds and open the sound device before the first sound is needed
+preload_sounds()
+
 # Instantiate and start the wifi service for monitoring wifi state
 oradio_wifi_service = WifiService()
 oradio_wifi_service.start()
@@ -178,6 +189,77 @@ leds = LEDControl()
 
 # ----------------------State Machine------------------
 
+# Handler durations kept per state for StateMachine.get_handler_timing()
+HANDLER_TIMING_SAMPLES = 50
+
+class _TransitionExecutor(ThreadTemplate):
+    """
+    Runs state handlers one at a time on a single thread.
+
+    Holds at most one pending state: a state submitted while another is
+    still pending replaces it (latest wins), so rapid button presses run
+    the handler of the state the user ended on instead of every state
+    passed through.
+    """
+    def __init__(self, run: Callable[[str], None]) -> None:
+        """
+        Args:
+            run: Runs the handler of a state.
+        """
+        # do_work() waits on the condition itself
+        super().__init__(interval=0, name="TransitionExecutor")
+        self._run = run
+        self._condition = threading.Condition()
+        self._pending: tuple[str, Trace | None] | None = None
+        self.current: str | None = None     # state whose handler is running
+        self.superseded = 0
+
+    def submit(self, state: str, trace: Trace | None = None) -> None:
+        """
+        Make state the pending state, replacing one not yet started.
+
+        Args:
+            state: State whose handler to run.
+            trace: Latency trace of the button press which caused the transition.
+        """
+        with self._condition:
+            if self._pending is not None:
+                self.superseded += 1
+                oradio_log.debug("Handler for %s superseded by %s", self._pending[0], state)
+            self._pending = (state, trace)
+            self._condition.notify()
+
+    def do_work(self) -> None:
+        """Run the handler of the pending state."""
+        with self._condition:
+            while self._pending is None and not self.stopping:
+                self._condition.wait()
+            pending, self._pending = self._pending, None
+            if pending is None:
+                return
+            state, trace = pending
+            self.current = state
+        if trace is not None:
+            trace.mark(STAGE_QUEUE)
+        try:
+            # The handler's MPD commands mark the trace
+            with latency_trace.activate(trace):
+                self._run(state)
+        # A failing handler must not stop later transitions from being handled
+        except Exception as ex_err:  # pylint: disable=broad-exception-caught
+            oradio_log.error("State handler for %s failed: %s", state, ex_err)
+        finally:
+            self.current = None
+            if trace is not None:
+                trace.finish()
+
+    def safe_stop(self, timeout: float = JOIN_TIMEOUT) -> bool:
+        """Signal the worker to stop, wake it, and wait for it to finish."""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify()
+        return super().safe_stop(timeout)
+
 class StateMachine:
     """Core Oradio application state machine: manages transitions between
     playback, presets, USB presence, web service, and networking states.
@@ -187,6 +269,8 @@ class StateMachine:
         self.state = "StateStartUp"
         self.prev_state: str | None = None
         self.task_lock = threading.Lock()
+        self._executor = _TransitionExecutor(self.run_state_method)
+        self._handler_times: dict[str, deque[float]] = {}
         self._websvc = None  # injected WebService
         self._pd_mode: str | None = None  # track power supply PD state "nom" or "max"
 
@@ -204,7 +288,7 @@ class StateMachine:
             "StateIdle": self._state_idle,
             "StateError": self._state_error,
         }
-        self._delayed_timers: dict[str, threading.Timer] = {}   # key -> Timer
+        self._delayed_timers: dict[str, TimerHandle] = {}   # key -> pending timer
 
     def set_services(self, web_service):
         """Inject the (already-constructed) WebService instance."""
@@ -267,7 +351,7 @@ class StateMachine:
 
             if mpd_control.is_webradio(preset=preset_key) and not has_internet():
                 oradio_log.info("Webradio blocked: no Internet")
-                threading.Timer(2, play_sound, args=(SOUND_NO_INTERNET,)).start()
+                Scheduler().call_later(2, play_sound, SOUND_NO_INTERNET)
                 return True
         return False
 
@@ -285,34 +369,35 @@ class StateMachine:
                 oradio_log.debug("State set to StateUSBAbsent")
 
     def _spawn_state_worker(self) -> None:
-        """Run the state handler in a separate daemon thread."""
-        threading.Thread(
-            target=self.run_state_method, args=(self.state,), daemon=True
-        ).start()
+        """Hand the state handler to the transition executor; superseded pending states are dropped."""
+        if not self._executor.is_alive() and not self._executor.safe_start():
+            oradio_log.error("Transition executor failed to start")
+        # A transition requested while handling a button press carries on its trace
+        trace = latency_trace.current()
+        if trace is not None:
+            trace.mark(STAGE_DISPATCH)
+        self._executor.submit(self.state, trace)
 
     # ---- delayed-transition helpers ----
     def _cancel_all_delayed(self):
         """Cancel and clear all pending delayed transitions."""
         for timer in self._delayed_timers.values():
-            try:
-                timer.cancel()
-            except (RuntimeError, ValueError):
-                pass
+            timer.cancel()
         self._delayed_timers.clear()
 
     def _arm_delayed_transition(self, key: str, delay_s: float, target_state: str):
         """Schedule an interruptible delayed transition; replaces any existing with same key."""
+        if self._executor.current is not None and self._executor.current != self.state:
+            # Handler of a state already left: its follow-up would undo the newer transition
+            oradio_log.debug("Delayed transition %s not armed: state changed to %s", key, self.state)
+            return
+
         old = self._delayed_timers.pop(key, None)
         if old is not None:
-            try:
-                old.cancel()
-            except (RuntimeError, ValueError) as err:
-                oradio_log.debug("Failed to cancel previous timer: %s", err)
+            old.cancel()
 
-        timer = threading.Timer(delay_s, lambda: self.transition(target_state))
-        timer.daemon = True
-        self._delayed_timers[key] = timer
-        timer.start()
+        # A transition may query MPD or the network: keep it off the scheduler thread
+        self._delayed_timers[key] = Scheduler().call_later(delay_s, self.transition, target_state, blocking=True)
 
     def transition(self, requested_state: str) -> None:
         """Request a transition; applies guards and spawns the handler."""
@@ -340,11 +425,35 @@ class StateMachine:
         self._spawn_state_worker()
 
     def run_state_method(self, state_to_handle: str) -> None:
-        """Dispatch state handling to the right handler."""
+        """Dispatch state handling to the right handler, and record how long it took."""
         with self.task_lock:
+            start = perf_counter()
             leds.turn_off_all_leds()
             handler = self._handlers.get(state_to_handle, self._state_unknown)
-            handler()
+            try:
+                handler()
+            finally:
+                duration = perf_counter() - start
+                self._handler_times.setdefault(
+                    state_to_handle, deque(maxlen=HANDLER_TIMING_SAMPLES)
+                ).append(duration)
+                oradio_log.debug("Handler for %s took %.1f ms", state_to_handle, duration * 1000)
+
+    def get_handler_timing(self) -> dict[str, dict[str, float]]:
+        """
+        Return per state the number of recent handler runs and their mean and
+        maximum duration in ms, plus the number of superseded transitions.
+        """
+        timing: dict[str, dict[str, float]] = {}
+        for state, durations in list(self._handler_times.items()):
+            samples = list(durations)
+            timing[state] = {
+                "count": len(samples),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 1),
+                "max_ms": round(max(samples) * 1000, 1),
+            }
+        timing["superseded"] = {"count": self._executor.superseded}
+        return timing
 
     # --- State handlers ---
 
@@ -502,9 +611,7 @@ def on_wifi_connected():
     oradio_log.info("Wifi is connected acknowledged")
 
     if state_machine.state in PLAY_WEBSERVICE_STATES:  # If in play states,
-        threading.Timer(
-            4, play_sound, args=(SOUND_WIFI,)
-        ).start()
+        Scheduler().call_later(4, play_sound, SOUND_WIFI)
 
 def on_wifi_fail_connect():
     oradio_log.info("Wifi fail connect acknowledged")
@@ -556,34 +663,34 @@ def on_webservice_playing_song():
 def on_webservice_pl1_changed():
     state_machine.transition("StateIdle")
     state_machine.transition("StatePreset1")
-    threading.Timer(2, play_sound, args=(SOUND_NEW_PRESET,)).start()
+    Scheduler().call_later(2, play_sound, SOUND_NEW_PRESET)
     oradio_log.debug("WebService on_webservice_pl1_changed acknowledged")
 
 def on_webservice_pl2_changed():
     state_machine.transition("StateIdle")
     state_machine.transition("StatePreset2")
-    threading.Timer(2, play_sound, args=(SOUND_NEW_PRESET,)).start()
+    Scheduler().call_later(2, play_sound, SOUND_NEW_PRESET)
     oradio_log.debug("WebService on_webservice_pl2_changed acknowledged")
 
 def on_webservice_pl3_changed():
     state_machine.transition("StateIdle")
     state_machine.transition("StatePreset3")
-    threading.Timer(2, play_sound, args=(SOUND_NEW_PRESET,)).start()
+    Scheduler().call_later(2, play_sound, SOUND_NEW_PRESET)
     oradio_log.debug("WebService on_webservice_pl3_changed acknowledged")
 
 def on_web_pl1_webradio_changed():
 #REVIEW Onno: Er is geen indicatie voor welke preset de webradio is ingesteld
-    threading.Timer(2, play_sound, args=(SOUND_NEW_WEBRADIO,)).start()
+    Scheduler().call_later(2, play_sound, SOUND_NEW_WEBRADIO)
     oradio_log.debug("WebService on_web_pl_webradio_changed acknowledged")
 
 def on_web_pl2_webradio_changed():
 #REVIEW Onno: Er is geen indicatie voor welke preset de webradio is ingesteld
-    threading.Timer(2, play_sound, args=(SOUND_NEW_WEBRADIO,)).start()
+    Scheduler().call_later(2, play_sound, SOUND_NEW_WEBRADIO)
     oradio_log.debug("WebService on_web_pl_webradio_changed acknowledged")
 
 def on_web_pl3_webradio_changed():
 #REVIEW Onno: Er is geen indicatie voor welke preset de webradio is ingesteld
-    threading.Timer(2, play_sound, args=(SOUND_NEW_WEBRADIO,)).start()
+    Scheduler().call_later(2, play_sound, SOUND_NEW_WEBRADIO)
     oradio_log.debug("WebService on_web_pl_webradio_changed acknowledged")
 
 # -------------------SPOTIFY-----------------------
@@ -733,7 +840,12 @@ def handle_message(message: CommandMessage) -> None:
         return
 
     if handler := handlers.get(state):
-        handler()
+        # Button presses carry a latency trace, handed on by the transition they request
+        trace = latency_trace.from_data(message.data)
+        if trace is not None:
+            trace.mark(STAGE_BUS)
+        with latency_trace.activate(trace):
+            handler()
     else:
         oradio_log.warning(
             "Unhandled state '%s' for message source '%s'.", state, command_source
@@ -809,13 +921,25 @@ state_machine.set_services(oradio_web_service)
 state_machine.transition("StateStartUp")
 
 # Subscribe to and dispatch all command messages (starts its own worker thread)
-oradio_command_handler = OradioCommandHandler(Commands.subscribe())
+# A burst of commands makes publishers wait briefly for room instead of dropping
+# them at once; a handler stuck longer than that still loses commands, see Overflow
+oradio_command_handler = OradioCommandHandler(Commands.subscribe(overflow=Overflow.BLOCK, name="OradioCommandHandler"))
+
+# Receive shell hook events (librespot, USB) once commands are dispatched, so none are lost
+HookEventServer().start()
 
 def main() -> None:
     """
     Main loop for oradio_control.
     """
     oradio_log.debug("Oradio control main loop running")
+
+    # 'kill -USR1 <pid>' logs the button-to-audio latencies and handler timing
+    def dump_latencies(_signum, _frame) -> None:
+        latency_trace.dump()
+        oradio_log.info("State handler timing: %s", state_machine.get_handler_timing())
+    signal.signal(signal.SIGUSR1, dump_latencies)
+
     while True:
         sleep(1)
 
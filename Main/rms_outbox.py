@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary: Oradio persistent outbox for RMS messages
+    Messages for the Remote Monitoring Service wait here until they are
+    posted, so they survive a WiFi outage, an unreachable server and a
+    reboot. rms_service drains the outbox; this module only stores.
+    The outbox is an append-only file of JSON lines, one per change:
+    - {"i": id, "t": created, "k": kind, "p": payload[, "c": 1][, "f": name]}
+      adds a record; "c" marks a coalesced kind, of which only the newest
+      record is kept, and "f" names a file attached to the record
+    - {"a": id} acknowledges all records up to and including id
+    Adding or acknowledging is one append. The file is rewritten with only
+    the pending records when it is loaded, when it grows beyond
+    OUTBOX_COMPACT_BYTES, and emptied when nothing is pending. A line cut
+    short by a power loss is skipped on load.
+    Attached files are kept in a directory next to the outbox file, e.g. the
+    log bundle of an incident, built when the incident happened. Records may
+    share a file. A file is removed once no pending record names it, and
+    only the files of the newest OUTBOX_MAX_ATTACHMENTS are kept.
+"""
+import os
+import json
+from time import time
+from threading import Lock
+from dataclasses import dataclass
+from typing import Any
+
+##### Oradio modules ######################################
+from log_service import oradio_log, ORADIO_LOG_PATH
+
+##### LOCAL constants #####################################
+# Outbox file; not *.log*, so log uploads and logrotate leave it alone
+OUTBOX_FILE_STR = str(ORADIO_LOG_PATH / "rms_outbox.jsonl")
+# Most records kept; the oldest are dropped beyond this
+OUTBOX_MAX_RECORDS = 500
+# File size beyond which acknowledged records are removed from the file
+OUTBOX_COMPACT_BYTES = 64 * 1024
+# Most attached files kept; older records lose theirs beyond this
+OUTBOX_MAX_ATTACHMENTS = 20
+
+@dataclass(frozen=True) # Immutable after creation
+class OutboxRecord:
+    """
+    One message waiting for RMS.
+
+    Attributes:
+        record_id: Increasing number, the order of sending.
+        created:   time() when the record was added.
+        kind:      RMS message type, e.g. HEARTBEAT.
+        payload:   Form fields to POST.
+        coalesced: Whether a newer record of the same kind replaces this one.
+        attachment: Name of the file attached to the record, or None.
+    """
+    record_id: int
+    created: float
+    kind: str
+    payload: dict[str, Any]
+    coalesced: bool = False
+    attachment: str | None = None
+
+    def to_line(self) -> str:
+        """Return the record as a line of the outbox file."""
+        entry: dict[str, Any] = {"i": self.record_id, "t": round(self.created, 3), "k": self.kind, "p": self.payload}
+        if self.coalesced:
+            entry["c"] = 1
+        if self.attachment:
+            entry["f"] = self.attachment
+        return json.dumps(entry, separators=(",", ":")) + "\n"
+
+class RmsOutbox:
+    """
+    Persistent FIFO of RMS messages, see module summary.
+
+    Thread-safe: records are added by whichever thread sends a message and
+    acknowledged by the thread draining the outbox.
+    """
+    def __init__(self, filename: str = OUTBOX_FILE_STR, max_records: int = OUTBOX_MAX_RECORDS) -> None:
+        """
+        Load the pending records from filename, which is created if missing.
+
+        Args:
+            filename: Outbox file.
+            max_records: Most records kept.
+        """
+        self._filename = filename
+        self._attachment_dir = f"{os.path.splitext(filename)[0]}_files"
+        self._max_records = max_records
+        self._lock = Lock()
+        self._pending: list[OutboxRecord] = []
+        self._next_id = 1
+        with self._lock:
+            self._load()
+            self._rewrite()
+            self._prune_attachments()
+        if self._pending:
+            oradio_log.info("RMS outbox holds %d messages", len(self._pending))
+
+##### Helpers #############################################
+
+    def _load(self) -> None:
+        """Read the pending records from the file."""
+        acknowledged = 0
+        records: list[OutboxRecord] = []
+        try:
+            with open(self._filename, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        if "a" in entry:
+                            acknowledged = max(acknowledged, int(entry["a"]))
+                        else:
+                            records.append(OutboxRecord(int(entry["i"]), float(entry["t"]), str(entry["k"]),
+                                                        dict(entry["p"]), bool(entry.get("c")), entry.get("f")))
+                    except (ValueError, KeyError, TypeError):
+                        oradio_log.warning("RMS outbox skips damaged line: %r", line[:80])
+        except FileNotFoundError:
+            return
+        except OSError as ex_err:
+            oradio_log.error("Failed to read RMS outbox: %s", ex_err)
+            return
+
+        for record in records:
+            self._next_id = max(self._next_id, record.record_id + 1)
+            if record.record_id > acknowledged:
+                self._add(record)
+
+    def _add(self, record: OutboxRecord) -> None:
+        """Add record to the pending records, replacing a coalesced one and dropping the oldest beyond the limit."""
+        if record.coalesced:
+            self._pending = [pending for pending in self._pending if pending.kind != record.kind]
+        self._pending.append(record)
+        if len(self._pending) > self._max_records:
+            dropped = self._pending.pop(0)
+            oradio_log.warning("RMS outbox full; dropped %s message from %s", dropped.kind, dropped.payload.get("generated"))
+
+    def _append(self, line: str) -> None:
+        """Append a line to the file and make it durable."""
+        try:
+            with open(self._filename, "a", encoding="utf-8") as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+        except OSError as ex_err:
+            oradio_log.error("Failed to write RMS outbox: %s", ex_err)
+
+    def _rewrite(self) -> None:
+        """Replace the file by one with only the pending records."""
+        temporary = f"{self._filename}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as file:
+                file.writelines(record.to_line() for record in self._pending)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self._filename)
+        except OSError as ex_err:
+            oradio_log.error("Failed to rewrite RMS outbox: %s", ex_err)
+
+    def _write_attachment(self, name: str, data: bytes) -> bool:
+        """Store an attached file durably, unless it is stored already; return whether it is."""
+        path = os.path.join(self._attachment_dir, name)
+        if os.path.exists(path):
+            return True
+        temporary = f"{path}.tmp"
+        try:
+            os.makedirs(self._attachment_dir, exist_ok=True)
+            with open(temporary, "wb") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, path)
+            return True
+        except OSError as ex_err:
+            oradio_log.error("Failed to store RMS outbox attachment %s: %s", name, ex_err)
+            return False
+
+    def _prune_attachments(self) -> None:
+        """Remove the attached files no pending record names, and all but the newest OUTBOX_MAX_ATTACHMENTS."""
+        keep: list[str] = []
+        for record in reversed(self._pending):
+            if record.attachment and record.attachment not in keep:
+                keep.append(record.attachment)
+        try:
+            names = os.listdir(self._attachment_dir)
+        except FileNotFoundError:
+            return
+        except OSError as ex_err:
+            oradio_log.error("Failed to list RMS outbox attachments: %s", ex_err)
+            return
+        for name in set(names) - set(keep[:OUTBOX_MAX_ATTACHMENTS]):
+            try:
+                os.remove(os.path.join(self._attachment_dir, name))
+            except OSError as ex_err:
+                oradio_log.error("Failed to remove RMS outbox attachment %s: %s", name, ex_err)
+
+##### Public API ##########################################
+
+    def put(self, kind: str, payload: dict[str, Any], coalesce: bool = False,
+            attachment: tuple[str, bytes] | None = None) -> OutboxRecord:
+        """
+        Add a message.
+
+        Args:
+            kind: RMS message type.
+            payload: Form fields to POST.
+            coalesce: Replace a pending message of the same kind.
+            attachment: File name and content to keep with the message; a
+                        file of that name already stored is shared.
+
+        Returns:
+            The added record.
+        """
+        with self._lock:
+            name = None
+            if attachment is not None and self._write_attachment(*attachment):
+                name = attachment[0]
+            record = OutboxRecord(self._next_id, time(), kind, payload, coalesce, name)
+            self._next_id += 1
+            self._add(record)
+            self._append(record.to_line())
+            self._prune_attachments()
+        return record
+
+    def attachment(self, record: OutboxRecord) -> bytes | None:
+        """Return the content of the file attached to record, or None if it has none (any more)."""
+        if not record.attachment:
+            return None
+        try:
+            with open(os.path.join(self._attachment_dir, record.attachment), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as ex_err:
+            oradio_log.error("Failed to read RMS outbox attachment %s: %s", record.attachment, ex_err)
+            return None
+
+    def peek(self, count: int) -> list[OutboxRecord]:
+        """Return up to count pending records, oldest first."""
+        with self._lock:
+            return self._pending[:count]
+
+    def ack(self, record_id: int) -> None:
+        """
+        Remove the records up to and including record_id, once sent or
+        rejected, and compact the file if due.
+        """
+        with self._lock:
+            self._pending = [record for record in self._pending if record.record_id > record_id]
+            self._prune_attachments()
+            if not self._pending:
+                self._rewrite()
+                return
+            self._append(json.dumps({"a": record_id}) + "\n")
+            try:
+                oversized = os.path.getsize(self._filename) > OUTBOX_COMPACT_BYTES
+            except OSError:
+                oversized = False
+            if oversized:
+                self._rewrite()
+
+    @property
+    def depth(self) -> int:
+        """Number of pending records."""
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the oldest pending record was added, 0 if none."""
+        with self._lock:
+            return time() - self._pending[0].created if self._pending else 0.0
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from constants import YELLOW, NC
+    from utilities import input_prompt
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu() -> None:
+        """Show menu with test options"""
+        input_selection = (
+            "Select a function, input the number:\n"
+            " 0-Quit\n"
+            " 1-Add a HEARTBEAT (coalesced)\n"
+            " 2-Add an INCIDENT\n"
+            " 3-Show pending records\n"
+            " 4-Acknowledge the oldest record\n"
+            " 5-Reload the outbox from file\n"
+            "Select: "
+        )
+
+        outbox = RmsOutbox()
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    break
+                case 1:
+                    outbox.put("HEARTBEAT", {"type": "HEARTBEAT"}, coalesce=True)
+                    print(f"\nOutbox depth {outbox.depth}\n")
+                case 2:
+                    outbox.put("INCIDENT", {"type": "INCIDENT", "message": "Test incident"},
+                               attachment=("test.txt", b"Test attachment"))
+                    print(f"\nOutbox depth {outbox.depth}\n")
+                case 3:
+                    for record in outbox.peek(OUTBOX_MAX_RECORDS):
+                        print(f"{record.record_id:>5} {record.kind:<10} {record.payload} {record.attachment or ''}")
+                    print(f"\nDepth {outbox.depth}, oldest {outbox.age:.0f} s\n")
+                case 4:
+                    oldest = outbox.peek(1)
+                    if oldest:
+                        outbox.ack(oldest[0].record_id)
+                    print(f"\nOutbox depth {outbox.depth}\n")
+                case 5:
+                    outbox = RmsOutbox()
+                    print(f"\nOutbox depth {outbox.depth}\n")
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    interactive_menu()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
@@ -25,36 +25,46 @@ Created on February 8, 2025
 
     Any other service in the application (e.g. incident_service) can also
     use RMService.send_message(INCIDENT, incident) to report an
-    IncidentMessage to RMS, attaching the current log files for context.
+    IncidentMessage to RMS, attaching a compressed bundle of the logs for
+    context (see log_bundle). The bundle is built when the incident is
+    reported and waits with it in the outbox. Incidents in a burst share
+    one bundle, which is uploaded once.
     Like HEARTBEAT/SYS_INFO, this requires start() to have been called;
     RMS is expected to start early enough in the boot sequence that this
     is not a practical limitation.
 
     Helper functions collect Raspberry Pi telemetry and software version
-    information. Outgoing POST requests are protected by a simple
-    exponential backoff retry mechanism. A failing POST marks the server
-    unreachable, after which each message makes a single probe attempt and
-    logs one line until a POST succeeds or WiFi connects.
+    information. Outgoing messages wait in a persistent outbox (see
+    rms_outbox) and are posted in batches over one HTTP session while WiFi
+    is connected, so messages raised offline are delivered on reconnect.
+    Only the newest HEARTBEAT and SYS_INFO wait. A failing POST stops the
+    drain, marks the server unreachable, logs one line until a POST
+    succeeds or WiFi connects, and schedules a retry with growing delay.
 """
 import json
 import subprocess
-from time import sleep
-from threading import Timer
+from functools import partial
+from time import monotonic
 from datetime import datetime
 from platform import python_version
-from contextlib import ExitStack
-from multiprocessing import Queue, Lock
-from requests import post, RequestException, Response, Timeout
+from multiprocessing import Lock
+from requests import RequestException, Response, Session, Timeout
 
 ##### Oradio modules ######################################
 from singleton import singleton
+from scheduler import Scheduler, TimerHandle
 from utilities import get_serial
-from log_service import oradio_log, ORADIO_LOG_PATH
+from metrics import MetricsRegistry
+from log_service import oradio_log
+from log_bundle import LogBundle, BUNDLE_NAME, build_log_bundle
+from rms_outbox import RmsOutbox, OutboxRecord
 from messaging import (
+    BusQueue,
     Commands,
     Incidents,
     IncidentMessage,
     MessageHandlerTemplate,
+    Overflow,
     WIFI_SOURCE,
     WIFI_CONNECTED,
     WIFI_DISCONNECTED,
@@ -83,24 +93,32 @@ SOFTWARE_VERSION_FILE = "/var/log/oradio_sw_version.log"
 # How often the heartbeat is sent (seconds); currently once per hour
 HEARTBEAT_REPEAT = 60 * 60
 
-# Remote Monitoring Service endpoint and HTTP POST tuning parameters
-MAX_RETRIES    = 3    # Maximum number of POST attempts before giving up
-BACKOFF_FACTOR = 2    # Base for exponential backoff: delay = BACKOFF_FACTOR ** attempt (1s, 2s, 4s)
+# Remote Monitoring Service HTTP POST tuning parameters
 POST_TIMEOUT   = 30   # Per-attempt HTTP timeout in seconds. Generous because RMS may
                       # run its notification and retention routines inside the POST
                       # before responding: giving up early would treat a stored
                       # record as a failure and post it again on the next attempt.
 
+# Outbox draining: messages posted between acknowledgements to the outbox
+# file, and the delay before draining again after a failed POST, doubling
+# up to HEARTBEAT_REPEAT
+OUTBOX_BATCH       = 20
+OUTBOX_RETRY_DELAY = 60
+# Message types of which only the newest waits in the outbox
+COALESCED_TYPES = (HEARTBEAT, SYS_INFO)
+# Seconds after building an incident log bundle in which later incidents share it.
+# The incident handler dumps the flight recorder at most once per window too.
+BUNDLE_REUSE_WINDOW = 30
+
 ##### RMS reachability state ##############################
 
 class _RmsReachability:
     """
     Cached view of whether the RMS server is reachable.
 
-    Cleared when a POST exhausts its retries, set again on the first
-    successful POST and when WiFi connects. While cleared, a POST makes a
-    single probe attempt rather than the full retry/backoff cycle, and
-    RMS's own incidents are dropped rather than POSTed.
+    Cleared when a POST fails, set again on the first successful POST and
+    when WiFi connects. While cleared, RMS's own incidents are dropped
+    rather than queued for RMS.
 
     Never instantiated; use the classmethods.
 
@@ -154,10 +172,14 @@ def _get_temperature() -> str:
     Returns:
         str: Temperature in °C, or "Unsupported platform" if unavailable.
     """
-    result = subprocess.run(
-        ["vcgencmd", "measure_temp"],
-        capture_output=True, text=True, check=False,
-    )
+    try:
+        result = subprocess.run(
+            ["vcgencmd", "measure_temp"],
+            capture_output=True, text=True, check=False,
+        )
+    except OSError:
+        # Command not installed, e.g. when not running on a Raspberry Pi
+        return "Unsupported platform"
     # Output format: "temp=42.8'C" — slice characters 5–9 to extract the value
     temperature = result.stdout.strip()[5:9] if result.returncode == 0 else ""
     return temperature or "Unsupported platform"
@@ -169,10 +191,14 @@ def _get_rpi_version() -> str:
     Returns:
         str: Human-readable model description, or "Unsupported platform" if unavailable.
     """
-    result = subprocess.run(
-        ["cat", "/proc/cpuinfo"],
-        capture_output=True, text=True, check=False,
-    )
+    try:
+        result = subprocess.run(
+            ["cat", "/proc/cpuinfo"],
+            capture_output=True, text=True, check=False,
+        )
+    except OSError:
+        # Command not installed, e.g. when not running on a Raspberry Pi
+        return "Unsupported platform"
     if result.returncode != 0:
         return "Unsupported platform"
     for line in result.stdout.splitlines():
@@ -187,10 +213,14 @@ def _get_os_version() -> str:
     Returns:
         str: OS name and version, or "Unsupported platform" if unavailable.
     """
-    result = subprocess.run(
-        ["lsb_release", "-a"],
-        capture_output=True, text=True, check=False,
-    )
+    try:
+        result = subprocess.run(
+            ["lsb_release", "-a"],
+            capture_output=True, text=True, check=False,
+        )
+    except OSError:
+        # Command not installed, e.g. when not running on a Raspberry Pi
+        return "Unsupported platform"
     if result.returncode != 0:
         return "Unsupported platform"
     for line in result.stdout.splitlines():
@@ -227,7 +257,7 @@ def _extract_command(response: Response) -> str | None:
     is relayed rather than returned directly still works.
 
     Args:
-        response: The successful response returned by _post_with_retry().
+        response: The successful response returned by _post().
 
     Returns:
         The command to run, or None if the body carried none or could not
@@ -266,7 +296,7 @@ def _handle_response_command(response: Response) -> None:
         handled elsewhere.
 
     Args:
-        response: The successful response returned by _post_with_retry().
+        response: The successful response returned by _post().
     """
     command = _extract_command(response)
 
@@ -292,6 +322,51 @@ def _handle_response_command(response: Response) -> None:
                 command, ex_err.returncode, ex_err.stdout, ex_err.stderr
             )
 
+class _UploadedBundle:
+    """
+    The last incident log bundle built, and the digest of the last one RMS
+    accepted. Incidents within BUNDLE_REUSE_WINDOW of a build share its
+    bundle, so a burst of incidents uploads it once.
+
+    Never instantiated; use the class attributes.
+
+    Attributes:
+        bundle: The last bundle built, or None.
+        built: monotonic() time at which bundle was built.
+        digest: LogBundle.digest of the last uploaded bundle, or None.
+        lock: Serialises access to the attributes across callers of send_message().
+    """
+    bundle: LogBundle | None = None
+    built = 0.0
+    digest: str | None = None
+    lock = Lock()
+
+def _incident_bundle(payload_info: dict) -> tuple[str, bytes] | None:
+    """
+    Build the incident log bundle, or reuse the one built less than
+    BUNDLE_REUSE_WINDOW ago, and add its digest to payload_info as
+    'log_bundle', so RMS can link an incident to a bundle uploaded before.
+
+    Args:
+        payload_info: Form fields to POST.
+
+    Returns:
+        File name and content to keep with the outbox record, or None if
+        building the bundle failed.
+    """
+    with _UploadedBundle.lock:
+        bundle = _UploadedBundle.bundle
+        if bundle is None or monotonic() - _UploadedBundle.built > BUNDLE_REUSE_WINDOW:
+            try:
+                bundle = build_log_bundle()
+            except OSError as ex_err:
+                oradio_log.error("Failed to build log bundle: %s", ex_err)
+                return None
+            _UploadedBundle.bundle = bundle
+            _UploadedBundle.built = monotonic()
+    payload_info['log_bundle'] = bundle.digest
+    return f"{bundle.digest}.tar.gz", bundle.data
+
 def _mark_reachable() -> None:
     """
     Record that the RMS server answered, logging only the transition.
@@ -304,7 +379,7 @@ def _mark_reachable() -> None:
 
 def _mark_unreachable(context: str, failure: str) -> None:
     """
-    Record that a POST exhausted its attempts and report the outage once.
+    Record that a POST failed and report the outage once.
 
     The state is cleared before the incident is published, so
     send_message() recognises the incident published here as
@@ -321,171 +396,84 @@ def _mark_unreachable(context: str, failure: str) -> None:
         # Outage already reported: one line per message
         oradio_log.error("Failed to POST %s: RMS server still unreachable", context)
 
-def _post_with_retry(
-    payload_info: dict,
-    attach_log_files: bool = False,
-    context: str = "message",
-) -> Response | None:
+def _post(session: Session, payload_info: dict, files: dict | None, context: str) -> tuple[bool, Response | None]:
     """
-    POST payload_info to the RMS server, retrying on failure.
-
-    Shared across the message types handled by
-    WifiMessageHandler.send_message(): all POST to RMS_SERVER_URL under the
-    same MAX_RETRIES/BACKOFF_FACTOR/POST_TIMEOUT policy. They differ only
-    in whether log files are attached and in what happens with a successful
-    response (a heartbeat acts on a returned command, the others do not),
-    both of which stay with the caller.
+    POST payload_info to the RMS server once.
 
     Failures are split the way the crash action script splits them, since
     the two classes call for different responses:
 
     - 4xx means the server answered and rejected this request. Retrying
       sends the identical request and earns the identical rejection, so
-      there is no retry and the reachability state is left alone: 401 (key
+      the message is dropped and the reachability state is left alone: 401 (key
       rotated) and 413 (payload too large) are configuration faults, not an
       outage. No incident is published either -- publishing one would POST
       an incident that is rejected in turn, publishing another.
     - 5xx and transport errors (DNS, TLS, timeout) may clear on their own,
-      so these retry with backoff and, once exhausted, clear the
-      reachability state and publish RMS_POST_FAILED.
-
-    Retries apply while _RmsReachability reports the server as reachable.
-    Once it does not, each call makes a single probe attempt, so a dead
-    server costs one timeout rather than the full retry and backoff cycle
-    while recovery is still picked up on the next message.
+      so the message stays in the outbox to be posted again, and the
+      reachability state is cleared, publishing RMS_POST_FAILED.
 
     Args:
-        payload_info:     Form fields to POST.
-        attach_log_files: If True, attach every *.log* file in
-                           ORADIO_LOG_PATH on each attempt, rotated logs
-                           included. Files are (re)opened fresh per attempt
-                           inside the loop, since a file object already
-                           consumed by a failed attempt can't be resent
-                           as-is.
-        context:          Short label used in log messages, e.g.
-                           "message" or "incident".
+        session:      HTTP session, reused for the messages of a drain.
+        payload_info: Form fields to POST.
+        files:        Files to attach, or None.
+        context:      Short label used in log messages, e.g. "incident".
 
     Returns:
-        The successful requests.Response, or None if the request was
-        rejected with a 4xx or the retryable attempts were exhausted.
+        Whether the message is done with (posted or rejected), and the
+        successful requests.Response or None.
     """
-    attempts = MAX_RETRIES if _RmsReachability.is_reachable() else 1
-
-    for attempt in range(1, attempts + 1):
-        # Holds the reason this attempt failed, as text: a transport error
-        # and an HTTP 5xx are treated alike from here on, and only ever
-        # end up in a log line.
-        failure: str | None = None
-        try:
-            with ExitStack() as stack:
-                payload_files = None
-                if attach_log_files:
-                    send_files = ORADIO_LOG_PATH.glob("*.log*")
-                    payload_files = {f.name: (f.name, stack.enter_context(f.open("rb"))) for f in send_files}
-                response = post(
-                    url=RMS_SERVER_URL,
-                    headers={"X-Api-Key": RMS_SERVER_KEY},
-                    data=payload_info,
-                    files=payload_files,
-                    timeout=POST_TIMEOUT
-                )
-        except (RequestException, Timeout) as ex_err:
-            # Fall back to the class name: some requests exceptions carry
-            # an empty message, which would log a failure with no reason
-            failure = str(ex_err) or type(ex_err).__name__
-        else:
-            if 400 <= response.status_code < 500:
-                # The server answered, so it is reachable; the request
-                # itself is what it refused. Recorded with the status code
-                # because the fix differs per code, and returned without
-                # retrying or publishing an incident.
-                oradio_log.error(
-                    "POST %s rejected: HTTP %d, body: %s",
-                    context, response.status_code, response.text[:200] or "<none>"
-                )
-                _mark_reachable()
-                return None
-
-            if response.status_code >= 500:
-                # Server-side and possibly transient, so treated like a
-                # transport failure and retried.
-                failure = f"HTTP {response.status_code}"
-
-        if failure is None:
-            _mark_reachable()
-            return response  # POST succeeded; exit the retry loop
-
-        # Per-attempt detail is informative only while more attempts follow
-        if attempts > 1:
-            oradio_log.warning("Attempt %d failed to POST %s: %s", attempt, context, failure)
+    try:
+        response = session.post(
+            url=RMS_SERVER_URL,
+            data=payload_info,
+            files=files,
+            timeout=POST_TIMEOUT
+        )
+    except (RequestException, Timeout) as ex_err:
+        # Fall back to the class name: some requests exceptions carry
+        # an empty message, which would log a failure with no reason
+        _mark_unreachable(context, str(ex_err) or type(ex_err).__name__)
+        return False, None
+
+    if 400 <= response.status_code < 500:
+        # The server answered, so it is reachable; the request itself is
+        # what it refused. Recorded with the status code because the fix
+        # differs per code, and dropped without publishing an incident.
+        oradio_log.error(
+            "POST %s rejected: HTTP %d, body: %s",
+            context, response.status_code, response.text[:200] or "<none>"
+        )
+        _mark_reachable()
+        return True, None
 
-        if attempt < attempts:
-            # Wait before retrying; delay grows exponentially with each attempt
-            sleep(BACKOFF_FACTOR ** attempt)
-            continue
+    if response.status_code >= 500:
+        # Server-side and possibly transient, so treated like a transport failure
+        _mark_unreachable(context, f"HTTP {response.status_code}")
+        return False, None
 
-        _mark_unreachable(context, failure)
-        return None
+    _mark_reachable()
+    return True, response
 
-    return None  # Unreachable (loop always returns), keeps type checkers happy
-
-class Heartbeat(Timer):
+class Heartbeat:
     """
-    Timer that repeatedly invokes a callback.
-
-    Extends threading.Timer, overriding run() so the callback executes
-    immediately on start and then repeats every interval seconds until
-    cancel() is called.
+    Repeatedly invokes a callback on the shared Scheduler.
 
-    Use the classmethods start_heartbeat() and stop_heartbeat() rather
-    than instantiating directly; they keep at most one timer active.
+    The callback executes immediately on start and then repeats every
+    interval seconds until stopped. It runs on the Scheduler's worker
+    pool, as posting to RMS blocks on the network.
 
-    Note:
-        Each start_heartbeat() call must be free to construct a fresh
-        instance, because a Timer thread is consumable and cannot run
-        again once it has finished or been cancelled. Keep this class
-        undecorated by @singleton, which would pin one instance for the
-        lifetime of the process.
+    Use the classmethods start_heartbeat() and stop_heartbeat(); they keep
+    at most one heartbeat active.
 
     Attributes:
-        instance: The active timer, or None when no heartbeat is running.
+        instance: Handle of the active heartbeat, or None when no heartbeat is running.
         start_lock: Serialises start/stop calls so they cannot race on
             instance.
     """
-    instance = None
+    instance: TimerHandle | None = None
     start_lock = Lock()
 
-    def __init__(self, interval, function, args=None, kwargs=None) -> None:
-        """
-        Initialise the heartbeat timer.
-
-        Args:
-            interval (int): Time in seconds between successive callback calls.
-            function (callable): Callback to invoke on each tick.
-            args (tuple, optional): Positional arguments forwarded to *function*.
-            kwargs (dict, optional): Keyword arguments forwarded to *function*.
-        """
-        super().__init__(interval, function, args=args, kwargs=kwargs)
-
-    def run(self) -> None:
-        """
-        Execute the callback immediately and repeat until cancelled.
-
-        Exceptions raised by the callback are caught and logged so that the
-        timer thread remains alive.
-        """
-        while not self.finished.is_set():
-            try:
-                self.function(*self.args, **self.kwargs)
-            # Catch all non-system exceptions: we must not let an unpredictable callback
-            # error kill the timer thread.
-            except Exception as ex_err:  # pylint: disable=broad-exception-caught
-                oradio_log.error("Heartbeat execution failed: %s", ex_err)
-
-            # Block for *interval* seconds; returns True early if cancel() is called
-            if self.finished.wait(self.interval):
-                break
-
     @classmethod
     def start_heartbeat(cls, interval, function, args=None, kwargs=None) -> None:
         """
@@ -498,22 +486,19 @@ class Heartbeat(Timer):
             kwargs (dict, optional): Keyword arguments forwarded to *function*.
         """
         with cls.start_lock:
-            # Cancel and discard the previous instance before creating a new one
+            # Cancel the previous heartbeat before scheduling a new one
             if cls.instance is not None:
                 cls.instance.cancel()
                 cls.instance = None
 
-            cls.instance = cls(interval, function, args=args, kwargs=kwargs)
-
-            # Daemon thread: exits automatically when the main program exits
-            cls.instance.daemon = True
-            cls.instance.start()
+            callback = partial(function, **kwargs) if kwargs else function
+            cls.instance = Scheduler().call_every(interval, callback, *(args or ()), immediate=True, blocking=True)
             oradio_log.info("Heartbeat started")
 
     @classmethod
     def stop_heartbeat(cls) -> None:
         """
-        Cancel the running heartbeat timer, if any.
+        Cancel the running heartbeat, if any.
 
         Thread-safe: uses start_lock to serialise concurrent calls.
         Does nothing if no heartbeat is currently running.
@@ -531,22 +516,23 @@ class WifiMessageHandler(MessageHandlerTemplate):
     Handle WiFi state change messages and drive heartbeat and RMS reporting.
 
     Subscribes to the COMMAND topic filtered to WiFi messages. On a
-    WIFI_CONNECTED event the heartbeat timer is started and a one-time
-    SYS_INFO message is sent to the RMS server. On a WIFI_DISCONNECTED
-    event the heartbeat timer is stopped.
+    WIFI_CONNECTED event the heartbeat timer is started, a one-time
+    SYS_INFO message is sent to the RMS server, and the outbox is drained.
+    On a WIFI_DISCONNECTED event the heartbeat timer is stopped.
 
     send_message() also handles INCIDENT, used by other services (e.g.
     incident_service) via RMService.send_message() to report an
     IncidentMessage to RMS. All three message types require this handler
-    to exist (i.e. RMService.start() to have been called) and, for
-    SYS_INFO/INCIDENT, WiFi to currently be connected.
+    to exist (i.e. RMService.start() to have been called). Messages wait
+    in the outbox until WiFi is connected and RMS accepts them.
     """
-    def __init__(self, queue: Queue) -> None:
+    def __init__(self, queue: BusQueue, outbox: RmsOutbox) -> None:
         """
         Initialise the WiFi message handler.
 
         Args:
             queue: Subscription queue filtered to WiFi messages.
+            outbox: Outbox the messages wait in until posted.
         """
         # Cache serial number once; used in every outgoing RMS message
         self._serial = get_serial()
@@ -556,6 +542,14 @@ class WifiMessageHandler(MessageHandlerTemplate):
         # has been processed yet at construction time.
         self._wifi_connected = False
 
+        # Outbox drain state: one drain at a time, a drain requested during
+        # a drain makes it continue, and a retry timer after a failed POST
+        self._outbox = outbox
+        self._drain_lock = Lock()
+        self._drain_requested = False
+        self._retry: TimerHandle | None = None
+        self._retry_delay = OUTBOX_RETRY_DELAY
+
         # Initialise base class and start the worker thread
         super().__init__(queue)
 
@@ -578,11 +572,13 @@ class WifiMessageHandler(MessageHandlerTemplate):
 
         elif message.message == WIFI_CONNECTED:
             self._wifi_connected = True
-            # A new connection may resolve an earlier failure, so allow the
-            # next POST a full retry cycle rather than a single probe
+            # A new connection may resolve an earlier failure, so post
+            # again at once rather than waiting for a pending retry
             _RmsReachability.update(True)
+            self._retry_delay = OUTBOX_RETRY_DELAY
             Heartbeat.start_heartbeat(HEARTBEAT_REPEAT, self.send_message, args=(HEARTBEAT,))
-            # Immediately report hardware/software identity on every new connection
+            # Immediately report hardware/software identity on every new
+            # connection; sending it drains the outbox
             self.send_message(SYS_INFO)
             oradio_log.debug("WiFi connected. Heartbeat started and system info sent.")
 
@@ -593,32 +589,111 @@ class WifiMessageHandler(MessageHandlerTemplate):
         else:
             oradio_log.error("Unexpected message: %s", message)
 
+    def _send(self, session: Session, record: OutboxRecord) -> bool:
+        """
+        POST one outbox record, attaching the log bundle to an incident.
+
+        Args:
+            session: HTTP session of the drain.
+            record: Record to post.
+
+        Returns:
+            Whether the record is done with (posted or rejected).
+        """
+        payload_info = dict(record.payload)
+        files = None
+        digest = payload_info.get('log_bundle')
+        if digest is not None:
+            with _UploadedBundle.lock:
+                uploaded = digest == _UploadedBundle.digest
+            data = None if uploaded else self._outbox.attachment(record)
+            if data is not None:
+                files = {BUNDLE_NAME: (BUNDLE_NAME, data, "application/gzip")}
+            else:
+                oradio_log.debug("Log bundle %s %s", digest, "already uploaded" if uploaded else "no longer kept")
+
+        done, response = _post(session, payload_info, files, record.kind.lower())
+        if response is not None:
+            if files:
+                with _UploadedBundle.lock:
+                    _UploadedBundle.digest = digest
+            # RMS attaches a pending command to a heartbeat response only
+            if record.kind == HEARTBEAT:
+                _handle_response_command(response)
+        return done
+
+    def _drain_outbox(self) -> None:
+        """
+        Post the outbox records oldest first, in batches over one HTTP
+        session, until the outbox is empty, WiFi is lost or a POST fails.
+        After a failure a retry is scheduled.
+        """
+        with Session() as session:
+            session.headers["X-Api-Key"] = RMS_SERVER_KEY
+            while self._wifi_connected:
+                batch = self._outbox.peek(OUTBOX_BATCH)
+                if not batch:
+                    self._retry_delay = OUTBOX_RETRY_DELAY
+                    return
+                done_id = None
+                for record in batch:
+                    if not self._send(session, record):
+                        break
+                    done_id = record.record_id
+                if done_id is not None:
+                    # One outbox file write per batch
+                    self._outbox.ack(done_id)
+                if done_id != batch[-1].record_id:
+                    self._schedule_retry()
+                    return
+
+    def _schedule_retry(self) -> None:
+        """Drain again after the retry delay, and double the delay for the next failure."""
+        if self._retry is not None:
+            self._retry.cancel()
+        self._retry = Scheduler().call_later(self._retry_delay, self.drain, blocking=True)
+        oradio_log.info("RMS outbox: %d messages waiting for %.0f s; retry in %d s",
+                        self._outbox.depth, self._outbox.age, self._retry_delay)
+        self._retry_delay = min(self._retry_delay * 2, HEARTBEAT_REPEAT)
+
+    def drain(self) -> None:
+        """
+        Post the messages waiting in the outbox, if WiFi is connected.
+
+        Safe to call from any thread. A call while another thread drains
+        returns at once; that drain then continues with the new messages.
+        """
+        if not self._wifi_connected:
+            return
+        self._drain_requested = True
+        while self._drain_requested and self._drain_lock.acquire(False):
+            try:
+                self._drain_requested = False
+                self._drain_outbox()
+            finally:
+                self._drain_lock.release()
+
     def send_message(self, msg_type: str, incident: IncidentMessage | None = None) -> None:
         """
-        Build and send a message to the RMS server.
+        Build a message for the RMS server, add it to the outbox and drain
+        the outbox if WiFi is connected.
 
-        HEARTBEAT and SYS_INFO carry runtime/hardware telemetry. INCIDENT
-        reports an IncidentMessage from another service, attaching the
-        current log files for context.
+        HEARTBEAT and SYS_INFO carry runtime/hardware telemetry; HEARTBEAT
+        includes the summary of the metrics registry, outbox depth and age
+        included. Only the newest of each waits in the outbox. INCIDENT
+        reports an IncidentMessage from another service; its log bundle is
+        built now and waits with it in the outbox, so it shows the logs of
+        the incident however late the message is posted.
 
         Only a HEARTBEAT response is inspected for a pending command: that
         is the one message type RMS attaches one to, so parsing any other
         response for it would never find anything.
 
-        Only attempted while WiFi is currently known to be connected; if not,
-        nothing is sent and a debug line is logged instead, since attempting
-        a POST with no network would just burn through the full retry/backoff
-        cycle before failing anyway.
-
         Args:
             msg_type: HEARTBEAT, SYS_INFO, or INCIDENT.
             incident: Required when msg_type is INCIDENT (ignored
                       otherwise) -- the IncidentMessage to report.
         """
-        if not self._wifi_connected:
-            oradio_log.debug("WiFi not available; not sending %s message", msg_type)
-            return
-
         # Base fields present in every message type
         payload_info = {
             'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -626,9 +701,15 @@ class WifiMessageHandler(MessageHandlerTemplate):
             'type'     : msg_type,
         }
 
+        # Log bundle kept with an incident in the outbox
+        attachment = None
+
         # Append lightweight runtime telemetry for periodic sign-of-life messages
         if msg_type == HEARTBEAT:
             payload_info['temperature'] = _get_temperature()
+            # Compact counters and latencies, to spot performance regressions across
+            # the fleet; JSON as the payload is posted as form fields
+            payload_info['metrics'] = json.dumps(MetricsRegistry().summary(), separators=(",", ":"))
 
         # Append full hardware/software identification for onboarding messages
         elif msg_type == SYS_INFO:
@@ -637,7 +718,8 @@ class WifiMessageHandler(MessageHandlerTemplate):
             payload_info['rpi']        = _get_rpi_version()
             payload_info['rpi-os']     = _get_os_version()
 
-        # Report an incident from another service, attaching current logs
+        # Report an incident from another service, with the logs and the
+        # flight recorder dump IncidentHandler wrote just before
         elif msg_type == INCIDENT:
             if incident is None:
                 oradio_log.error("send_message(INCIDENT) requires an IncidentMessage")
@@ -653,24 +735,19 @@ class WifiMessageHandler(MessageHandlerTemplate):
 
             payload_info['source']  = incident.source
             payload_info['message'] = incident.message
-            # RMS attaches a command to heartbeats only, so the response
-            # here is unused
-            _post_with_retry(payload_info, attach_log_files=True, context="incident")
-            return
+            # Bundled now: by the time it is posted, later incidents have
+            # overwritten the flight recorder dump
+            attachment = _incident_bundle(payload_info)
 
         else:
             oradio_log.error("Unsupported message type: %s", msg_type)
             return  # Nothing to POST; exit early
 
-        response = _post_with_retry(payload_info, context="message")
-        if response is None:
-            # Rejected, or all retries failed; _post_with_retry() has
-            # already logged it and published an incident where warranted
+        self._outbox.put(msg_type, payload_info, coalesce=msg_type in COALESCED_TYPES, attachment=attachment)
+        if not self._wifi_connected:
+            oradio_log.debug("WiFi not available; %s message waits in RMS outbox", msg_type)
             return
-
-        # RMS attaches a pending command to a heartbeat response only
-        if msg_type == HEARTBEAT:
-            _handle_response_command(response)
+        self.drain()
 
 @singleton
 class RMService:
@@ -696,9 +773,16 @@ class RMService:
         No subscription is made and no thread is started here; call
         start() to begin operation.
         """
-        self._queue: Queue | None = None
+        self._queue: BusQueue | None = None
         self._handler: WifiMessageHandler | None = None
 
+        # Messages wait here until posted, also across stop() and start()
+        self._outbox = RmsOutbox()
+        MetricsRegistry().gauge("oradio_rms_outbox_depth", "RMS messages waiting in the outbox",
+                                lambda: self._outbox.depth)
+        MetricsRegistry().gauge("oradio_rms_outbox_age_seconds", "Age of the oldest RMS message waiting in the outbox",
+                                lambda: self._outbox.age)
+
     def start(self) -> None:
         """
         Subscribe to WiFi state change events and start the handler thread.
@@ -712,11 +796,12 @@ class RMService:
             return
 
         # Subscribe to WiFi messages only
-        self._queue = Commands.subscribe(sources=(WIFI_SOURCE,))
+        # Only the latest WiFi state matters, so a backlog coalesces to it
+        self._queue = Commands.subscribe(sources=(WIFI_SOURCE,), overflow=Overflow.COALESCE, name="WifiMessageHandler")
 
         # Start queue listener thread
         try:
-            self._handler = WifiMessageHandler(self._queue)
+            self._handler = WifiMessageHandler(self._queue, self._outbox)
             oradio_log.info("RMS service started")
         except Exception as ex_err:  # pylint: disable=broad-exception-caught
             oradio_log.error("RMS service failed to start: %s", ex_err)
@@ -733,7 +818,7 @@ class RMService:
         callers and the interactive test menu trigger sends on the
         RMService instance without touching internal state. See
         WifiMessageHandler.send_message() for what each type does and
-        which require WiFi to be connected.
+        how messages wait in the outbox until WiFi is connected.
 
         Args:
             msg_type: HEARTBEAT, SYS_INFO, or INCIDENT.
@@ -746,6 +831,16 @@ class RMService:
 
         self._handler.send_message(msg_type, incident)
 
+    @property
+    def outbox_depth(self) -> int:
+        """Number of messages waiting in the outbox."""
+        return self._outbox.depth
+
+    @property
+    def outbox_age(self) -> float:
+        """Seconds the oldest message in the outbox has been waiting, 0 if none."""
+        return self._outbox.age
+
     def stop(self) -> None:
         """
         Shut down the RMS service cleanly.
@@ -761,7 +856,7 @@ class RMService:
         # Invariant: start() always sets _queue and _handler together, and
         # every reset path (here and the rollback in start()) clears both
         # together, so _handler being set guarantees _queue is too. Asserted
-        # so mypy can narrow _queue from Optional[Queue] to Queue below.
+        # so mypy can narrow _queue from Optional[BusQueue] to BusQueue below.
         assert self._queue is not None
 
         Heartbeat.stop_heartbeat()
@@ -782,7 +877,7 @@ if __name__ == "__main__":
     # Most modules use similar code in stand-alone
     # pylint: disable=duplicate-code
 
-    def interactive_menu() -> None:
+    def interactive_menu() -> None:     # pylint: disable=too-many-branches
         """
         Run an interactive command-line menu for manual RMService testing.
 
@@ -800,6 +895,7 @@ if __name__ == "__main__":
             " 5-Stop heartbeat timer\n"
             " 6-Connect to wifi\n"
             " 7-Disconnect wifi\n"
+            " 8-Show outbox depth and age\n"
             "Select: "
         )
 
@@ -844,6 +940,8 @@ if __name__ == "__main__":
                 case 7:
                     print("\nDisconnecting wifi...\n")
                     wifi_service.wifi_disconnect()
+                case 8:
+                    print(f"\nOutbox: {rms.outbox_depth} messages, oldest {rms.outbox_age:.0f} s\n")
                 case _:
                     print(f"\n{YELLOW}Please input a valid number{NC}\n")
 
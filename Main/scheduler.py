@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary: Oradio timer scheduler
+    One thread runs all delayed and repeating callbacks from a heap,
+    instead of a threading.Timer thread per timer.
+    - call_later() and call_every() return a handle with cancel()
+    - Callbacks run on the scheduler thread and must be quick; pass
+      blocking=True for callbacks which may block (network, MPD), which
+      then run on a small persistent worker pool
+    - stats() reports counts and how late callbacks fire (jitter)
+"""
+import heapq
+from time import monotonic
+from itertools import count
+from threading import Condition, Lock
+from statistics import median
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+##### Oradio modules ######################################
+from singleton import singleton
+from log_service import oradio_log
+from utilities import ThreadTemplate, JOIN_TIMEOUT
+
+##### LOCAL constants #####################################
+# Worker threads for blocking callbacks; created on first use, then kept
+BLOCKING_WORKERS = 2
+# Lateness of this many latest callbacks is kept for stats()
+JITTER_SAMPLES = 200
+# Rebuild the heap when more than this fraction of its entries is cancelled
+COMPACT_RATIO = 0.5
+
+class TimerHandle:
+    """
+    A scheduled callback. Callers only use cancel() and active; the other
+    attributes belong to the Scheduler.
+    """
+    __slots__ = ("due", "seq", "function", "args", "interval", "blocking", "running", "cancelled", "scheduler")
+
+    def __init__(self, scheduler: "Scheduler", due: float, seq: int,    # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 function: Callable, args: tuple, interval: float | None, blocking: bool) -> None:
+        """
+        Args:
+            scheduler: Scheduler owning the handle.
+            due: Monotonic time the callback is due.
+            seq: Scheduling order, to run handles due at the same time in order.
+            function: Callback.
+            args: Positional arguments for the callback.
+            interval: Seconds between runs for a repeating callback, else None.
+            blocking: Run the callback on the worker pool.
+        """
+        self.due = due
+        self.seq = seq
+        self.function = function
+        self.args = args
+        self.interval = interval
+        self.blocking = blocking
+        self.running = False
+        self.cancelled = False
+        self.scheduler = scheduler
+
+    def __lt__(self, other: "TimerHandle") -> bool:
+        """Order by due time, then by scheduling order."""
+        return (self.due, self.seq) < (other.due, other.seq)
+
+    @property
+    def active(self) -> bool:
+        """True until the callback has run (one-shot) or the handle is cancelled."""
+        return not self.cancelled
+
+    def cancel(self) -> bool:
+        """
+        Cancel the callback. A callback already running is not interrupted.
+
+        Returns:
+            True if the handle was active, False if it already ran or was cancelled.
+        """
+        return self.scheduler.cancel(self)
+
+@singleton
+class Scheduler(ThreadTemplate):
+    """
+    Singleton heap-based timer scheduler on one thread.
+
+    Starts its thread on first use. Cancelled handles stay in the heap
+    until they reach the top, or until they outnumber the live ones and
+    the heap is rebuilt.
+    """
+    def __init__(self) -> None:
+        """Initialise the scheduler; its thread starts with the first timer."""
+        # do_work() waits on the condition itself
+        super().__init__(interval=0, name="Scheduler")
+        self._condition = Condition()
+        self._heap: list[TimerHandle] = []
+        self._in_heap_cancelled = 0     # cancelled handles still in the heap
+        self._start_lock = Lock()
+        self._pool: ThreadPoolExecutor | None = None
+        self._sequence = count()
+        self._lateness: deque[float] = deque(maxlen=JITTER_SAMPLES)
+        self._counters = {"scheduled": 0, "fired": 0, "cancelled": 0, "skipped": 0, "failed": 0}
+
+##### Helpers #############################################
+
+    def _schedule(self, delay: float, function: Callable, args: tuple,
+                  interval: float | None, blocking: bool) -> TimerHandle:
+        """Add a handle to the heap, waking the thread if it is due first."""
+        self._ensure_started()
+        handle = TimerHandle(self, monotonic() + max(delay, 0.0), next(self._sequence), function, args, interval, blocking)
+        with self._condition:
+            heapq.heappush(self._heap, handle)
+            self._counters["scheduled"] += 1
+            if self._heap[0] is handle:
+                self._condition.notify()
+        return handle
+
+    def _ensure_started(self) -> None:
+        """Start the scheduler thread if it is not running."""
+        if self.is_alive():
+            return
+        with self._start_lock:
+            if not self.is_alive() and (not self.safe_start() or self.crashed):
+                oradio_log.error("Scheduler thread failed to start: %s", self.exception)
+
+    def _next_due(self) -> TimerHandle | None:
+        """
+        Wait until the first live handle is due and take it: a one-shot
+        handle is retired, a repeating one is rescheduled.
+
+        Returns:
+            The due handle, or None when stopping.
+        """
+        with self._condition:
+            while not self.stopping:
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                    self._in_heap_cancelled -= 1
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0].due - monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                handle = heapq.heappop(self._heap)
+                self._lateness.append(-delay)
+                if handle.interval is None:
+                    handle.cancelled = True
+                else:
+                    # Fixed rate, without catching up on missed runs
+                    handle.due = max(handle.due + handle.interval, monotonic())
+                    heapq.heappush(self._heap, handle)
+                return handle
+        return None
+
+    def _run(self, handle: TimerHandle) -> None:
+        """Run a callback, logging exceptions so they cannot kill the calling thread."""
+        try:
+            handle.function(*handle.args)
+        # Callbacks are supplied by other modules: we cannot predict what they raise
+        except Exception as ex_err:  # pylint: disable=broad-exception-caught
+            self._counters["failed"] += 1
+            oradio_log.error("Scheduled callback %s failed: %s", getattr(handle.function, "__name__", handle.function), ex_err)
+        finally:
+            handle.running = False
+
+##### ThreadTemplate overrides ############################
+
+    def do_work(self) -> None:
+        """Run the next due callback, rescheduling it if it repeats."""
+        handle = self._next_due()
+        if handle is None:
+            return
+        self._counters["fired"] += 1
+
+        if handle.running:
+            # A repeating blocking callback still running from the previous tick
+            self._counters["skipped"] += 1
+            return
+        handle.running = True
+
+        if not handle.blocking:
+            self._run(handle)
+            return
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="SchedulerWorker")
+        self._pool.submit(self._run, handle)
+
+    def safe_stop(self, timeout: float = JOIN_TIMEOUT) -> bool:
+        """Signal the thread to stop, wake it, and wait for it to finish."""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify()
+        return super().safe_stop(timeout)
+
+##### Public API ##########################################
+
+    def call_later(self, delay: float, function: Callable, *args, blocking: bool = False) -> TimerHandle:
+        """
+        Run function(*args) once after delay seconds.
+
+        Args:
+            delay: Seconds from now.
+            function: Callback; must be quick unless blocking is True.
+            args: Positional arguments for the callback.
+            blocking: Run the callback on the worker pool.
+
+        Returns:
+            Handle to cancel the callback.
+        """
+        return self._schedule(delay, function, args, None, blocking)
+
+    def call_every(self, interval: float, function: Callable, *args,
+                   immediate: bool = False, blocking: bool = False) -> TimerHandle:
+        """
+        Run function(*args) every interval seconds until cancelled.
+        A run is skipped while the previous blocking run is still busy.
+
+        Args:
+            interval: Seconds between runs.
+            function: Callback; must be quick unless blocking is True.
+            args: Positional arguments for the callback.
+            immediate: Run the first time now instead of after one interval.
+            blocking: Run the callback on the worker pool.
+
+        Returns:
+            Handle to cancel the callback.
+        """
+        return self._schedule(0.0 if immediate else interval, function, args, interval, blocking)
+
+    def cancel(self, handle: TimerHandle) -> bool:
+        """
+        Cancel a handle; see TimerHandle.cancel().
+
+        Returns:
+            True if the handle was active.
+        """
+        with self._condition:
+            if handle.cancelled:
+                return False
+            handle.cancelled = True
+            self._counters["cancelled"] += 1
+            self._in_heap_cancelled += 1
+            # Lazy deletion, rebuilding only when cancelled entries dominate
+            if self._in_heap_cancelled > COMPACT_RATIO * len(self._heap):
+                self._heap = [live for live in self._heap if not live.cancelled]
+                heapq.heapify(self._heap)
+                self._in_heap_cancelled = 0
+        return True
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the counters, the number of pending timers, and the median,
+        95th percentile and maximum lateness of recent callbacks in ms.
+        """
+        with self._condition:
+            result: dict[str, float] = dict(self._counters)
+            result["pending"] = len(self._heap) - self._in_heap_cancelled
+        lateness = sorted(self._lateness)
+        if lateness:
+            result["late_median_ms"] = round(median(lateness) * 1000, 3)
+            result["late_p95_ms"] = round(lateness[int(0.95 * (len(lateness) - 1))] * 1000, 3)
+            result["late_max_ms"] = round(lateness[-1] * 1000, 3)
+        return result
+
+##### Stand-alone entry point #############################
+
+if __name__ == "__main__":
+
+    # Imports only relevant when stand-alone
+    from time import sleep                          # pylint: disable=ungrouped-imports
+    from constants import YELLOW, NC
+    from utilities import input_prompt              # pylint: disable=ungrouped-imports
+
+    # Most modules use similar code in stand-alone
+    # pylint: disable=duplicate-code
+
+    def interactive_menu() -> None:
+        """Show menu with test options"""
+        input_selection = (
+            "Select a function, input the number:\n"
+            " 0-Quit\n"
+            " 1-Schedule a callback after 2 seconds\n"
+            " 2-Repeat a callback every second for 5 seconds\n"
+            " 3-Arm and cancel 10000 timers\n"
+            " 4-Show statistics\n"
+            "Select: "
+        )
+
+        scheduler = Scheduler()
+
+        while True:
+            test_choice = input_prompt(input_selection, int, -1)
+            match test_choice:
+                case 0:
+                    break
+                case 1:
+                    scheduler.call_later(2, print, "\nCallback after 2 seconds\n")
+                case 2:
+                    handle = scheduler.call_every(1, print, "Tick")
+                    sleep(5.5)
+                    handle.cancel()
+                case 3:
+                    for _ in range(10000):
+                        scheduler.call_later(1, print, "Not cancelled").cancel()
+                    print(f"\nPending after cancelling: {scheduler.stats()['pending']}\n")
+                case 4:
+                    print(f"\nScheduler statistics: {scheduler.stats()}\n")
+                case _:
+                    print(f"\n{YELLOW}Please input a valid number{NC}\n")
+
+    print("\nStarting test program...\n")
+
+    interactive_menu()
+
+    print("\nExiting test program...\n")
+
+    # Restore temporarily disabled pylint duplicate code check
+    # pylint: enable=duplicate-code
@@ -22,12 +22,20 @@ Created on February 1, 2025
     Connection stays active and music keeps streaming. The status of the
     Librespot connection is monitored via Librespot events which write
     status into two files: spotactive.flag and spotplaying.flag.
+    The flag directory is watched with inotify, so a state change is
+    published as soon as the event hook closes the file; slow polling is
+    only used while inotify is unavailable.
 """
+import os
+import ctypes
+import ctypes.util
+import struct
 import subprocess
+from select import select
 
 ##### Oradio modules ######################################
 from log_service import oradio_log
-from utilities import ThreadTemplate
+from utilities import ThreadTemplate, JOIN_TIMEOUT
 from messaging import (
     Commands,
     Incidents,
@@ -48,13 +56,98 @@ from messaging import (
 ALSA_MIXER_SPOTCON = "VolumeSpotCon1"
 ACTIVE_FLAG_FILE   = "/home/pi/Oradio3/Spotify/spotactive.flag"
 PLAYING_FLAG_FILE  = "/home/pi/Oradio3/Spotify/spotplaying.flag"
-MONITOR_INTERVAL   = 0.5  # seconds between flag file polls
+MONITOR_INTERVAL   = 2.0  # seconds between flag file polls, only when inotify is unavailable
+RESYNC_INTERVAL    = 60   # seconds between flag file re-reads while watching with inotify
+# inotify(7) constants
+IN_NONBLOCK    = os.O_NONBLOCK
+IN_CLOEXEC     = os.O_CLOEXEC
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+# Flag files written or removed, and loss of the watched directory itself
+FLAG_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+# struct inotify_event header: wd, mask, cookie, len
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_READ_SIZE = 4096
+
+class _FlagWatcher:
+    """
+    Minimal ctypes binding to inotify, watching one directory for
+    flag files being written (close-write), moved in or deleted.
+    """
+    def __init__(self, directory: str, names: set[str]) -> None:
+        """
+        Create the inotify instance and watch the directory.
+
+        Args:
+            directory: Directory holding the flag files.
+            names: Base names of the flag files to report.
+
+        Raises:
+            OSError: If libc lacks inotify, or the directory cannot be watched.
+        """
+        library = ctypes.util.find_library("c")
+        if library is None:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(library, use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_init1.restype = ctypes.c_int
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_add_watch.restype = ctypes.c_int
+
+        self._names = {name.encode() for name in names}
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        if libc.inotify_add_watch(self.fd, directory.encode(), FLAG_WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch({directory}) failed: {os.strerror(errno)}")
+
+    def read_events(self) -> tuple[bool, bool]:
+        """
+        Drain the pending events.
+
+        Returns:
+            (changed, lost): changed is True if a flag file was written,
+            moved in or deleted, or events overflowed; lost is True if the
+            directory watch is gone and the watcher must be closed.
+        """
+        changed = lost = False
+        while True:
+            try:
+                buffer = os.read(self.fd, INOTIFY_READ_SIZE)
+            except BlockingIOError:
+                return changed, lost
+            offset = 0
+            while offset < len(buffer):
+                _, mask, _, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+                name = buffer[offset + INOTIFY_EVENT.size : offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+                offset += INOTIFY_EVENT.size + length
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    lost = True
+                if mask & IN_Q_OVERFLOW or name in self._names:
+                    changed = True
+
+    def close(self) -> None:
+        """Close the inotify instance, removing its watch."""
+        os.close(self.fd)
 
 class _SpotifyMonitorWorker(ThreadTemplate):
     """
-    Background worker that polls the Librespot flag files and publishes
+    Background worker that watches the Librespot flag files and publishes
     connect/play state-change events.
 
+    Sleeps in select() on the inotify descriptor and a wake pipe, so it
+    only wakes when a flag file changes, for a slow resync, or to stop.
+    Without inotify (or while the flag directory does not exist) it polls
+    every MONITOR_INTERVAL, retrying inotify on each poll.
+
     One instance is created per SpotifyConnect object (see
     SpotifyConnect.__init__) and reused across repeated start()/stop()
     cycles: ThreadTemplate itself is restartable, so a single
@@ -62,12 +155,50 @@ class _SpotifyMonitorWorker(ThreadTemplate):
     any number of times.
     """
     def __init__(self, spotify: "SpotifyConnect") -> None:
-        super().__init__(interval=MONITOR_INTERVAL, name="SpotifyMonitorWorker")
+        # do_work() does its own waiting in select()
+        super().__init__(interval=0, name="SpotifyMonitorWorker")
         self._spotify = spotify
         # Snapshot of active/playing from the previous do_work() iteration,
         # used to detect transitions. Set in setup(), updated in do_work().
         self._prev_active = False
         self._prev_playing = False
+        self._watcher: _FlagWatcher | None = None
+        # Written to by safe_stop() to interrupt select()
+        self._wake_read, self._wake_write = os.pipe()
+        os.set_blocking(self._wake_read, False)
+        # Wakeups by cause, to measure idle load
+        self._wakeups = {"inotify": 0, "poll": 0, "resync": 0}
+        self._warned_polling = False
+
+    def _watch(self) -> None:
+        """Try to start watching the flag directory; keep polling if that fails."""
+        directory = os.path.dirname(ACTIVE_FLAG_FILE)
+        names = {os.path.basename(ACTIVE_FLAG_FILE), os.path.basename(PLAYING_FLAG_FILE)}
+        try:
+            self._watcher = _FlagWatcher(directory, names)
+            oradio_log.info("SpotifyConnect: watching %s with inotify", directory)
+            self._warned_polling = False
+        except (OSError, AttributeError) as ex_err:
+            # AttributeError: libc loaded but lacks the inotify symbols
+            if not self._warned_polling:
+                oradio_log.warning("SpotifyConnect: inotify unavailable, polling flag files: %s", ex_err)
+                self._warned_polling = True
+
+    def _unwatch(self) -> None:
+        """Stop watching the flag directory."""
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+
+    def get_wakeups(self) -> dict[str, int]:
+        """Return the number of wakeups per cause since creation."""
+        return dict(self._wakeups)
+
+    def safe_stop(self, timeout: float = JOIN_TIMEOUT) -> bool:
+        """Signal the worker to stop, interrupt its select(), and wait for it to finish."""
+        self._stop_event.set()
+        os.write(self._wake_write, b"x")
+        return super().safe_stop(timeout)
 
     def setup(self) -> None:
         """
@@ -77,14 +208,23 @@ class _SpotifyMonitorWorker(ThreadTemplate):
         spurious transition events for the startup state.
         """
         oradio_log.info("SpotifyConnect: starting flag monitoring.")
+        # Drop wakeups left over from a previous stop
+        try:
+            while os.read(self._wake_read, INOTIFY_READ_SIZE):
+                pass
+        except BlockingIOError:
+            pass
+        # Watch before the initial read, so no change can slip in between
+        self._watch()
         self._spotify.update_flags()
         self._prev_active = self._spotify.active
         self._prev_playing = self._spotify.playing
 
     def do_work(self) -> None:
         """
-        One poll iteration: re-read the flag files and publish events for
-        any active/playing transition since the previous iteration.
+        Wait for a flag file change (or the poll/resync interval), then
+        re-read the flag files and publish events for any active/playing
+        transition since the previous iteration.
 
         Transitions detected:
         - active  0->1: SPOTIFY_CONNECTED_EVENT
@@ -92,6 +232,9 @@ class _SpotifyMonitorWorker(ThreadTemplate):
         - playing 0->1: SPOTIFY_PLAYING_EVENT
         - playing 1->0: SPOTIFY_PAUSED_EVENT
         """
+        if not self._wait_for_change():
+            return
+
         self._prev_active = self._spotify.active
         self._prev_playing = self._spotify.playing
         self._spotify.update_flags()
@@ -108,8 +251,42 @@ class _SpotifyMonitorWorker(ThreadTemplate):
             else:
                 Commands.publish(CommandMessage(SPOTIFY_SOURCE, SPOTIFY_PAUSED_EVENT))
 
+    def _wait_for_change(self) -> bool:
+        """
+        Sleep until a flag file may have changed.
+
+        Returns:
+            True if the flag files must be re-read, False if stopping or
+            if nothing relevant changed.
+        """
+        watcher = self._watcher
+        readers = [self._wake_read] if watcher is None else [self._wake_read, watcher.fd]
+        ready, _, _ = select(readers, [], [], MONITOR_INTERVAL if watcher is None else RESYNC_INTERVAL)
+        if self._stop_event.is_set():
+            return False
+
+        if watcher is None:
+            self._wakeups["poll"] += 1
+            # The flag directory may exist by now
+            self._watch()
+            return True
+
+        if watcher.fd not in ready:
+            # Safety net for events lost in ways inotify cannot report
+            self._wakeups["resync"] += 1
+            return True
+
+        self._wakeups["inotify"] += 1
+        changed, lost = watcher.read_events()
+        if lost:
+            oradio_log.warning("SpotifyConnect: flag directory watch lost, polling until it is back")
+            self._unwatch()
+            return True
+        return changed
+
     def teardown(self) -> None:
         """Report incident: Oradio never intentionally stops Spotify Monitor."""
+        self._unwatch()
         Incidents.publish(IncidentMessage(SPOTIFY_SOURCE, SPOTIFY_STOPPED))
 
 class SpotifyConnect:
@@ -124,7 +301,7 @@ class SpotifyConnect:
     def __init__(self):
         """
         Initialize SpotifyConnect. Does NOT start monitoring automatically
-        -- call start() to begin polling the flag files.
+        -- call start() to begin watching the flag files.
         """
         self.active = False
         self.playing = False
@@ -219,6 +396,10 @@ class SpotifyConnect:
         """
         return {"active": self.active, "playing": self.playing}
 
+    def get_monitor_wakeups(self) -> dict[str, int]:
+        """Return the flag monitor's wakeups per cause: 'inotify', 'poll' and 'resync'."""
+        return self._worker.get_wakeups()
+
     # ---------- Monitor thread control ----------
 
     def start(self) -> None:
@@ -291,6 +472,7 @@ if __name__ == '__main__':
             " 2-Stop flag monitor\n"
             " 3-Unmute (100% volume)\n"
             " 4-Mute (0% volume)\n"
+            " 5-Show state and monitor wakeups\n"
             "Select: "
         )
 
@@ -311,6 +493,8 @@ if __name__ == '__main__':
                     spotify.unmute()
                 case 4:
                     spotify.mute()
+                case 5:
+                    print(f"\nState: {spotify.get_state()}, wakeups: {spotify.get_monitor_wakeups()}\n")
                 case _:
                     print(f"\n{YELLOW}Please input a valid number{NC}\n")
 
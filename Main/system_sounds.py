@@ -16,12 +16,28 @@ Created on January 30, 2025
 @email:         oradioinfo@stichtingoradio.nl
 @status:        Development
 @summary:       Oradio System Sound Player
+    - Decodes every system sound into memory once and keeps ALSA PCM
+      handles open, accessed through libasound via ctypes, so playing a
+      sound is a buffer write instead of a fork+exec of `aplay`
+    - Overlap policy: a click interrupts a click still playing; all other
+      sounds queue and play one after the other, mixed with clicks
+    - Falls back to one `aplay` process per sound when libasound or the
+      PCM device is unavailable
 """
+import ctypes
+import ctypes.util
+import wave
 import subprocess
+from time import perf_counter
+from queue import Queue, Full
 from pathlib import Path
+from threading import Event, Lock
+from statistics import median
 
 ##### Oradio modules ######################################
+from singleton import singleton
 from log_service import oradio_log
+from utilities import ThreadTemplate, JOIN_TIMEOUT
 from messaging import (
     Incidents,
     IncidentMessage,
@@ -57,6 +73,19 @@ from constants import (
 
 # ALSA device for playing system sounds
 SYSTEM_SOUND_SINK = "SysSound_in"
+# snd_pcm_stream_t / snd_pcm_access_t values
+SND_PCM_STREAM_PLAYBACK = 0
+SND_PCM_ACCESS_RW_INTERLEAVED = 3
+# snd_pcm_format_t per WAV sample width (8 bit WAV is unsigned)
+SND_PCM_FORMATS = {1: 1, 2: 2, 3: 32, 4: 10}     # U8, S16_LE, S24_3LE, S32_LE
+# Buffer size requested from ALSA; also bounds how late a click can be interrupted
+PCM_LATENCY_US = 50000
+# Announcements are written in chunks of this many seconds, so stop() is not held up
+WRITE_CHUNK_SECONDS = 0.1
+# Announcements waiting beyond this are dropped
+MAX_QUEUED_SOUNDS = 8
+# Click latencies kept for get_click_latency()
+LATENCY_SAMPLES = 100
 
 # Directory containing system sound files
 SOUND_FILES = {
@@ -88,31 +117,365 @@ if not Path(SOUNDS_PATH).is_dir():
     oradio_log.critical("System sounds directory not found: %s", SOUNDS_PATH)
     Incidents.publish(IncidentMessage(SOUND_SOURCE, SOUND_MISSING_DIR))
 
-def play_sound(sound_key: str) -> None:
+class _AlsaPcm:
+    """
+    Minimal ctypes binding to a libasound playback PCM in one fixed format.
+    Not thread-safe: each PCM is only used by the channel worker owning it.
     """
-    Launch a fire-and-forget subprocess that plays the given system sound.
+    def __init__(self, lib: ctypes.CDLL, device: str, sample_format: tuple[int, int, int]) -> None:
+        """
+        Open the PCM device and configure it for the given format.
 
-    The function returns as soon as the playback process is launched;
-    it does not wait for playback to complete and provides no return value
-    to indicate success or failure. If the sound key is unknown or its file
-    is missing, the error is logged and the function returns silently.
+        Args:
+            lib: libasound, with prototypes declared by _load_libasound().
+            device: ALSA PCM name.
+            sample_format: (sample width in bytes, channels, rate).
 
-    Args:
-        sound_key (str): One of the SOUND_* constants imported from constants
-                         (e.g. SOUND_START, SOUND_CLICK). Must be a key in
-                         SOUND_FILES; an unknown key is logged as an error.
+        Raises:
+            OSError: If the device cannot be opened or configured.
+        """
+        self._lib = lib
+        self._handle = ctypes.c_void_p()
+        width, channels, rate = sample_format
+        self.rate = rate
+        err = lib.snd_pcm_open(ctypes.byref(self._handle), device.encode(), SND_PCM_STREAM_PLAYBACK, 0)
+        if err < 0:
+            raise OSError(f"snd_pcm_open({device}) failed: {self._strerror(err)}")
+        err = lib.snd_pcm_set_params(
+            self._handle, SND_PCM_FORMATS[width], SND_PCM_ACCESS_RW_INTERLEAVED,
+            channels, rate, 1, PCM_LATENCY_US
+        )
+        if err < 0:
+            lib.snd_pcm_close(self._handle)
+            raise OSError(f"snd_pcm_set_params({device}, {sample_format}) failed: {self._strerror(err)}")
+
+    def _strerror(self, err: int) -> str:
+        """Return the libasound error description for a negative error code."""
+        message = self._lib.snd_strerror(err)
+        return message.decode(errors="replace") if message else str(err)
+
+    def write(self, sound: "_Sound", first: int, frames: int) -> None:
+        """
+        Write frames of a sound, blocking until they are all in the ALSA buffer.
+        Recovers from an underrun, which is the normal state of an idle PCM.
+
+        Raises:
+            OSError: If the frames cannot be written.
+        """
+        end = first + frames
+        while first < end:
+            written = self._lib.snd_pcm_writei(
+                self._handle, ctypes.byref(sound.data, first * sound.frame_bytes), end - first
+            )
+            if written < 0:
+                err = self._lib.snd_pcm_recover(self._handle, written, 1)
+                if err < 0:
+                    raise OSError(f"snd_pcm_writei failed: {self._strerror(err)}")
+                continue
+            first += written
+
+    def delay(self) -> float:
+        """Return the seconds until a frame written now would be heard; 0.0 if unknown."""
+        frames = ctypes.c_long()
+        if self._lib.snd_pcm_delay(self._handle, ctypes.byref(frames)) < 0:
+            return 0.0
+        return frames.value / self.rate
+
+    def restart(self) -> None:
+        """Discard the frames still playing and make the PCM ready for new ones."""
+        self._lib.snd_pcm_drop(self._handle)
+        self._lib.snd_pcm_prepare(self._handle)
+
+    def drain(self) -> None:
+        """Block until the frames written have been played."""
+        self._lib.snd_pcm_drain(self._handle)
+        # drain() leaves the PCM in SETUP state, also when it fails
+        self._lib.snd_pcm_prepare(self._handle)
+
+    def close(self) -> None:
+        """Close the PCM."""
+        self._lib.snd_pcm_close(self._handle)
+
+def _load_libasound() -> ctypes.CDLL:
     """
-    # Resolve the sound key to a file path
-    sound_file = SOUND_FILES.get(sound_key)
-    if not sound_file:
-        oradio_log.error("Invalid sound key: %s", sound_key)
-        return
+    Load libasound and declare the PCM prototypes used by _AlsaPcm.
 
-    # Verify the file exists before attempting playback
-    if not Path(sound_file).is_file():
-        oradio_log.debug("Sound file does not exist or is not a file: %s", sound_file)
-        return
+    Raises:
+        OSError: If libasound cannot be loaded.
+        AttributeError: If libasound lacks an expected symbol.
+    """
+    library = ctypes.util.find_library("asound")
+    if library is None:
+        raise OSError("libasound not found")
+    lib = ctypes.CDLL(library)
+    void_p, void_pp = ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p)
+    c_int, c_uint, c_long, c_ulong = ctypes.c_int, ctypes.c_uint, ctypes.c_long, ctypes.c_ulong
+    prototypes = {
+        "snd_pcm_open":       (c_int,  [void_pp, ctypes.c_char_p, c_int, c_int]),
+        "snd_pcm_set_params": (c_int,  [void_p, c_int, c_int, c_uint, c_uint, c_int, c_uint]),
+        "snd_pcm_writei":     (c_long, [void_p, void_p, c_ulong]),
+        "snd_pcm_recover":    (c_int,  [void_p, c_int, c_int]),
+        "snd_pcm_delay":      (c_int,  [void_p, ctypes.POINTER(c_long)]),
+        "snd_pcm_drop":       (c_int,  [void_p]),
+        "snd_pcm_drain":      (c_int,  [void_p]),
+        "snd_pcm_prepare":    (c_int,  [void_p]),
+        "snd_pcm_close":      (c_int,  [void_p]),
+        "snd_strerror":       (ctypes.c_char_p, [c_int]),
+    }
+    for name, (restype, argtypes) in prototypes.items():
+        function = getattr(lib, name)
+        function.restype = restype
+        function.argtypes = argtypes
+    return lib
+
+class _Sound:
+    """
+    System sound decoded into memory: raw interleaved frames plus the
+    format needed to play them.
+    """
+    def __init__(self, file_path: str) -> None:
+        """
+        Decode a WAV file.
+
+        Raises:
+            OSError, EOFError, wave.Error: If the file cannot be read or decoded.
+            ValueError: If the sample width is not supported.
+        """
+        with wave.open(file_path, "rb") as wav:
+            width, channels, rate = wav.getsampwidth(), wav.getnchannels(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+        if width not in SND_PCM_FORMATS:
+            raise ValueError(f"unsupported sample width {width}")
+        self.format = (width, channels, rate)
+        self.frame_bytes = width * channels
+        self.frames = len(frames) // self.frame_bytes
+        self.data = ctypes.create_string_buffer(frames, len(frames))
+
+class _ClickChannel(ThreadTemplate):
+    """
+    Plays clicks. A new click interrupts the one still playing, so
+    mashing a button never builds up a backlog.
+    """
+    def __init__(self, pcm: _AlsaPcm, sound: _Sound) -> None:
+        # do_work() waits for _wake itself
+        super().__init__(interval=0, name="ClickChannel")
+        self._pcm = pcm
+        self._sound = sound
+        self._wake = Event()
+        self._lock = Lock()
+        self._requested: float | None = None
+        self._latencies: list[float] = []
+
+    def play(self) -> None:
+        """Request a click; replaces a request not yet started."""
+        with self._lock:
+            self._requested = perf_counter()
+        self._wake.set()
+
+    def do_work(self) -> None:
+        """Wait for a click request, then restart the PCM with the click."""
+        self._wake.wait()
+        self._wake.clear()
+        with self._lock:
+            requested, self._requested = self._requested, None
+        if requested is None or self.stopping:
+            return
+
+        try:
+            self._pcm.restart()
+            self._pcm.write(self._sound, 0, self._sound.frames)
+        except OSError as ex_err:
+            oradio_log.error("Failed to play click: %s", ex_err)
+            Incidents.publish(IncidentMessage(SOUND_SOURCE, SOUND_PLAYBACK_FAILED))
+            return
+
+        # Until the first frame is heard: handed over and written, plus what ALSA still has queued before it
+        queued = self._pcm.delay() - self._sound.frames / self._pcm.rate
+        latency = perf_counter() - requested + max(queued, 0.0)
+        with self._lock:
+            self._latencies.append(latency)
+            del self._latencies[:-LATENCY_SAMPLES]
+
+    def latencies(self) -> list[float]:
+        """Return the latest click latencies in seconds."""
+        with self._lock:
+            return list(self._latencies)
+
+    def safe_stop(self, timeout: float = JOIN_TIMEOUT) -> bool:
+        """Signal the worker to stop, wake it, and wait for it to finish."""
+        self._stop_event.set()
+        self._wake.set()
+        return super().safe_stop(timeout)
+
+class _AnnouncementChannel(ThreadTemplate):
+    """
+    Plays all sounds except clicks, one after the other in request order.
+    """
+    def __init__(self, pcms: dict[tuple[int, int, int], _AlsaPcm]) -> None:
+        # do_work() blocks on the queue itself
+        super().__init__(interval=0, name="AnnouncementChannel")
+        self._pcms = pcms
+        self._queue: Queue[_Sound | None] = Queue(maxsize=MAX_QUEUED_SOUNDS)
+
+    def play(self, sound: _Sound) -> bool:
+        """
+        Queue a sound.
+
+        Returns:
+            True if queued, False if the queue is full.
+        """
+        try:
+            self._queue.put_nowait(sound)
+        except Full:
+            return False
+        return True
 
+    def do_work(self) -> None:
+        """Play the next queued sound to the end."""
+        sound = self._queue.get()
+        if sound is None or self.stopping:
+            return
+
+        pcm = self._pcms[sound.format]
+        chunk = max(1, int(sound.format[2] * WRITE_CHUNK_SECONDS))
+        try:
+            for first in range(0, sound.frames, chunk):
+                if self.stopping:
+                    pcm.restart()
+                    return
+                pcm.write(sound, first, min(chunk, sound.frames - first))
+            pcm.drain()
+        except OSError as ex_err:
+            oradio_log.error("Failed to play system sound: %s", ex_err)
+            Incidents.publish(IncidentMessage(SOUND_SOURCE, SOUND_PLAYBACK_FAILED))
+
+    def safe_stop(self, timeout: float = JOIN_TIMEOUT) -> bool:
+        """Signal the worker to stop, wake it, and wait for it to finish."""
+        self._stop_event.set()
+        try:
+            self._queue.put_nowait(None)
+        except Full:
+            # The worker is busy and will see stopping before the next get()
+            pass
+        return super().safe_stop(timeout)
+
+@singleton
+class SoundEngine:
+    """
+    Persistent system sound player.
+    - Decodes all SOUND_FILES once and opens one PCM per channel and sound
+      format, kept open for the life of the process.
+    - Clicks and announcements play on separate channels, mixed by dmix.
+    - Reports unavailable when libasound or the PCM cannot be used;
+      play_sound() then falls back to aplay.
+    """
+    def __init__(self) -> None:
+        """
+        Decode the sounds, open the PCM handles and start the channel workers.
+        Logs a warning and leaves the engine unavailable on failure.
+        """
+        self._click: _ClickChannel | None = None
+        self._announcements: _AnnouncementChannel | None = None
+        self._sounds: dict[str, _Sound] = {}
+        self._pcms: list[_AlsaPcm] = []
+
+        for key, file_path in SOUND_FILES.items():
+            if not Path(file_path).is_file():
+                continue
+            try:
+                self._sounds[key] = _Sound(file_path)
+            except (OSError, EOFError, ValueError, wave.Error) as ex_err:
+                oradio_log.error("Failed to decode system sound '%s': %s", file_path, ex_err)
+
+        try:
+            self._open()
+        except (OSError, AttributeError) as ex_err:
+            # AttributeError: libasound loaded but lacks an expected symbol
+            oradio_log.warning("Persistent sound player unavailable, using aplay fallback: %s", ex_err)
+            self.close()
+            return
+        oradio_log.info("System sounds preloaded: %d sounds, %d PCM handles", len(self._sounds), len(self._pcms))
+
+    def _open(self) -> None:
+        """
+        Open the PCM handles and start the channel workers.
+
+        Raises:
+            OSError: If libasound, a PCM or a worker cannot be started.
+        """
+        lib = _load_libasound()
+
+        click = self._sounds.get(SOUND_CLICK)
+        if click is not None:
+            pcm = _AlsaPcm(lib, SYSTEM_SOUND_SINK, click.format)
+            self._pcms.append(pcm)
+            self._click = _ClickChannel(pcm, click)
+            if not self._click.safe_start():
+                raise OSError("click channel failed to start")
+
+        pcms: dict[tuple[int, int, int], _AlsaPcm] = {}
+        for key, sound in self._sounds.items():
+            if key != SOUND_CLICK and sound.format not in pcms:
+                pcms[sound.format] = _AlsaPcm(lib, SYSTEM_SOUND_SINK, sound.format)
+                self._pcms.append(pcms[sound.format])
+        self._announcements = _AnnouncementChannel(pcms)
+        if not self._announcements.safe_start():
+            raise OSError("announcement channel failed to start")
+
+    @property
+    def available(self) -> bool:
+        """True if sounds are played from memory."""
+        return self._announcements is not None
+
+    def play(self, sound_key: str) -> bool:
+        """
+        Play a preloaded sound according to the overlap policy.
+
+        Returns:
+            True if the sound was handed to a channel, False if it is not
+            preloaded or the engine is unavailable.
+        """
+        sound = self._sounds.get(sound_key)
+        if sound is None or self._announcements is None:
+            return False
+
+        if sound_key == SOUND_CLICK and self._click is not None:
+            self._click.play()
+        elif not self._announcements.play(sound):
+            oradio_log.warning("System sound queue full, '%s' dropped", sound_key)
+        return True
+
+    def get_click_latency(self) -> dict[str, float]:
+        """
+        Return statistics over the latest clicks, in milliseconds: time from
+        play_sound() until the click's first frame is heard.
+        """
+        latencies = sorted(self._click.latencies()) if self._click is not None else []
+        if not latencies:
+            return {"count": 0}
+        return {
+            "count": len(latencies),
+            "median_ms": round(median(latencies) * 1000, 2),
+            "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
+
+    def close(self) -> None:
+        """Stop the channel workers and close the PCM handles; later sounds use aplay."""
+        for channel in (self._click, self._announcements):
+            if channel is not None:
+                channel.safe_stop()
+        self._click = self._announcements = None
+        for pcm in self._pcms:
+            pcm.close()
+        self._pcms.clear()
+
+def preload_sounds() -> None:
+    """Decode the system sounds and open the sound device, so the first sound plays without delay."""
+    SoundEngine()
+
+def _play_with_aplay(sound_file: str) -> None:
+    """Play a sound file with a fire-and-forget aplay process."""
     # Launch aplay as a detached process. Passing a list with shell=False avoids
     # shell-injection risks from special characters in the file path.
     # start_new_session=True detaches the child from the parent process group,
@@ -134,6 +497,37 @@ def play_sound(sound_key: str) -> None:
 
     oradio_log.debug("System sound process launched: %s", sound_file)
 
+def play_sound(sound_key: str) -> None:
+    """
+    Play the given system sound without waiting for it to finish.
+
+    Preloaded sounds are played from memory (see SoundEngine); otherwise
+    a fire-and-forget aplay process is launched. The function provides no
+    return value to indicate success or failure. If the sound key is
+    unknown or its file is missing, the error is logged and the function
+    returns silently.
+
+    Args:
+        sound_key (str): One of the SOUND_* constants imported from constants
+                         (e.g. SOUND_START, SOUND_CLICK). Must be a key in
+                         SOUND_FILES; an unknown key is logged as an error.
+    """
+    # Resolve the sound key to a file path
+    sound_file = SOUND_FILES.get(sound_key)
+    if not sound_file:
+        oradio_log.error("Invalid sound key: %s", sound_key)
+        return
+
+    if SoundEngine().play(sound_key):
+        return
+
+    # Verify the file exists before attempting playback
+    if not Path(sound_file).is_file():
+        oradio_log.debug("Sound file does not exist or is not a file: %s", sound_file)
+        return
+
+    _play_with_aplay(sound_file)
+
 ##### Stand-alone entry point #############################
 
 if __name__ == '__main__':
@@ -141,8 +535,8 @@ if __name__ == '__main__':
     # Imports only relevant when stand-alone
     import time
     import random
-    from threading import Thread
-    from utilities import input_prompt
+    from threading import Thread                    # pylint: disable=ungrouped-imports
+    from utilities import input_prompt              # pylint: disable=ungrouped-imports
     from constants import RED, YELLOW, NC           # pylint: disable=ungrouped-imports
 
     # Most modules use similar code in stand-alone
@@ -157,12 +551,14 @@ if __name__ == '__main__':
         menu = "\nSelect a function:\n  0-Quit\n"
         for idx, sound_key in enumerate(sound_keys, start=1):
             menu += f"{idx:>3}-Play {sound_key}\n"
+        menu += " 98-Click latency test (20 clicks)\n"
         menu += " 99-Stress Test (random sounds)\n"
         menu += "100-Custom Sequence Test (enter 5 sound numbers)\n"
         menu += "Select: "
         return menu
 
-    def interactive_menu():
+    # Pylint allows more than 12 branches here because this is a test menu
+    def interactive_menu():     # pylint: disable=too-many-branches
         """
         Run an interactive self-test menu for system sound playback.
         Blocks until the user enters 0 to quit.
@@ -178,6 +574,13 @@ if __name__ == '__main__':
                 print(f"\nPlay {key}\n")
                 play_sound(key)
 
+            elif choice == 98:
+                print(f"\nPersistent player available: {SoundEngine().available}\n")
+                for _ in range(20):
+                    play_sound(SOUND_CLICK)
+                    time.sleep(0.2)
+                print(f"Click latency: {SoundEngine().get_click_latency()}\n")
+
             elif choice == 99:
                 print("\nStress Test\n")
                 try:
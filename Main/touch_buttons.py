@@ -17,14 +17,15 @@ Created on April 28, 2025
 @status:        Development
 @summary:       Oradio touch buttons module with debounce, per-button callbacks, and selftest
 """
-from threading import Timer
 from time import monotonic
 
 ##### Oradio modules ######################################
 from log_service import oradio_log
 from gpio_service import GPIOService
 from system_sounds import play_sound
+from scheduler import Scheduler, TimerHandle
 from singleton import singleton
+from latency_trace import from_data, STAGE_BUTTON
 from messaging import (
     Commands,
     CommandMessage,
@@ -63,8 +64,8 @@ class TouchButtons:
     its own stats without this class needing to track anything for them.
     It also forwards any "data" payload a caller attaches to a button event
     (e.g. a timestamp a module test uses for latency measurement) through
-    to the published CommandMessage; outside of tests no caller attaches
-    one, so it is simply None in normal operation.
+    to the published CommandMessage; in normal operation that is the
+    latency trace GPIOService starts for each press (see latency_trace).
     """
     def __init__(self) -> None:
         """
@@ -73,7 +74,7 @@ class TouchButtons:
         self.button_gpio = GPIOService()
         self.button_press_times: dict[str, float] = {}   # tracks the monotonic time of each button press
         self.last_trigger_times: dict[str, float] = {}   # tracks the last accepted press time per button
-        self.long_press_timers: dict[str, Timer] = {}    # maps button name → active long-press Timer
+        self.long_press_timers: dict[str, TimerHandle] = {}  # maps button name → pending long-press timer
 
         # Register the callback before enabling interrupts to guarantee no
         # edge event is missed between registration and the enable call.
@@ -92,10 +93,10 @@ class TouchButtons:
                 'name'  (str): One of BUTTON_PLAY, BUTTON_STOP,
                                BUTTON_PRESET1, BUTTON_PRESET2, BUTTON_PRESET3.
                 'state' (str): BUTTON_RELEASED or BUTTON_LONG_PRESSED.
-                'data'  (Any, optional): Extra payload, e.g. a timestamp
-                               attached by a module test for latency
-                               measurement. Forwarded through as-is;
-                               absent in normal operation.
+                'data'  (Any, optional): Extra payload: the latency trace
+                               GPIOService attaches to a press, or a
+                               timestamp attached by a module test for
+                               latency measurement. Forwarded through as-is.
         """
         if button_data["state"] == BUTTON_LONG_PRESSED:
             msg_text = BUTTON_LONG_PRESS + button_data["name"]
@@ -103,6 +104,8 @@ class TouchButtons:
             msg_text = BUTTON_SHORT_PRESS + button_data["name"]
 
         data = button_data.get("data")
+        if trace := from_data(data):
+            trace.mark(STAGE_BUTTON)
 
         command = CommandMessage(
             source=BUTTON_SOURCE,
@@ -166,10 +169,9 @@ class TouchButtons:
         prev = self.long_press_timers.pop(button_name, None)
         if prev:
             prev.cancel()
-        timer = Timer(LONG_PRESS_DURATION, self._long_press_timeout, args=(button_name,))
-        timer.daemon = True
-        self.long_press_timers[button_name] = timer
-        timer.start()
+        self.long_press_timers[button_name] = Scheduler().call_later(
+            LONG_PRESS_DURATION, self._long_press_timeout, button_name
+        )
 
         play_sound(SOUND_CLICK)
         self._send_message(button_data)
@@ -30,7 +30,7 @@ Created on January 17, 2025
 """
 from os import path, remove
 from json import load, JSONDecodeError
-from threading import Timer, Lock
+from threading import Lock
 from watchdog.observers import Observer
 from watchdog.observers.api import BaseObserver
 from watchdog.events import FileSystemEventHandler
@@ -39,6 +39,7 @@ from watchdog.events import FileSystemEventHandler
 from singleton import singleton
 from log_service import oradio_log
 from wifi_service import networkmanager_add
+from scheduler import Scheduler, TimerHandle
 from messaging import (
     Commands,
     Incidents,
@@ -72,6 +73,9 @@ USB_WIFI_FILE = path.join(USB_MOUNT_POINT, "Wifi_invoer.json")
 # Watchdog gives no callback when its threads die, so this must be polled.
 HEALTH_CHECK_INTERVAL = 30
 
+# How long stop() waits for the observer threads to exit (seconds).
+OBSERVER_JOIN_TIMEOUT = 5
+
 @singleton
 class USBObserver(FileSystemEventHandler):
     """
@@ -310,7 +314,7 @@ class USBService:
 
     Watchdog gives no callback when its threads die (e.g. an unhandled
     exception in a handler, or an emitter hitting the OS inotify watch
-    limit), so a background Timer polls the dispatch and emitter threads
+    limit), so a Scheduler timer polls the dispatch and emitter threads
     every HEALTH_CHECK_INTERVAL seconds. An unexpected death is treated the
     same as an explicit stop(): USB_STOPPED is published and self.observer
     is cleared so a later start() is not blocked by the dead instance.
@@ -323,7 +327,7 @@ class USBService:
         start() to begin monitoring.
         """
         self.observer: BaseObserver | None = None
-        self._health_timer: Timer | None = None
+        self._health_timer: TimerHandle | None = None
 
         # Serialises start()/stop()/_check_health() so a health check firing
         # concurrently with an explicit stop() cannot race on self.observer.
@@ -377,23 +381,25 @@ class USBService:
                 return
 
             self.observer.stop()
-            self.observer.join()
+            self.observer.join(timeout=OBSERVER_JOIN_TIMEOUT)
+            if self.observer.is_alive():
+                oradio_log.warning("USB observer did not stop within %ss", OBSERVER_JOIN_TIMEOUT)
             self.observer = None
             oradio_log.info("USB observer stopped")
             Incidents.publish(IncidentMessage(USB_SOURCE, USB_STOPPED))
 
     def _schedule_health_check(self) -> None:
         """
-        Start (or restart) the one-shot Timer that triggers the next
+        Schedule (or reschedule) the one-shot timer that triggers the next
         health check. Must be called with self._lock held.
         """
-        self._health_timer = Timer(HEALTH_CHECK_INTERVAL, self._check_health)
-        self._health_timer.daemon = True
-        self._health_timer.start()
+        # blocking: the check takes self._lock, which stop() holds while
+        # joining the observer; that must not stall the shared timer thread
+        self._health_timer = Scheduler().call_later(HEALTH_CHECK_INTERVAL, self._check_health, blocking=True)
 
     def _cancel_health_check(self) -> None:
         """
-        Cancel the pending health-check Timer, if any. Must be called with
+        Cancel the pending health-check timer, if any. Must be called with
         self._lock held.
         """
         if self._health_timer is not None:
@@ -405,7 +411,7 @@ class USBService:
         Verify the observer's dispatch thread and all its emitter threads
         are still alive, and reschedule the next check if so.
 
-        Runs on its own Timer thread every HEALTH_CHECK_INTERVAL seconds
+        Runs on the Scheduler worker pool every HEALTH_CHECK_INTERVAL seconds
         while the service is running. A dead dispatch thread or a dead
         emitter thread (e.g. from hitting the inotify watch limit) is not
         reported by watchdog in any other way, so this is the only place
@@ -52,6 +52,8 @@ DNS_TIMEOUT = 0.5   # seconds; short on purpose - callers should fail fast
 
 # Row prefix used by `vcgencmd otp_dump` for the Raspberry Pi serial number.
 SERIAL_OTP_ROW = "28:"
+# get_serial() result when the serial number cannot be read
+UNKNOWN_SERIAL = "Unknown"
 
 JOIN_TIMEOUT = 5.0  # seconds; timeout for thread to start/stop
 
@@ -354,15 +356,15 @@ def get_serial() -> str:
 
     if not result:
         oradio_log.error("Error during <%s> to get serial number, error: %s", cmd, response)
-        return "Unknown"
+        return UNKNOWN_SERIAL
 
     # Parse the output in Python
     for line in response.splitlines():
         if line.startswith(SERIAL_OTP_ROW):
             serial = line[len(SERIAL_OTP_ROW):].strip()
-            return serial or "Unknown"
+            return serial or UNKNOWN_SERIAL
 
-    return "Unknown"
+    return UNKNOWN_SERIAL
 
 def is_service_active(service_name) -> bool:
     """
@@ -18,18 +18,29 @@ Created on January 27, 2025
 @summary: Oradio Volume Control
     Tracks the analog volume knob via the MCP3021 ADC over I2C, maps its
     position to a percentage, and updates the ALSA master volume control
-    whenever the knob moves significantly. Also sets the initial default
+    whenever the knob moves significantly. Mixer writes go through the
+    MixerService, which keeps one ALSA control handle open instead of
+    spawning amixer per change. ADC polling and mixer writes are decoupled:
+    the poller publishes target volumes into a single-slot mailbox and a
+    separate writer thread applies only the newest one, so a slow mixer
+    write never stretches the polling period. Also sets the initial default
     volumes for MPD, Spotify, and system sounds. Publishes a single
     volume-changed message per "turn" of the knob. Notifications are
     automatically disarmed while the knob is moving and re-armed once it
     settles, so other components can react to knob movement without
     polling it themselves and without being flooded during a single turn.
 """
+from collections import deque
+from collections.abc import Callable
+from threading import Lock, Event
+from time import monotonic
+
 ##### Oradio modules ######################################
 from singleton import singleton
 from log_service import oradio_log
 from i2c_service import I2CService
-from utilities import run_shell_script, ThreadTemplate
+from mixer_service import MixerService
+from utilities import ThreadTemplate
 from messaging import (
     Commands,
     Incidents,
@@ -70,11 +81,135 @@ POLLING_MIN_INTERVAL = 0.05
 POLLING_MAX_INTERVAL = 0.3
 POLLING_STEP         = 0.01
 
+# Volume writer: max seconds the writer blocks waiting for a new target
+# volume before re-checking whether it should stop
+WRITER_WAIT_TIMEOUT = 0.5
+# Number of most recent knob-to-mixer latencies kept for percentiles
+LATENCY_WINDOW = 256
+
 # Dedicated idle timeout (seconds) with no significant knob movement before
 # VOLUME_CHANGED notifications are re-armed. Can be tuned on its own for how
 # quickly a user should notice a response after starting to turn the knob again.
 REARM_IDLE_SECONDS = 1.0
 
+class _VolumeMailbox:
+    """
+    Single-slot, latest-value-wins mailbox between the ADC poller and the
+    volume writer.
+
+    Publishing overwrites any value the writer has not taken yet, so the
+    writer only ever applies the newest knob position. Also keeps the
+    counters used to verify smoothness under load:
+        published: target volumes offered by the poller
+        applied:   target volumes written to the mixer
+        coalesced: target volumes overwritten before the writer took them
+        latency:   seconds from ADC read to completed mixer write
+    """
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._ready = Event()
+        # (volume, monotonic time of the ADC read) or None when empty
+        self._slot: tuple[int, float] | None = None
+        self._published = 0
+        self._applied = 0
+        self._coalesced = 0
+        self._latency_max = 0.0
+        self._latency_sum = 0.0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def publish(self, volume: int, read_time: float) -> None:
+        """
+        Offer a new target volume, replacing any value not yet taken.
+
+        Args:
+            volume: Target master volume in the range 0..100.
+            read_time: monotonic() timestamp of the ADC read it came from.
+        """
+        with self._lock:
+            if self._slot is not None:
+                self._coalesced += 1
+            self._slot = (volume, read_time)
+            self._published += 1
+        self._ready.set()
+
+    def take(self, timeout: float) -> tuple[int, float] | None:
+        """
+        Wait up to timeout seconds for a target volume and remove it.
+
+        Returns:
+            (volume, read_time) tuple, or None if nothing arrived in time
+            or the mailbox was woken up to stop.
+        """
+        self._ready.wait(timeout)
+        with self._lock:
+            self._ready.clear()
+            item, self._slot = self._slot, None
+        return item
+
+    def wake(self) -> None:
+        """Unblock a pending take() without offering a value."""
+        self._ready.set()
+
+    def record_applied(self, read_time: float) -> None:
+        """Count an applied target volume and its knob-to-mixer latency."""
+        latency = monotonic() - read_time
+        with self._lock:
+            self._applied += 1
+            self._latency_sum += latency
+            self._latency_max = max(self._latency_max, latency)
+            self._latencies.append(latency)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return a snapshot of the counters; latencies in milliseconds.
+        Percentiles cover the last LATENCY_WINDOW applied volumes.
+        """
+        with self._lock:
+            recent = sorted(self._latencies)
+            applied = self._applied
+            return {
+                "published": self._published,
+                "applied": applied,
+                "coalesced": self._coalesced,
+                "latency_avg_ms": self._latency_sum / applied * 1000 if applied else 0.0,
+                "latency_max_ms": self._latency_max * 1000,
+                "latency_p50_ms": recent[len(recent) // 2] * 1000 if recent else 0.0,
+                "latency_p95_ms": recent[int(len(recent) * 0.95)] * 1000 if recent else 0.0,
+            }
+
+class _VolumeWriter(ThreadTemplate):
+    """
+    Background writer applying the newest target volume from the mailbox.
+
+    Built on ThreadTemplate with interval=0: do_work() itself blocks on the
+    mailbox, so there is no extra delay between two writes. stop() wakes the
+    mailbox after setting the stop event so a pending take() returns at once.
+    """
+    def __init__(self, mailbox: _VolumeMailbox, apply: Callable[[int], None]) -> None:
+        """
+        Args:
+            mailbox: Mailbox the poller publishes target volumes to.
+            apply: Callback that writes a master volume to the mixer.
+        """
+        super().__init__(interval=0, name="VolumeWriter")
+        self._mailbox = mailbox
+        self._apply = apply
+
+    def do_work(self) -> None:
+        """Apply the newest target volume, if one arrives in time."""
+        item = self._mailbox.take(WRITER_WAIT_TIMEOUT)
+        if item is None:
+            return
+        volume, read_time = item
+        self._apply(volume)
+        self._mailbox.record_applied(read_time)
+
+    def stop(self) -> None:
+        """Signal the writer to stop, wake it up, and wait for it to exit."""
+        self._stop_event.set()
+        self._mailbox.wake()
+        self.safe_stop()
+
 @singleton
 class VolumeControl(ThreadTemplate):
     """
@@ -106,18 +241,24 @@ class VolumeControl(ThreadTemplate):
         # I/O below could plausibly fail partway through.
         super().__init__(name="VolumeControl")
 
-        # Set default MPD volume
-        self._set_volume(VOLUME_CONTROL_MPD, DEFAULT_VOLUME_MPD)
+        # Get persistent ALSA mixer access
+        self._mixer = MixerService()
 
-        # Set default Spotify volume
-        self._set_volume(VOLUME_CONTROL_SPOTIFY, DEFAULT_VOLUME_SPOTIFY)
-
-        # Set default system sounds volume
-        self._set_volume(VOLUME_CONTROL_SYS_SOUND, DEFAULT_VOLUME_SYS_SOUND)
+        # Set default MPD, Spotify and system sounds volumes
+        self._set_volumes({
+            VOLUME_CONTROL_MPD:       DEFAULT_VOLUME_MPD,
+            VOLUME_CONTROL_SPOTIFY:   DEFAULT_VOLUME_SPOTIFY,
+            VOLUME_CONTROL_SYS_SOUND: DEFAULT_VOLUME_SYS_SOUND,
+        })
 
         # Get I2C r/w methods
         self._i2c_service = I2CService()
 
+        # Mixer updates are applied by a separate writer thread, fed by the
+        # poller through a latest-value-wins mailbox
+        self._mailbox = _VolumeMailbox()
+        self._writer = _VolumeWriter(self._mailbox, self._set_master_volume)
+
         # Arm notification so the first volume change triggers a message.
         # Automatically disarmed after a change and re-armed once the knob
         # settles again (see do_work()).
@@ -163,28 +304,29 @@ class VolumeControl(ThreadTemplate):
         raw = int(VOL_MIN[:-1]) + (adc - ADC_MIN) * (int(VOL_MAX[:-1]) - int(VOL_MIN[:-1])) / (ADC_MAX - ADC_MIN)
         return max(0, min(100, round(raw)))
 
-    def _set_volume(self, control: str, volume: str) -> None:
+    def _set_volumes(self, volumes: dict[str, str]) -> None:
         """
-        Change volume for the given ALSA control.
+        Change volume for the given ALSA controls in one batched mixer operation.
 
         Args:
-            control: The ALSA volume control to update.
-            volume: The volume to set as a percentage string (e.g. "75%").
-                    Must be in the range 0..100; negative values are rejected.
+            volumes: Mapping of ALSA volume control to the volume to set as a
+                     percentage string (e.g. "75%"). Each must be in the range
+                     0..100; negative values are rejected.
         """
-        # Check if volume is given as percentage and in 0..100 range
-        if not (isinstance(volume, str) and volume.endswith('%') and volume[:-1].isdigit() and 0 <= int(volume[:-1]) <= 100):
-            oradio_log.error("Invalid volume '%s'", volume)
-            return
-
-        # Set volume
-        cmd = f"amixer -c 0 cset name='{control}' {volume}"
-        result, response = run_shell_script(cmd)
-        if not result:
-            oradio_log.error("Error setting volume: %s", response)
+        levels: dict[str, int] = {}
+        for control, volume in volumes.items():
+            # Check if volume is given as percentage and in 0..100 range
+            if not (isinstance(volume, str) and volume.endswith('%') and volume[:-1].isdigit() and 0 <= int(volume[:-1]) <= 100):
+                oradio_log.error("Invalid volume '%s' for '%s'", volume, control)
+                return
+            levels[control] = int(volume[:-1])
+
+        # Set volumes
+        if not self._mixer.set_volumes(levels):
+            oradio_log.error("Error setting volumes: %s", volumes)
             Incidents.publish(IncidentMessage(VOLUME_SOURCE, VOLUME_SET_FAILED))
         else:
-            oradio_log.debug("Volume of '%s' set to: %s", control, volume)
+            oradio_log.debug("Volumes set to: %s", volumes)
 
     def _calculate_sys_sound_volume(self, master_volume: int) -> int:
         """
@@ -220,14 +362,17 @@ class VolumeControl(ThreadTemplate):
         Args:
             volume: Master volume in the range 0..100.
         """
-        # Update the ALSA master volume to match the requested level.
-        self._set_volume(VOLUME_CONTROL_MASTER, f"{volume}%")
-
         # The system-sound channel is intentionally attenuated above
         # VOLUME_SYS_SOUND_FLAT so notification sounds do not become
         # excessively loud as the master volume approaches 100%.
         sys_sound_volume = self._calculate_sys_sound_volume(volume)
-        self._set_volume(VOLUME_CONTROL_SYS_SOUND, f"{sys_sound_volume}%")
+
+        # Update the ALSA master volume to match the requested level,
+        # together with the system-sound channel in the same batch.
+        self._set_volumes({
+            VOLUME_CONTROL_MASTER:    f"{volume}%",
+            VOLUME_CONTROL_SYS_SOUND: f"{sys_sound_volume}%",
+        })
 
         oradio_log.debug(
             "Master volume set to %d%%, system sound volume set to %d%%",
@@ -239,8 +384,8 @@ class VolumeControl(ThreadTemplate):
 
     def setup(self) -> None:
         """
-        One-time init for this run: read the knob's current position and set
-        the master volume to match it before polling begins. Also (re)sets
+        One-time init for this run: read the knob's current position and have
+        the writer set the master volume to match it before polling begins. Also (re)sets
         the polling interval to its slow/idle starting value and clears the
         dedicated re-arm idle timer.
 
@@ -257,7 +402,7 @@ class VolumeControl(ThreadTemplate):
 
         # Initialise the audio subsystem to match the current position of the volume knob
         volume = self._adc2volume(previous_adc)
-        self._set_master_volume(volume)
+        self._mailbox.publish(volume, monotonic())
 
         # Start with 'slow' polling
         self._interval = POLLING_MAX_INTERVAL
@@ -267,8 +412,8 @@ class VolumeControl(ThreadTemplate):
 
     def do_work(self) -> None:
         """
-        One polling iteration: read the knob, update the master volume on a
-        significant change, and adapt the polling interval: fast while the
+        One polling iteration: read the knob, publish a new target master
+        volume to the writer on a significant change, and adapt the polling interval: fast while the
         knob is turning, easing back down to idle otherwise.
 
         Only one VOLUME_CHANGED message is published per "turn": the first
@@ -284,6 +429,7 @@ class VolumeControl(ThreadTemplate):
         ThreadTemplate's run() loop reads it fresh after each do_work() call
         to decide how long to wait before the next one.
         """
+        read_time = monotonic()
         adc_value = self._read_adc()
         if adc_value is None:
             oradio_log.warning("ADC read failed. Retrying...")
@@ -296,9 +442,10 @@ class VolumeControl(ThreadTemplate):
             # Convert ADC reading to volume level
             volume = self._adc2volume(adc_value)
 
-            # Convert the knob position into a master-volume percentage
-            # and update every volume control derived from it
-            self._set_master_volume(volume)
+            # Hand the new master-volume percentage to the writer, which
+            # updates every volume control derived from it. Never blocks:
+            # a value the writer has not applied yet is simply replaced.
+            self._mailbox.publish(volume, read_time)
 
             # Disarmed until the knob settles again, preventing repeated
             # notifications while it's still being turned.
@@ -342,6 +489,12 @@ class VolumeControl(ThreadTemplate):
             oradio_log.debug("Volume manager thread already running")
             return
 
+        # The writer must run before the poller publishes its first volume
+        if not self._writer.is_alive() and not self._writer.safe_start():
+            oradio_log.error("Volume writer thread failed to start")
+            Incidents.publish(IncidentMessage(VOLUME_SOURCE, VOLUME_START_FAILED))
+            return
+
         if not self.safe_start():
             oradio_log.error("Volume manager thread failed to start")
             Incidents.publish(IncidentMessage(VOLUME_SOURCE, VOLUME_START_FAILED))
@@ -360,9 +513,19 @@ class VolumeControl(ThreadTemplate):
 
         Thin wrapper around ThreadTemplate.safe_stop() that preserves this
         class's original public API. The stop incident itself is published
-        by teardown(), which always runs when the polling loop exits.
+        by teardown(), which always runs when the polling loop exits. The
+        writer is stopped after the poller, so the last published volume is
+        still applied.
         """
         self.safe_stop()
+        self._writer.stop()
+
+    def stats(self) -> dict[str, float]:
+        """
+        Return the volume writer counters: published, applied and coalesced
+        target volumes, and knob-to-mixer latency in milliseconds.
+        """
+        return self._mailbox.stats()
 
 ##### Stand-alone entry point #############################
 
@@ -387,6 +550,7 @@ if __name__ == "__main__":
             " 0-Quit\n"
             " 1-Start volume control\n"
             " 2-Stop volume control\n"
+            " 3-Show volume writer statistics\n"
             "Select: "
         )
 
@@ -405,6 +569,11 @@ if __name__ == "__main__":
                 case 2:
                     print("\nStopping volume control...")
                     volume_control.stop()
+                case 3:
+                    print("\nVolume writer statistics:")
+                    for key, value in volume_control.stats().items():
+                        print(f"  {key:15}: {value:.2f}" if isinstance(value, float) else f"  {key:15}: {value}")
+                    print()
                 case _:
                     print(f"\n{YELLOW}Please input a valid number{NC}\n")
 
@@ -21,27 +21,41 @@ Created on December 23, 2024
     exposes a generic /execute command endpoint, manages a keep-alive
     timer that shuts the server down when the browser stops pinging,
     and redirects all unmatched paths back to /oradio3.
+    Song lists can be requested in pages (offset/limit/cursor) or
+    streamed as NDJSON, one song per line.
+    Blocking command handlers (MPD, shell) run in a bounded worker pool
+    with a timeout, so they never stall the event loop or keep-alive.
+    The /oradio3 page context is cached per section and served with an
+    ETag; /oradio3/context/{section} returns one section as JSON.
     References:
         https://fastapi.tiangolo.com/
 """
-from os import path
+from os import path, stat
 from re import match
 from typing import Any
-from json import load, JSONDecodeError
-from asyncio import sleep, create_task, CancelledError
+from json import load, dumps, JSONDecodeError
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as Base64Error
+from dataclasses import dataclass
+from collections.abc import Callable, Iterator
+from asyncio import sleep, create_task, wait_for, wrap_future, CancelledError
+from threading import BoundedSemaphore, Lock
+from hashlib import blake2b
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import RedirectResponse
 
 #### Oradio modules #######################################
 from log_service import oradio_log
-from utilities import get_serial, run_shell_script, load_presets, store_presets
+from utilities import get_serial, run_shell_script, load_presets, store_presets, UNKNOWN_SERIAL
 from wifi_service import get_wifi_networks, get_saved_network
 from mpd_control import MPDControl
+from metrics import MetricsRegistry
 from messaging import (
     Commands,
     safe_put,
@@ -63,6 +77,7 @@ from constants import (
     ACCESS_POINT_HOST,
     REQUEST_CONNECT,
     REQUEST_STOP,
+    PRESETS_FILE,
 )
 
 #### LOCAL constants ######################################
@@ -73,9 +88,28 @@ INFO_ERROR   = {"dtstamp": "undefined", "version": "undefined"}
 # Location of the JSON file written by the build/deploy process
 SOFTWARE_VERSION_FILE = "/var/log/oradio_sw_version.log"
 
+# Unit file holding the Spotify device name, changed by rename_spotify()
+LIBRESPOT_UNIT_FILE = "/etc/systemd/system/librespot.service"
+
 # Seconds of inactivity before the keep-alive timer fires and stops the server.
 # The browser pings every 2 s, so missing 2 consecutive pings triggers shutdown.
 KEEP_ALIVE_TIMEOUT = 5
+# Requests which do not count as user activity for the keep-alive timer;
+# a metrics scraper must not keep the access point open
+KEEP_ALIVE_NEUTRAL_PATHS = ("/keep_alive", "/metrics")
+
+# Worker threads for blocking command handlers (MPD, shell commands)
+WORKER_THREADS = 4
+# Max blocking handlers running or queued; more are refused with 503,
+# so a hanging MPD cannot pile up requests
+MAX_PENDING = 8
+# Seconds a blocking handler may take; below the 5 s request timeout of the web page
+BLOCKING_TIMEOUT = 4
+# Renaming Spotify restarts librespot, which takes longer
+SPOTIFY_TIMEOUT = 20
+
+# Max songs per page; also the number of songs per chunk when streaming
+MAX_PAGE_SIZE = 500
 
 # Full URL required by some mobile browsers (e.g. iOS Safari) that reject bare
 # hostnames in redirect responses.
@@ -87,6 +121,10 @@ mpd_control = MPDControl()
 # FastAPI application instance shared by all route handlers
 api_app = FastAPI()
 
+# Runs blocking handlers off the event loop; _pending counts running + queued
+_worker_pool = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="WebWorker")
+_pending     = BoundedSemaphore(MAX_PENDING)
+
 # Derive the path to web assets relative to this source file's location
 web_path = path.dirname(path.dirname(path.realpath(__file__))) + "/webapp"
 
@@ -116,7 +154,8 @@ async def keep_alive_middleware(request: Request, call_next):
     This prevents the server from timing out while actively serving a request.
 
     /keep_alive requests are passed through without touching the timer, as
-    the /keep_alive endpoint manages the deadline itself.
+    the /keep_alive endpoint manages the deadline itself; so are /metrics
+    requests, which come from a scraper rather than the user.
 
     Args:
         request:   The incoming HTTP request.
@@ -127,7 +166,7 @@ async def keep_alive_middleware(request: Request, call_next):
     """
     # Pause the timer for any request other than /keep_alive, but only after
     # the timer has been armed by the first ping.
-    if request.url.path != "/keep_alive" and api_app.state.timer_started:
+    if request.url.path not in KEEP_ALIVE_NEUTRAL_PATHS and api_app.state.timer_started:
         task = getattr(api_app.state, "timer_task", None)
         if task and not task.done():
             task.cancel()
@@ -140,7 +179,7 @@ async def keep_alive_middleware(request: Request, call_next):
 
     # Restart the timer after the response is ready, again only for non-ping
     # requests once the timer has been armed.
-    if request.url.path != "/keep_alive" and api_app.state.timer_started:
+    if request.url.path not in KEEP_ALIVE_NEUTRAL_PATHS and api_app.state.timer_started:
         api_app.state.timer_deadline = datetime.now(timezone.utc) + timedelta(seconds=KEEP_ALIVE_TIMEOUT)
         # If a task is already running, it will pick up the new deadline on its
         # next poll iteration; only create a new task when none is running.
@@ -152,6 +191,241 @@ async def keep_alive_middleware(request: Request, call_next):
 
 ##### Helpers #############################################
 
+class _FileCachedValue:
+    """
+    Value derived from a file, reloaded only when the file's modification
+    time or size changes, or after invalidate(). A file which cannot be
+    stat'ed is never cached.
+    """
+    def __init__(self, file_path: str, loader: Callable[[], Any]) -> None:
+        """
+        Args:
+            file_path: File the value depends on.
+            loader: Returns the value, or None on failure (not cached).
+        """
+        self._path   = file_path
+        self._loader = loader
+        self._lock   = Lock()
+        self._key: tuple[int, int] | None = None
+        self._value: Any = None
+
+    def get(self) -> Any:
+        """Return the cached value, reloading it if the file changed."""
+        try:
+            file_stat = stat(self._path)
+            key: tuple[int, int] | None = (file_stat.st_mtime_ns, file_stat.st_size)
+        except OSError:
+            key = None
+
+        with self._lock:
+            if key is not None and key == self._key:
+                return self._value
+
+        value = self._loader()
+        if value is not None:
+            with self._lock:
+                self._key, self._value = key, value
+        return value
+
+    def invalidate(self) -> None:
+        """Force a reload on the next get()."""
+        with self._lock:
+            self._key = None
+
+def _etag(content: Any) -> str:
+    """Return a strong ETag for JSON-serialisable content."""
+    digest = blake2b(dumps(content, sort_keys=True).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Return True if the request's If-None-Match header matches etag."""
+    header = request.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags or "*" in tags
+
+async def _run_blocking(name: str, timeout: float, function: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a blocking function in the worker pool and await its result.
+
+    The work cannot be interrupted: on timeout it finishes in the
+    background, and keeps counting towards MAX_PENDING until it does.
+
+    Args:
+        name: Name of the command, for logging and error messages.
+        timeout: Max seconds to wait for the result.
+        function: The blocking function.
+        *args: Arguments passed to function.
+
+    Returns:
+        The function's return value, or a JSONResponse with status 503 if
+        MAX_PENDING handlers are already pending, or 504 on timeout.
+
+    Raises:
+        Any exception raised by function.
+    """
+    if not _pending.acquire(blocking=False):     # pylint: disable=consider-using-with
+        oradio_log.warning("Refusing '%s': %d blocking handlers pending", name, MAX_PENDING)
+        return JSONResponse(status_code=503, content={"message": "De Oradio is bezig. Probeer het opnieuw"})
+
+    try:
+        future = _worker_pool.submit(function, *args)
+    except RuntimeError:
+        # Pool is shut down
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+
+    try:
+        return await wait_for(wrap_future(future), timeout)
+    except TimeoutError:
+        oradio_log.error("'%s' did not finish within %s seconds", name, timeout)
+        return JSONResponse(status_code=504, content={"message": f"Opdracht '{name}' duurde te lang"})
+
+@dataclass(frozen=True) # Immutable after creation
+class _Page:
+    """
+    Requested page of a song list.
+
+    Attributes:
+        offset: Number of songs to skip.
+        limit:  Max number of songs per page (or per streamed chunk).
+        stream: If True, stream all songs from offset on as NDJSON.
+    """
+    offset: int
+    limit: int
+    stream: bool
+
+def _encode_cursor(offset: int, key: str) -> str:
+    """Return an opaque cursor for continuing the list identified by key at offset."""
+    return urlsafe_b64encode(f"{offset}\n{key}".encode()).decode()
+
+def _decode_cursor(cursor: str, key: str) -> int:
+    """
+    Return the offset of a cursor made by _encode_cursor().
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another list.
+    """
+    try:
+        offset, cursor_key = urlsafe_b64decode(cursor.encode()).decode().split("\n", 1)
+        if cursor_key == key and int(offset) >= 0:
+            return int(offset)
+    except (Base64Error, UnicodeDecodeError, ValueError, AttributeError):
+        pass
+    raise ValueError(f"De cursor '{cursor}' is ongeldig")
+
+def _page_int(args: dict[str, Any], name: str, default: int, minimum: int, maximum: int | None = None) -> int:
+    """
+    Return an integer page argument, or default if absent.
+
+    Raises:
+        ValueError: If the value is not an integer in range.
+    """
+    value = args.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum or (maximum is not None and value > maximum):
+        upper = "" if maximum is None else f" en hoogstens {maximum}"
+        raise ValueError(f"'{name}' moet een geheel getal zijn van minstens {minimum}{upper}")
+    return value
+
+def _parse_page(args: dict[str, Any] | None, key: str) -> _Page | None:
+    """
+    Parse the optional paging arguments of a song list command.
+
+    Args:
+        args: Command arguments; may contain "offset" (int), "limit" (int,
+              1..MAX_PAGE_SIZE), "cursor" (str, from a previous page, takes
+              precedence over offset) and "stream" (bool).
+        key: Identifies the list, so a cursor cannot continue another list.
+
+    Returns:
+        The requested page, or None if no paging argument is given: the
+        command then returns the whole list, as before paging existed.
+
+    Raises:
+        ValueError: If a paging argument is invalid.
+    """
+    args = args or {}
+    if not any(name in args for name in ("offset", "limit", "cursor", "stream")):
+        return None
+
+    cursor = args.get("cursor")
+    offset = _decode_cursor(cursor, key) if cursor else _page_int(args, "offset", 0, 0)
+    limit  = _page_int(args, "limit", MAX_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    return _Page(offset, limit, bool(args.get("stream")))
+
+def _song_page(
+    key: str,
+    page: _Page,
+    fetch: Callable[[int, int | None], tuple[list[dict[str, str]], int]],
+) -> dict[str, Any] | StreamingResponse:
+    """
+    Return a page of songs, or stream all songs from the page offset on.
+
+    Args:
+        key: Identifies the list, for the next page cursor.
+        page: The requested page.
+        fetch: Returns (songs, total) for an offset and limit (None for all).
+
+    Returns:
+        A dict with "songs", "total", "offset" and "next_cursor" (None on
+        the last page); or, if streaming, an NDJSON StreamingResponse with
+        one song per line and the total in the X-Total-Count header.
+    """
+    if page.stream:
+        # Fetched once, so a search is not run again for every chunk
+        songs, total = fetch(page.offset, None)
+
+        def _lines() -> Iterator[str]:
+            """Yield the songs in chunks of page.limit."""
+            for start in range(0, len(songs), page.limit):
+                yield "".join(dumps(song) + "\n" for song in songs[start:start + page.limit])
+
+        return StreamingResponse(_lines(), media_type="application/x-ndjson", headers={"X-Total-Count": str(total)})
+
+    songs, total = fetch(page.offset, page.limit)
+    end = page.offset + len(songs)
+    return {
+        "songs"      : songs,
+        "total"      : total,
+        "offset"     : page.offset,
+        "next_cursor": _encode_cursor(end, key) if end < total else None,
+    }
+
+def _get_spotify_name() -> str | None:
+    """
+    Read the current Spotify device name from the running service unit.
+
+    Returns:
+        The device name, or None if the shell command fails.
+    """
+    oradio_log.debug("Get Spotify name")
+    cmd = "systemctl show librespot | sed -n 's/.*--name \\([^ ]*\\).*/\\1/p' | uniq"
+    result, response = run_shell_script(cmd)
+    if not result:
+        oradio_log.error("Error during <%s> to get Spotify name, error: %s", cmd, response)
+        return None
+    return response
+
+class _HwSerial:
+    """
+    The serial number, once read successfully: it cannot change.
+
+    Never instantiated; use the class attributes.
+
+    Attributes:
+        value: The serial number, or None until read successfully.
+    """
+    value: str | None = None
+
+def _get_hw_serial() -> str:
+    """Return the serial number; read again until a read succeeds."""
+    if _HwSerial.value is None:
+        serial = get_serial()
+        if serial == UNKNOWN_SERIAL:
+            return serial
+        _HwSerial.value = serial
+    return _HwSerial.value
+
 def _get_sw_info() -> dict:
     """
     Read software version metadata from the version file.
@@ -182,6 +456,11 @@ def _get_sw_info() -> dict:
 
     return software_info
 
+# Page context sections which depend on files, reloaded only when those change
+_spotify_name = _FileCachedValue(LIBRESPOT_UNIT_FILE, _get_spotify_name)
+_presets      = _FileCachedValue(PRESETS_FILE, load_presets)
+_sw_info      = _FileCachedValue(SOFTWARE_VERSION_FILE, _get_sw_info)
+
 def play_song(args: dict[str, Any] | None):
     """
     Play a song via MPD and publish a WEB_PLAYING_SONG command.
@@ -298,6 +577,8 @@ def rename_spotify(args: dict[str, Any] | None):
     # Restart librespot to apply the new device name immediately.
     cmd = "sudo systemctl restart librespot.service"
     result, response = run_shell_script(cmd)
+    # The unit file changed before the restart: read the name again in any case
+    _spotify_name.invalidate()
     if not result:
         oradio_log.error("Error during <%s> to set Spotify name, error: %s", cmd, response)
         return JSONResponse(status_code=400, content={"message": response})
@@ -377,47 +658,67 @@ def save_preset(args: dict[str, Any] | None):
     presets[preset] = playlist
     oradio_log.debug("Preset '%s' playlist changed to '%s'", preset, playlist)
     store_presets(presets)
+    _presets.invalidate()
 
     oradio_log.debug("Send web service message: %s", preset_map[preset][preset_type])
     Commands.publish(CommandMessage(WEB_SOURCE, preset_map[preset][preset_type]))
 
 def get_playlist_songs(args: dict[str, Any] | None):
     """
-    Return all songs contained in a given playlist.
+    Return the songs contained in a given playlist or directory.
 
     Args:
-        args: dict containing "playlist" (str) — playlist name.
+        args: dict containing "playlist" (str) — playlist name, and the
+              optional paging arguments described in _parse_page().
 
     Returns:
-        The list of songs returned by MPDControl.get_songs().
+        The list of songs returned by MPDControl.get_songs(), or, when
+        paging arguments are given, a page or stream, see _song_page().
 
     Raises:
-        ValueError: If args is None or does not contain "playlist".
+        ValueError: If args is None, does not contain "playlist", or has
+            invalid paging arguments.
     """
     playlist = args.get("playlist") if args else None
     if not playlist:
         raise ValueError("'playlist' vereist argument 'playlist'")
 
-    return mpd_control.get_songs(playlist)
+    key = f"playlist:{playlist}"
+    page = _parse_page(args, key)
+    if page is None:
+        return mpd_control.get_songs(playlist)
+
+    return _song_page(key, page, lambda offset, limit: mpd_control.get_songs_page(playlist, offset, limit))
 
 def get_search_songs(args: dict[str, Any] | None):
     """
     Return songs matching a search pattern.
 
     Args:
-        args: dict containing "pattern" (str) — search string.
+        args: dict containing "pattern" (str) — search string, optional
+              "prefix" (bool) — match only at the start of words, and the
+              optional paging arguments described in _parse_page().
 
     Returns:
-        The list of matching songs returned by MPDControl.search().
+        The list of matching songs returned by MPDControl.search(), or,
+        when paging arguments are given, a page or stream, see _song_page().
 
     Raises:
-        ValueError: If args is None or does not contain "pattern".
+        ValueError: If args is None, does not contain "pattern", or has
+            invalid paging arguments.
     """
     pattern = args.get("pattern") if args else None
     if not pattern:
         raise ValueError("'search' vereist argument 'pattern'")
 
-    return mpd_control.search(pattern)
+    prefix = bool(args.get("prefix")) if args else False
+
+    key = f"search:{prefix}:{pattern}"
+    page = _parse_page(args, key)
+    if page is None:
+        return mpd_control.search(pattern, prefix=prefix)
+
+    return _song_page(key, page, lambda offset, limit: mpd_control.search_page(pattern, prefix, offset, limit))
 
 def modify_playlist(args: dict[str, Any] | None):
     """
@@ -487,6 +788,35 @@ def log_message(args: dict[str, Any] | None):
 
 ##### Execute #############################################
 
+@dataclass(frozen=True) # Immutable after creation
+class _Command:
+    """
+    Entry of the /execute command table.
+
+    Attributes:
+        handler: Function taking the command arguments.
+        timeout: Max seconds for a blocking handler, which runs in the
+                 worker pool; None for a handler which returns at once
+                 and runs on the event loop.
+    """
+    handler: Callable[[dict[str, Any] | None], Any]
+    timeout: float | None = BLOCKING_TIMEOUT
+
+# Command dispatch table of /execute
+COMMANDS = {
+    "play"       : _Command(play_song),
+    "networks"   : _Command(get_networks, timeout=None),         # Reads the listener's cache
+    "shutdown"   : _Command(shutdown_webapp, timeout=None),      # Non-blocking queue put
+    "spotify"    : _Command(rename_spotify, timeout=SPOTIFY_TIMEOUT),
+    "connect"    : _Command(wifi_connect, timeout=None),         # Non-blocking queue put
+    "preset"     : _Command(save_preset),
+    "playlist"   : _Command(get_playlist_songs),
+    "search"     : _Command(get_search_songs),
+    "modify"     : _Command(modify_playlist),
+    "log_message": _Command(log_message, timeout=None),
+    # Add other commands here
+}
+
 class ExecuteRequest(BaseModel):
     """
     Request body model for the /execute endpoint.
@@ -503,8 +833,9 @@ async def execute(request: ExecuteRequest):
     """
     Dispatch a command from the web interface to the appropriate handler.
 
-    Looks up request.cmd in the command dispatch table and calls the
-    associated function with request.args.
+    Looks up request.cmd in the COMMANDS dispatch table and calls the
+    associated function with request.args: blocking handlers in the
+    worker pool, see _run_blocking(), others directly.
 
     Args:
         request: Parsed ExecuteRequest body from the POST payload.
@@ -512,36 +843,79 @@ async def execute(request: ExecuteRequest):
     Returns:
         The handler's return value on success (type varies by command), or a
         JSONResponse with status 400 if the command name is unknown or a
-        required argument is missing.
+        required argument is missing, 503 if too many blocking handlers are
+        pending, or 504 if the handler timed out.
     """
     oradio_log.debug("Executing '%s' with args '%s'", request.cmd, request.args)
 
-    commands = {
-        "play"       : play_song,
-        "networks"   : get_networks,
-        "shutdown"   : shutdown_webapp,
-        "spotify"    : rename_spotify,
-        "connect"    : wifi_connect,
-        "preset"     : save_preset,
-        "playlist"   : get_playlist_songs,
-        "search"     : get_search_songs,
-        "modify"     : modify_playlist,
-        "log_message": log_message,
-        # Add other commands here
-    }
-
-    if request.cmd not in commands:
+    command = COMMANDS.get(request.cmd)
+    if command is None:
         oradio_log.error("Invalid command '%s'", request.cmd)
         return JSONResponse(status_code=400, content={"message": f"Opdracht '{request.cmd}' is onbekend"})
 
     try:
-        result = commands[request.cmd](request.args)
-        return result
+        if command.timeout is None:
+            return command.handler(request.args)
+        return await _run_blocking(request.cmd, command.timeout, command.handler, request.args)
     except ValueError as ex_err:
         return JSONResponse(status_code=400, content={"message": str(ex_err)})
 
 ##### Oradio3 #############################################
 
+def _network_section() -> dict[str, Any]:
+    """Last WiFi network connected before the access point was started (empty string if none)."""
+    return {"oldssid": get_saved_network()}
+
+def _spotify_section() -> dict[str, Any] | None:
+    """Current Spotify device name; None if it cannot be read."""
+    spotify = _spotify_name.get()
+    return None if spotify is None else {"spotify": spotify}
+
+def _presets_section() -> dict[str, Any]:
+    """Saved presets."""
+    return {"presets": _presets.get()}
+
+def _library_section() -> dict[str, Any]:
+    """MPD directories and playlists, cached by the MPD catalogue."""
+    return {
+        "directories": mpd_control.get_directories(),
+        "playlists"  : mpd_control.get_playlists(),
+    }
+
+def _info_section() -> dict[str, Any]:
+    """Hardware serial and software version."""
+    sw_info = _sw_info.get()
+    return {
+        "hw_serial" : _get_hw_serial(),
+        "sw_dtstamp": sw_info["dtstamp"],
+        "sw_version": sw_info["version"],
+    }
+
+# Sections of the page context, also served separately for partial refresh
+CONTEXT_SECTIONS: dict[str, Callable[[], dict[str, Any] | None]] = {
+    "network": _network_section,
+    "spotify": _spotify_section,
+    "presets": _presets_section,
+    "library": _library_section,
+    "info"   : _info_section,
+}
+
+def _page_context() -> dict[str, Any] | None:
+    """
+    Assemble the template context of the Oradio3 page from its sections.
+    Blocking: sections not cached query MPD or run a shell command.
+
+    Returns:
+        The context dict, or None if reading the Spotify device name fails.
+    """
+    context: dict[str, Any] = {}
+    for section in CONTEXT_SECTIONS.values():
+        values = section()
+        if values is None:
+            return None
+        context |= values
+    return context
+
 @api_app.get("/oradio3")
 async def oradio3_page(request: Request):
     """
@@ -549,44 +923,79 @@ async def oradio3_page(request: Request):
 
     Assembles the full template context by gathering the last connected
     WiFi network, the current Spotify device name, saved presets, available
-    MPD directories and playlists, and software version information.
+    MPD directories and playlists, and software version information. Each
+    section is cached until it changes, so a repeat load costs no shell
+    commands or MPD round-trips; a browser revalidating its copy with
+    If-None-Match gets 304 without the page being rendered.
 
     Args:
         request: The incoming HTTP request (passed through to the template engine).
 
     Returns:
         A TemplateResponse rendering oradio3.html with the assembled
-        context, or a JSONResponse with status 400 if reading the Spotify
-        device name fails.
+        context, a 304 Response if the browser's copy is current, or a
+        JSONResponse with status 400 if reading the Spotify device name
+        fails, or 503/504 from _run_blocking().
     """
     oradio_log.debug("Serving Oradio3 page")
 
-    # Last WiFi network connected before the access point was started (empty string if none).
-    oldssid = get_saved_network()
+    # Uncached sections query MPD or run a shell command: use the worker pool
+    context = await _run_blocking("oradio3", BLOCKING_TIMEOUT, _page_context)
+    if isinstance(context, JSONResponse):
+        return context
+    if context is None:
+        return JSONResponse(status_code=400, content={"message": "Ophalen van de Spotify naam is mislukt"})
 
-    # Read the current Spotify device name from the running service unit.
-    oradio_log.debug("Get Spotify name")
-    cmd = "systemctl show librespot | sed -n 's/.*--name \\([^ ]*\\).*/\\1/p' | uniq"
-    result, response = run_shell_script(cmd)
-    if not result:
-        oradio_log.error("Error during <%s> to get Spotify name, error: %s", cmd, response)
-        return JSONResponse(status_code=400, content={"message": response})
-    spotify = response
+    # Browsers must revalidate, so a changed context is always picked up
+    headers = {"ETag": _etag(context), "Cache-Control": "no-cache"}
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    sw_info = _get_sw_info()
+    return templates.TemplateResponse(request=request, name="oradio3.html", context=context, headers=headers)
 
-    context = {
-        "oldssid"    : oldssid,
-        "spotify"    : spotify,
-        "presets"    : load_presets(),
-        "directories": mpd_control.get_directories(),
-        "playlists"  : mpd_control.get_playlists(),
-        "hw_serial"  : get_serial(),
-        "sw_dtstamp" : sw_info["dtstamp"],
-        "sw_version" : sw_info["version"],
-    }
+@api_app.get("/oradio3/context/{section}")
+async def oradio3_context(request: Request, section: str):
+    """
+    Return one section of the Oradio3 page context as JSON, so the page
+    can refresh just that part.
+
+    Args:
+        request: The incoming HTTP request, for If-None-Match.
+        section: One of the CONTEXT_SECTIONS names.
+
+    Returns:
+        JSONResponse with the section's values and an ETag, a 304 Response
+        if the browser's copy is current, or a JSONResponse with status 404
+        for an unknown section, 400 if the section cannot be read, or
+        503/504 from _run_blocking().
+    """
+    function = CONTEXT_SECTIONS.get(section)
+    if function is None:
+        return JSONResponse(status_code=404, content={"message": f"Onderdeel '{section}' is onbekend"})
+
+    values = await _run_blocking(f"context/{section}", BLOCKING_TIMEOUT, function)
+    if isinstance(values, JSONResponse):
+        return values
+    if values is None:
+        return JSONResponse(status_code=400, content={"message": f"Ophalen van '{section}' is mislukt"})
 
-    return templates.TemplateResponse(request=request, name="oradio3.html", context=context)
+    headers = {"ETag": _etag(values), "Cache-Control": "no-cache"}
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=values, headers=headers)
+
+##### Metrics #############################################
+
+@api_app.get("/metrics")
+async def metrics():
+    """
+    Return the process-wide metrics for Prometheus.
+
+    Returns:
+        PlainTextResponse in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(MetricsRegistry().render_prometheus(), media_type="text/plain; version=0.0.4")
 
 ##### Keep Alive ##########################################
 
@@ -677,7 +1086,7 @@ async def catch_all(request: Request):
 if __name__ == '__main__':
 
     import uvicorn
-    from threading import Thread
+    from threading import Thread                            # pylint: disable=ungrouped-imports
     from multiprocessing import Queue
     from messaging import safe_get, DebugMessageHandler     # pylint: disable=ungrouped-imports
 
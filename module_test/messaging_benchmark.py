@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary:       Headless throughput and latency benchmark for messaging.py
+    Runs without hardware or user input on any Linux box:
+    - publish rate of Commands and Incidents to one draining subscriber
+    - fan-out: one publish delivered to N subscribers; its latencies
+      include queueing, as the messages are published in a burst
+    - source filtering: N subscribers of which only one matches
+    - cache replay: subscribe() while many sources are cached
+    - end-to-end publish-to-_handle_message latency through
+      MessageHandlerTemplate, with in-process and cross-process queues
+    Prints the results as JSON (latencies in us, rates in messages/s).
+    With --baseline, compares against a stored result and exits 1 when a
+    metric is worse than the baseline by more than --tolerance percent.
+
+    Usage, from the repository root:
+        PYTHONPATH=Main:module_test python3 module_test/messaging_benchmark.py \\
+            --baseline bench.json [--update-baseline]
+"""
+import sys
+import json
+import argparse
+import platform
+from pathlib import Path
+from threading import Event
+from time import perf_counter, sleep
+from collections.abc import Callable
+
+##### Oradio modules ######################################
+from messaging import (
+    BusQueue,
+    Commands,
+    Incidents,
+    CommandMessage,
+    IncidentMessage,
+    MessageHandlerTemplate,
+)
+
+##### LOCAL constants #####################################
+DEFAULT_MESSAGES    = 5000
+DEFAULT_SUBSCRIBERS = 8
+DEFAULT_TOLERANCE   = 25    # percent
+# Sources cached before measuring subscribe() replay
+REPLAY_SOURCES = 500
+# Pause between paced publishes, so latency is measured without queueing
+LATENCY_PAUSE = 0.0005
+# Seconds to wait for subscribers to drain a run
+DRAIN_TIMEOUT = 30
+# Metrics where a higher value is better; all others are latencies
+HIGHER_IS_BETTER = ("rate",)
+# Settings and single-sample maxima, too noisy to compare with a baseline
+NOT_COMPARED = ("subscribers", "cached_sources", "max_us")
+
+class _CountingHandler(MessageHandlerTemplate):
+    """
+    Counts the messages it handles. When message.data is the perf_counter()
+    value at publish, also records the publish-to-handling latency.
+    """
+    def __init__(self, queue: BusQueue, expected: int) -> None:
+        """
+        Args:
+            queue: Subscription queue.
+            expected: Number of messages after which done is set.
+        """
+        self.latencies: list[float] = []
+        self.received = 0
+        self.done = Event()
+        self._expected = expected
+        self._since = perf_counter()
+        super().__init__(queue)
+
+    def _handle_message(self, message) -> None:
+        """Count a message; ignore cached messages replayed on subscribe."""
+        sent = getattr(message, "data", None)
+        if isinstance(sent, float):
+            if sent < self._since:
+                return
+            self.latencies.append(perf_counter() - sent)
+        self.received += 1
+        if self.received == self._expected:
+            self.done.set()
+
+##### Helpers #############################################
+
+def _percentiles(seconds: list[float]) -> dict[str, float]:
+    """Return p50, p90, p99 and max of durations in us."""
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+    last = len(ordered) - 1
+    return {
+        "p50_us": round(ordered[int(0.50 * last)] * 1e6, 1),
+        "p90_us": round(ordered[int(0.90 * last)] * 1e6, 1),
+        "p99_us": round(ordered[int(0.99 * last)] * 1e6, 1),
+        "max_us": round(ordered[-1] * 1e6, 1),
+    }
+
+def _run_handlers(topic, sources: tuple[str, ...] | None, count: int, expected: int,    # pylint: disable=too-many-arguments,too-many-positional-arguments
+                  publish: Callable[[int], None], cross_process: bool = False) -> tuple[list[float], float, list[_CountingHandler]]:
+    """
+    Subscribe count handlers on topic, call publish(i) for each benchmark
+    message, and wait until every handler got expected messages.
+
+    Returns:
+        Duration of each publish call, total seconds until all handlers
+        were done, and the handlers.
+    """
+    queues = [topic.subscribe(sources, cross_process) for _ in range(count)]
+    handlers = [_CountingHandler(queue, expected) for queue in queues]
+    publish_times = []
+    start = perf_counter()
+    for index in range(expected):
+        before = perf_counter()
+        publish(index)
+        publish_times.append(perf_counter() - before)
+    for handler in handlers:
+        handler.done.wait(DRAIN_TIMEOUT)
+    elapsed = perf_counter() - start
+    for queue, handler in zip(queues, handlers):
+        topic.unsubscribe(queue)
+        handler.stop()
+    return publish_times, elapsed, handlers
+
+##### Benchmarks ##########################################
+
+def bench_publish_rate(topic, messages: int) -> dict[str, float]:
+    """Publish as fast as possible to one draining subscriber."""
+    if topic is Commands:
+        def publish(_: int) -> None:
+            Commands.publish(CommandMessage("bench-rate", "rate", perf_counter()))
+    else:
+        # IncidentMessage has no data to carry a timestamp: only the rate is measured
+        def publish(_: int) -> None:
+            Incidents.publish(IncidentMessage("bench-rate", "rate"))
+    publish_times, elapsed, _ = _run_handlers(topic, ("bench-rate",), 1, messages, publish)
+    return {"rate": round(messages / elapsed), **_percentiles(publish_times)}
+
+def bench_fanout(messages: int, subscribers: int) -> dict[str, float]:
+    """Publish to N subscribers of the same source."""
+    def publish(_: int) -> None:
+        Commands.publish(CommandMessage("bench-fanout", "fanout", perf_counter()))
+    count = max(messages // subscribers, 1)
+    publish_times, elapsed, handlers = _run_handlers(Commands, ("bench-fanout",), subscribers, count, publish)
+    latencies = [latency for handler in handlers for latency in handler.latencies]
+    return {
+        "subscribers": subscribers,
+        "rate": round(count * subscribers / elapsed),
+        "publish_p50_us": _percentiles(publish_times).get("p50_us", 0.0),
+        **_percentiles(latencies),
+    }
+
+def bench_source_filter(messages: int, subscribers: int) -> dict[str, float]:
+    """Publish where all but one of N subscribers filter the source out."""
+    others = [Commands.subscribe((f"bench-other-{index}",)) for index in range(subscribers - 1)]
+    def publish(_: int) -> None:
+        Commands.publish(CommandMessage("bench-filter", "filter", perf_counter()))
+    publish_times, elapsed, _ = _run_handlers(Commands, ("bench-filter",), 1, messages, publish)
+    for queue in others:
+        Commands.unsubscribe(queue)
+    return {"subscribers": subscribers, "rate": round(messages / elapsed), **_percentiles(publish_times)}
+
+def bench_replay(rounds: int) -> dict[str, float]:
+    """Measure subscribe() with REPLAY_SOURCES cached messages to replay."""
+    for index in range(REPLAY_SOURCES):
+        Commands.publish(CommandMessage(f"bench-replay-{index}", "cached"))
+    durations = []
+    for _ in range(rounds):
+        start = perf_counter()
+        queue = Commands.subscribe()
+        durations.append(perf_counter() - start)
+        Commands.unsubscribe(queue)
+    return {"cached_sources": REPLAY_SOURCES, **_percentiles(durations)}
+
+def bench_latency(messages: int, cross_process: bool) -> dict[str, float]:
+    """Paced publishes, timed from publish to _handle_message."""
+    def publish(_: int) -> None:
+        Commands.publish(CommandMessage("bench-latency", "latency", perf_counter()))
+        sleep(LATENCY_PAUSE)
+    _, _, handlers = _run_handlers(Commands, ("bench-latency",), 1, messages, publish, cross_process)
+    return _percentiles(handlers[0].latencies)
+
+def run_benchmarks(messages: int, subscribers: int) -> dict[str, dict[str, float]]:
+    """Run all benchmarks and return their results by name."""
+    # Paced runs take LATENCY_PAUSE per message: keep them short
+    paced = min(messages, 2000)
+    return {
+        "commands_publish": bench_publish_rate(Commands, messages),
+        "incidents_publish": bench_publish_rate(Incidents, messages),
+        "fanout": bench_fanout(messages, subscribers),
+        "source_filter": bench_source_filter(messages, subscribers),
+        "subscribe_replay": bench_replay(max(messages // 50, 10)),
+        "latency_in_process": bench_latency(paced, False),
+        "latency_cross_process": bench_latency(paced, True),
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compare results with a baseline.
+
+    Returns:
+        A line per metric worse than the baseline by more than tolerance percent.
+    """
+    regressions = []
+    for name, metrics in baseline.get("results", {}).items():
+        for metric, old in metrics.items():
+            new = results.get(name, {}).get(metric)
+            if new is None or not old or metric in NOT_COMPARED:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.0f}%)")
+    return regressions
+
+##### Stand-alone entry point #############################
+
+def main() -> None:
+    """
+    Run the benchmarks, print JSON, and optionally compare with or update a baseline.
+
+    Exit status:
+        0 if no metric regressed (or no baseline was given), 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Oradio messaging benchmark")
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES, help="messages per benchmark")
+    parser.add_argument("--subscribers", type=int, default=DEFAULT_SUBSCRIBERS, help="subscribers for fan-out and filtering")
+    parser.add_argument("--output", type=Path, help="also write the JSON result to this file")
+    parser.add_argument("--baseline", type=Path, help="JSON result to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="percent a metric may be worse")
+    parser.add_argument("--update-baseline", action="store_true", help="write the result to --baseline instead of comparing")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "messages": args.messages,
+        },
+        "results": run_benchmarks(args.messages, max(args.subscribers, 1)),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline is None:
+        sys.exit(0)
+    if args.update_baseline or not args.baseline.exists():
+        args.baseline.write_text(text + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        sys.exit(0)
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare(report["results"], baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:g}% against {args.baseline}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+  ####   #####     ##    #####      #     ####
+ #    #  #    #   #  #   #    #     #    #    #
+ #    #  #    #  #    #  #    #     #    #    #
+ #    #  #####   ######  #    #     #    #    #
+ #    #  #   #   #    #  #    #     #    #    #
+  ####   #    #  #    #  #####      #     ####
+
+Created on October 16, 2026
+@author:        Henk Stevens & Olaf Mastenbroek & Onno Janssen
+@copyright:     Copyright 2026, Oradio Stichting
+@license:       GNU General Public License (GPL)
+@organization:  Oradio Stichting
+@version:       1
+@email:         oradioinfo@stichtingoradio.nl
+@status:        Development
+@summary:       Headless test of the RMS outbox against a local stand-in server
+    Runs the WifiMessageHandler of rms_service with its own outbox file,
+    posting to an HTTP server on 127.0.0.1 instead of RMS:
+    - offline: messages wait in the outbox, heartbeats coalesce, and an
+      incident's log bundle is stored with it when it is reported
+    - the outbox survives a reload from its file
+    - on WIFI_CONNECTED the outbox drains, oldest first, over one connection
+    - incidents carry the log bundle digest, and the first the bundle itself;
+      a back-to-back incident shares that bundle, so it is not sent again
+    - a 503 keeps the message for a retry, a 4xx drops it
+    Prints a line per check and exits 1 if any check failed.
+
+    Usage, from the repository root:
+        PYTHONPATH=Main:module_test python3 module_test/rms_outbox_test.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+from time import sleep, monotonic
+from threading import Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+##### Oradio modules ######################################
+import rms_service
+from rms_service import WifiMessageHandler, Heartbeat, HEARTBEAT, SYS_INFO, INCIDENT
+from rms_outbox import RmsOutbox
+from messaging import Commands, CommandMessage, IncidentMessage, WIFI_SOURCE, WIFI_CONNECTED, WIFI_DISCONNECTED
+
+##### LOCAL constants #####################################
+# Seconds to wait for the handler to post
+POST_WAIT = 10
+
+class _StandInRms(BaseHTTPRequestHandler):
+    """Records each POST on the server and answers with the status set on the server."""
+    protocol_version = "HTTP/1.1"   # Keep-alive, so a reused session shows as one connection
+
+    def do_POST(self) -> None:      # pylint: disable=invalid-name
+        """Record the message type and the client port, and answer."""
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        assert isinstance(server, _StandInServer)
+        kind = next((kind for kind in (HEARTBEAT, SYS_INFO, INCIDENT) if kind.encode() in body), "?")
+        # The digest is a multipart field with the bundle, else urlencoded
+        bundle = b"incident_logs.tar.gz" in body, b'name="log_bundle"' in body or b"log_bundle=" in body
+        server.posts.append((kind, self.client_address[1], bundle))
+        reply = b'{"success": true, "data": {"stored": true}}'
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, format, *args) -> None:   # pylint: disable=redefined-builtin
+        """Keep the test output clean."""
+
+class _StandInServer(ThreadingHTTPServer):
+    """
+    HTTP server on a free port of 127.0.0.1 standing in for RMS.
+
+    Attributes:
+        posts:  Per POST: message type, client port, and whether the log
+                bundle was attached and its digest sent.
+        status: HTTP status to answer with.
+    """
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StandInRms)
+        self.posts: list[tuple[str, int, tuple[bool, bool]]] = []
+        self.status = 200
+
+##### Helpers #############################################
+
+_failures: list[str] = []
+
+def _check(name: str, condition: bool, detail: object = "") -> None:
+    """Print and record the result of a check."""
+    print(f"{'PASS' if condition else 'FAIL'} {name} {detail}")
+    if not condition:
+        _failures.append(name)
+
+def _wait_for(condition, timeout: float = POST_WAIT) -> bool:
+    """Wait until condition() is true; return whether it became true."""
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        sleep(0.05)
+    return True
+
+def _wifi(state: str) -> None:
+    """Publish a WiFi state message, as wifi_service does."""
+    Commands.publish(CommandMessage(WIFI_SOURCE, state))
+
+##### Stand-alone entry point #############################
+
+def main() -> None:
+    """
+    Run the checks against a stand-in server.
+
+    Exit status:
+        0 if all checks passed, 1 otherwise.
+    """
+    server = _StandInServer()
+    Thread(target=server.serve_forever, daemon=True).start()
+    rms_service.RMS_SERVER_URL = f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    with tempfile.TemporaryDirectory() as directory:
+        outbox_file = str(Path(directory) / "rms_outbox.jsonl")
+        outbox = RmsOutbox(outbox_file)
+        queue = Commands.subscribe(sources=(WIFI_SOURCE,))
+        handler = WifiMessageHandler(queue, outbox)
+
+        # Offline: everything waits, heartbeats coalesce
+        for _ in range(3):
+            handler.send_message(HEARTBEAT)
+        handler.send_message(INCIDENT, IncidentMessage("test", "first incident"))
+        handler.send_message(INCIDENT, IncidentMessage("test", "second incident"))
+        _check("offline messages wait", outbox.depth == 3 and not server.posts, f"depth={outbox.depth}")
+        _check("outbox reports age", outbox.age >= 0)
+        _check("outbox survives reload", RmsOutbox(outbox_file).depth == 3)
+        incidents = [record for record in outbox.peek(3) if record.kind == INCIDENT]
+        _check("incident bundle stored offline", all(outbox.attachment(record) for record in incidents),
+               [record.attachment for record in incidents])
+
+        # Online: drained oldest first over one connection
+        _wifi(WIFI_CONNECTED)
+        _wait_for(lambda: outbox.depth == 0 and len(server.posts) >= 4)
+        Heartbeat.stop_heartbeat()
+        kinds = [kind for kind, _, _ in server.posts]
+        _check("outbox drained on connect", outbox.depth == 0, kinds)
+        _check("incidents posted first, in order", kinds[:2] == [INCIDENT, INCIDENT])
+        bundles = [bundle for kind, _, bundle in server.posts if kind == INCIDENT]
+        _check("incidents carry bundle digest", all(digest for _, digest in bundles))
+        _check("first incident has log bundle", bundles[0][0])
+        _check("second incident shares the bundle", not bundles[1][0])
+        _check("one connection per drain", len({port for _, port, _ in server.posts[:3]}) == 1,
+               {port for _, port, _ in server.posts})
+        _check("outbox file emptied", Path(outbox_file).stat().st_size == 0)
+        _check("bundle files removed", not any(Path(directory).glob("rms_outbox_files/*")))
+
+        # Server failing: kept for a retry
+        server.status = 503
+        handler.send_message(INCIDENT, IncidentMessage("test", "while failing"))
+        _check("failed message kept", outbox.depth == 1, f"depth={outbox.depth}")
+
+        # Server back: a drain delivers it
+        server.status = 200
+        handler.drain()
+        _check("kept message delivered", outbox.depth == 0 and server.posts[-1][0] == INCIDENT)
+
+        # Rejected: dropped, not retried
+        server.status = 400
+        handler.send_message(SYS_INFO)
+        _check("rejected message dropped", outbox.depth == 0)
+
+        _wifi(WIFI_DISCONNECTED)
+        Commands.unsubscribe(queue)
+        handler.stop()
+
+    server.shutdown()
+    print(f"\n{len(_failures)} check(s) failed" if _failures else "\nAll checks passed")
+    sys.exit(1 if _failures else 0)
+
+if __name__ == "__main__":
+    main()